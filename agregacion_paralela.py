@@ -0,0 +1,192 @@
+# ============================================================================
+# AGREGACIÓN PARALELA POR SECCIÓN PARA EXTRACTOS SICOP MUY GRANDES
+# ============================================================================
+# Las sumas de calcular_agregados_ur son por UR, así que el extracto filtrado
+# se puede partir por sección (sector central, oficinas, desconcentrados,
+# paraestatales) y agregar cada parte en otro proceso. Cada parte viaja como
+# un stream Arrow escrito directamente en un bloque de memoria compartida
+# (no como DataFrame serializado con pickle); el proceso solo devuelve los
+# agregados, que son chicos. Con pocos renglones, un solo núcleo, sin
+# pyarrow o dentro de un proceso del pool de procesar_lote se usa la ruta
+# secuencial de siempre.
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+from config import SECCIONES_UR
+from motor import motor_activo
+
+# Renglones filtrados a partir de los cuales conviene repartir la agregación
+# (arrancar los procesos cuesta del orden de un segundo). 0 la desactiva.
+FILAS_PARALELO = int(os.environ.get('SADER_FILAS_PARALELO', '2000000'))
+
+# Columnas que usa calcular_agregados_ur además de las mensuales
+COLUMNAS_AGREGADOS = [
+    'Nueva UR', 'CAPITULO', 'CONTROL_OPERATIVO', 'Partida', 'PROGRAMA_PRESUPUESTARIO',
+    'ORIGINAL', 'MODIFICADO_AUTORIZADO', 'RESERVAS', 'EJERCIDO_REAL',
+]
+
+_pool = None
+_pool_trabajadores = 0
+_candado = threading.Lock()
+
+
+def nucleos_disponibles():
+    """Núcleos que puede usar este proceso (respeta la afinidad en Linux)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def usar_paralelo(filas):
+    """Indica si conviene la agregación paralela para `filas` renglones filtrados"""
+    return (
+        pa is not None
+        and FILAS_PARALELO > 0
+        and filas >= FILAS_PARALELO
+        and nucleos_disponibles() > 1
+        # Dentro de un proceso de un pool (procesar_lote) ya hay paralelismo
+        and multiprocessing.parent_process() is None
+    )
+
+
+def _obtener_pool(trabajadores):
+    """Pool reutilizable entre llamadas; spawn para no heredar hilos del servidor"""
+    global _pool, _pool_trabajadores
+    with _candado:
+        if _pool is None or _pool_trabajadores < trabajadores:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=trabajadores, mp_context=multiprocessing.get_context('spawn'))
+            _pool_trabajadores = trabajadores
+        return _pool
+
+
+# ============================================================================
+# MEMORIA COMPARTIDA
+# ============================================================================
+
+def _a_memoria_compartida(df):
+    """Escribe df como stream Arrow en un bloque de memoria compartida nuevo"""
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    medida = pa.MockOutputStream()
+    with pa.ipc.new_stream(medida, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    bloque = SharedMemory(create=True, size=max(medida.size(), 1))
+    with pa.ipc.new_stream(pa.FixedSizeBufferWriter(pa.py_buffer(bloque.buf)), tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    # El escritor retiene una vista del bloque; sin soltarla no se puede cerrar
+    del escritor
+    return bloque
+
+
+def _fuera_del_bloque(arreglo):
+    """
+    Copia de un arreglo de texto o categórico con buffers propios:
+    to_pandas deja esas columnas respaldadas por los buffers Arrow (las
+    numéricas sí las copia a numpy).
+    """
+    if pa.types.is_dictionary(arreglo.type):
+        return pa.DictionaryArray.from_arrays(
+            pa.concat_arrays([arreglo.indices]), _fuera_del_bloque(arreglo.dictionary),
+            ordered=arreglo.type.ordered,
+        )
+    return pa.concat_arrays([arreglo])
+
+
+def _de_memoria_compartida(nombre):
+    """
+    DataFrame leído del bloque `nombre` sin copiar el bloque completo: el
+    stream se lee directo de la memoria compartida, to_pandas copia los
+    importes y solo las columnas de texto se copian antes en Arrow. El
+    bloque lo libera (unlink) el proceso que lo creó; los procesos spawn
+    comparten su resource_tracker.
+    """
+    bloque = SharedMemory(name=nombre)
+    try:
+        tabla = pa.ipc.open_stream(pa.py_buffer(bloque.buf)).read_all()
+        columnas = [
+            pa.chunked_array([_fuera_del_bloque(parte) for parte in columna.chunks], type=columna.type)
+            if pa.types.is_dictionary(columna.type) or pa.types.is_string(columna.type)
+            or pa.types.is_large_string(columna.type) else columna
+            for columna in tabla.columns
+        ]
+        df = pa.Table.from_arrays(columnas, schema=tabla.schema).to_pandas()
+        # Soltar las vistas del bloque antes de cerrarlo
+        del tabla, columnas
+    finally:
+        bloque.close()
+    return df
+
+
+def _agregar_seccion(nombre, urs, config, mes_archivo, periodo_es_anual, motor_agregacion):
+    """Corre en el proceso del pool: agrega las URs de una sección"""
+    from motor import seleccionar_motor
+    from sicop_processor import calcular_agregados_ur
+    # El pool puede venir de antes de cambiar de motor
+    seleccionar_motor(motor_agregacion)
+    return calcular_agregados_ur(_de_memoria_compartida(nombre), urs, config, mes_archivo, periodo_es_anual)
+
+
+# ============================================================================
+# AGREGACIÓN
+# ============================================================================
+
+def calcular_agregados_paralelo(df, urs_validas, config, mes_archivo, periodo_es_anual, columnas_mensuales):
+    """
+    Mismo resultado que sicop_processor.calcular_agregados_ur, con una parte
+    por sección agregada en un proceso aparte.
+
+    Args:
+        columnas_mensuales: columnas MO*/RESERVA_* que usa la agregación
+    """
+    urs = list(dict.fromkeys(urs_validas))
+    seccion_por_ur = config['seccion_por_ur']
+    seccion = df['Nueva UR'].astype(str).map(seccion_por_ur).to_numpy()
+    columnas = COLUMNAS_AGREGADOS + [col for col in columnas_mensuales if col in df.columns]
+
+    partes = []
+    for nombre_seccion in SECCIONES_UR:
+        urs_seccion = [ur for ur in urs if seccion_por_ur.get(ur) == nombre_seccion]
+        if urs_seccion:
+            partes.append((urs_seccion, df.loc[seccion == nombre_seccion, columnas]))
+
+    pool = _obtener_pool(min(len(partes), nucleos_disponibles()))
+    bloques = []
+    try:
+        futuros = []
+        for urs_seccion, parte in partes:
+            bloques.append(_a_memoria_compartida(parte))
+            futuros.append(pool.submit(
+                _agregar_seccion, bloques[-1].name, urs_seccion, config, mes_archivo, periodo_es_anual,
+                motor_activo()
+            ))
+        parciales = [futuro.result() for futuro in futuros]
+    finally:
+        for bloque in bloques:
+            bloque.close()
+            bloque.unlink()
+
+    # Las secciones no comparten URs: unir en el orden de urs_validas
+    resultados_ur = {}
+    capitulos_por_ur = {}
+    for resultados_parte, capitulos_parte, _ in parciales:
+        resultados_ur.update(resultados_parte)
+        capitulos_por_ur.update(capitulos_parte)
+    resultados_ur = {ur: resultados_ur[ur] for ur in urs}
+    capitulos_por_ur = {ur: capitulos_por_ur[ur] for ur in urs}
+
+    df_partidas = pd.concat([partidas for _, _, partidas in parciales], ignore_index=True)
+    df_partidas['UR'] = pd.Categorical(df_partidas['UR'].astype(str), categories=urs)
+    return resultados_ur, capitulos_por_ur, df_partidas
@@ -9,12 +9,19 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import date
 import io
+import os
+import time
 
 from config import MONTH_NAMES_FULL, formatear_fecha, obtener_ultimo_dia_habil, get_config_by_year
-from map_processor import procesar_map
-from sicop_processor import procesar_sicop
-from excel_map import generar_excel_map
-from excel_sicop import generar_excel_sicop
+from result_cache import excel_cacheado, invalidar as invalidar_resultados
+from extract_cache import estadisticas as estadisticas_cache, hash_contenido
+from cortes import comparacion_disponible
+from etapas import NOMBRES_ETAPA
+from trabajos import (
+    enviar as enviar_trabajo, estado as estado_trabajo, resultado as resultado_trabajo,
+    estadisticas as estadisticas_trabajos
+)
+from map_processor import consultar_dashboard_ur, TOP_PARTIDAS
 
 # Colores
 COLOR_AZUL = '#4472C4'
@@ -24,6 +31,25 @@ COLOR_BEIGE = '#E6D194'
 COLOR_GRIS = '#98989A'
 COLOR_VERDE = '#002F2A'
 
+# Segundos entre consultas del avance de un trabajo en proceso
+INTERVALO_AVANCE = 0.5
+
+# Cantidades de partidas que se pueden mostrar en el dashboard (None = todas)
+OPCIONES_TOP_PARTIDAS = [5, 10, 20, None]
+
+# Capítulos de gasto (clasificador por objeto del gasto)
+NOMBRES_CAPITULO = {
+    1: 'Servicios personales',
+    2: 'Materiales y suministros',
+    3: 'Servicios generales',
+    4: 'Transferencias',
+    5: 'Bienes muebles, inmuebles e intangibles',
+    6: 'Inversion publica',
+    7: 'Inversiones financieras',
+    8: 'Participaciones y aportaciones',
+    9: 'Deuda publica',
+}
+
 # Configuracion
 st.set_page_config(page_title="SADER - Reportes", page_icon="", layout="wide", initial_sidebar_state="expanded")
 
@@ -65,6 +91,22 @@ with st.sidebar:
     st.markdown('<div style="text-align:center;padding:1rem;color:white;font-weight:bold;font-size:1.5rem;">SADER</div>', unsafe_allow_html=True)
     st.markdown("### Tipo de Reporte")
     reporte_tipo = st.radio("Selecciona:", ["MAP - Cuadro de presupuesto", "SICOP - Estado del Ejercicio"], label_visibility="collapsed")
+    with st.expander("Caché de archivos"):
+        stats_cache = estadisticas_cache()
+        if not stats_cache['disponible']:
+            st.caption("Instala pyarrow para activar el caché")
+        st.caption(f"{stats_cache['entradas']} archivos - {stats_cache['bytes'] / 1_048_576:,.1f} MB de {stats_cache['max_bytes'] / 1_048_576:,.0f} MB")
+        st.caption(f"Aciertos: {stats_cache['aciertos']} - Fallos: {stats_cache['fallos']} - Desalojos: {stats_cache['desalojos']}")
+        if st.button("Recalcular resultados"):
+            invalidar_resultados()
+            st.session_state.pop('trabajos', None)
+        stats_trabajos = estadisticas_trabajos()
+        st.caption(f"Trabajos: {stats_trabajos['corriendo']} en proceso (max. {stats_trabajos['max_simultaneos']}) - {stats_trabajos['en_cola']} en espera")
+    comparar_corte = st.checkbox("Comparar con el corte anterior", disabled=not comparacion_disponible(),
+                                 help="Muestra los cambios contra el último corte del mismo reporte y año que se subió a este servidor (de cualquier usuario). El archivo se lee y el reporte se calcula completo, sobre el extracto agrupado por claves")
+    with st.expander("Avanzado"):
+        perfilar = st.checkbox("Perfilar el procesamiento",
+                               help="Procesa de nuevo el archivo y genera su Excel bajo el perfilador, y permite descargar el perfil para adjuntarlo a un ticket")
 
 # Header
 st.markdown('<div class="main-header"><h1>Sistema de Reportes Presupuestarios</h1><p>Secretaria de Agricultura y Desarrollo Rural</p></div>', unsafe_allow_html=True)
@@ -80,19 +122,86 @@ with col_instrucciones:
     st.markdown('<div class="instrucciones-box"><h4>Instrucciones</h4><ol><li>Selecciona el tipo de reporte</li><li>Sube el archivo CSV</li><li>Revisa los resultados</li><li>Descarga el Excel</li></ol></div>', unsafe_allow_html=True)
 
 if uploaded_file is not None:
+    # Lectura y procesamiento en la cola de trabajos: la sesión solo consulta
+    # el avance y vuelve a correr hasta que el trabajo termina
+    filename = uploaded_file.name
+    # La solicitud se identifica por el contenido (el mismo hash que usan los
+    # cachés), calculado una vez por archivo subido
+    subida = (getattr(uploaded_file, 'file_id', None), filename, uploaded_file.size)
+    if st.session_state.get('hash_subida', (None, None))[0] != subida or subida[0] is None:
+        st.session_state['hash_subida'] = (subida, hash_contenido(uploaded_file.getvalue()))
+    solicitud = (st.session_state['hash_subida'][1], filename, 'MAP' if es_map else 'SICOP', comparar_corte, perfilar)
+    trabajos_sesion = st.session_state.setdefault('trabajos', {})
+    estado = estado_trabajo(trabajos_sesion[solicitud]) if solicitud in trabajos_sesion else None
+    if estado is None or estado['estado'] == 'expirado':
+        # Nuevo, o sus resultados ya salieron de la memoria del servidor
+        trabajos_sesion[solicitud] = enviar_trabajo(
+            uploaded_file.getvalue(), filename, solicitud[2], comparar_corte=comparar_corte,
+            # Al perfilar también se mide la generación del Excel
+            excel=perfilar, perfilar=perfilar
+        )
+        estado = estado_trabajo(trabajos_sesion[solicitud])
+    if estado['estado'] in ('en_cola', 'corriendo'):
+        if estado['estado'] == 'en_cola':
+            texto = f"En espera ({estado['posicion']} en la cola)..."
+        else:
+            texto = f"{NOMBRES_ETAPA.get(estado['etapa'], 'Procesando')}... ({estado['segundos']:.0f} s)"
+        st.progress(estado['avance'], text=texto)
+        time.sleep(INTERVALO_AVANCE)
+        st.rerun()
+    if estado['estado'] == 'error':
+        # El siguiente rerun vuelve a intentar
+        del trabajos_sesion[solicitud]
+
     try:
-        df = pd.read_csv(uploaded_file, encoding='latin-1', low_memory=False)
-        filename = uploaded_file.name
-        st.success(f"Archivo: **{filename}** ({len(df):,} registros)")
+        trabajo = resultado_trabajo(estado['id'])
+        if trabajo is None:
+            # Expiró entre la consulta del estado y ahora: se vuelve a enviar
+            del trabajos_sesion[solicitud]
+            st.rerun()
+        resultados = trabajo['resultados']
+        hash_archivo = trabajo['hash_archivo']
+        cambios = trabajo['cambios']
+        registros = trabajo['registros']
+        st.success(f"Archivo: **{filename}** ({registros:,} registros)")
+        if cambios is not None:
+            with st.expander("Cambios contra el corte anterior", expanded=cambios['corte_anterior'] is not None):
+                if cambios['corte_anterior'] is None:
+                    st.caption("No hay corte anterior de este reporte y año; este archivo queda como base.")
+                else:
+                    st.caption(f"Corte anterior: {cambios['corte_anterior']['archivo']}")
+                    col_c1, col_c2, col_c3, col_c4 = st.columns(4)
+                    col_c1.metric("Grupos nuevos", f"{cambios['nuevos']:,}")
+                    col_c2.metric("Modificados", f"{cambios['modificados']:,}")
+                    col_c3.metric("Eliminados", f"{cambios['eliminados']:,}")
+                    col_c4.metric("Sin cambio", f"{cambios['sin_cambio']:,}")
+                    if cambios['urs_con_cambios']:
+                        st.caption("URs con cambios: " + ", ".join(cambios['urs_con_cambios']))
+                    if cambios['diferencias']:
+                        df_dif = pd.DataFrame(list(cambios['diferencias'].items()), columns=['Columna', 'Diferencia'])
+                        st.dataframe(df_dif.style.format({'Diferencia': '${:,.2f}'}), use_container_width=True, hide_index=True)
         
-        with st.spinner("Procesando..."):
-            if es_map:
-                resultados = procesar_map(df, filename)
-            else:
-                resultados = procesar_sicop(df, filename)
+        # Tiempo, memoria y contadores de cada etapa del trabajo que produjo estos resultados
+        diagnostico = trabajo['diagnostico']
+        with st.expander("Diagnóstico"):
+            st.caption(f"Duración: {diagnostico['duracion_s']:.2f} s - Memoria del servidor: {diagnostico['memoria_inicial_mb'] or 0:,.0f} MB -> {diagnostico['memoria_final_mb'] or 0:,.0f} MB")
+            df_etapas = pd.DataFrame([{
+                # Las subetapas (preparación, filtros, agregados) van dentro de Procesando
+                'Etapa': ('↳ ' if e.get('nivel') else '') + NOMBRES_ETAPA.get(e['etapa'], e['etapa']),
+                'Segundos': e['segundos'],
+                'Memoria (MB)': e['memoria_mb'],
+                'Contadores': ", ".join(f"{nombre}: {valor:,}" for nombre, valor in e['contadores'].items()),
+            } for e in diagnostico['etapas']])
+            st.dataframe(df_etapas.style.format({'Segundos': '{:.3f}', 'Memoria (MB)': '{:+,.1f}'}, na_rep='-'), use_container_width=True, hide_index=True)
+            if trabajo['perfil']:
+                st.caption(f"Perfil: {trabajo['perfil']}")
+                with open(trabajo['perfil'], 'rb') as f:
+                    st.download_button("Descargar perfil", data=f.read(), file_name=os.path.basename(trabajo['perfil']), key="descargar_perfil")
         
         metadata = resultados['metadata']
         config = metadata['config']
+        if metadata.get('fecha_inferida'):
+            st.warning(f"No se encontró la fecha del corte en el nombre **{filename}** ni en su contenido; se usa la de hoy ({formatear_fecha(metadata['fecha_archivo'])}). Renombra el archivo como DD-MMM-AAAA_{'MAP' if es_map else 'SICOP'}.csv para fijarla.")
         
         col_info1, col_info2, col_info3 = st.columns(3)
         with col_info1:
@@ -153,6 +262,25 @@ if uploaded_file is not None:
                     ur_seleccionada = st.selectbox("Selecciona una Unidad Responsable:", options=urs_con_nombre, index=0, key="ur_map")
                     ur_codigo = ur_seleccionada.split(" - ")[0]
                     datos_ur = resultados_ur[ur_codigo]
+                    caps_ur = resultados.get('capitulos_por_ur', {}).get(ur_codigo, {})
+                    partidas_ur = resultados.get('partidas_por_ur', {}).get(ur_codigo, [])
+                    capitulos_sel = [2, 3, 4]
+                    top_partidas = TOP_PARTIDAS
+                    
+                    # Otros cortes (mes, capítulos, partidas) se consultan en el cubo del procesador
+                    cubo = resultados.get('cubo')
+                    if cubo is not None:
+                        mes_archivo = metadata['mes']
+                        cf1, cf2, cf3 = st.columns([1, 2, 1])
+                        with cf1:
+                            mes_corte = st.selectbox("Corte al mes:", options=list(range(1, mes_archivo + 1)), index=mes_archivo - 1, format_func=lambda m: MONTH_NAMES_FULL[m - 1], key="mes_map")
+                        with cf2:
+                            capitulos_cubo = sorted(int(c) for c in cubo['etiquetas']['CAPITULO'] if int(c) != 1)
+                            capitulos_sel = st.multiselect("Capitulos en la tabla:", options=capitulos_cubo, default=[c for c in capitulos_sel if c in capitulos_cubo], format_func=lambda c: f"{c}000 - {NOMBRES_CAPITULO.get(c, '')}", key="caps_map")
+                        with cf3:
+                            top_partidas = st.selectbox("Partidas a mostrar:", options=OPCIONES_TOP_PARTIDAS, index=OPCIONES_TOP_PARTIDAS.index(TOP_PARTIDAS), format_func=lambda n: "Todas" if n is None else str(n), key="top_map")
+                        if mes_corte != mes_archivo or capitulos_sel != [2, 3, 4] or top_partidas != TOP_PARTIDAS:
+                            datos_ur, caps_ur, partidas_ur = consultar_dashboard_ur(cubo, ur_codigo, mes_corte, config, capitulos=capitulos_sel, top=top_partidas)
                     
                     st.markdown(f"### Dashboard Presupuesto - {denominaciones.get(ur_codigo, ur_codigo)}")
                     
@@ -224,11 +352,10 @@ if uploaded_file is not None:
                     with col_der:
                         # Tabla por capitulo
                         st.markdown("#### Estado del ejercicio por capitulo de gasto")
-                        caps_ur = resultados.get('capitulos_por_ur', {}).get(ur_codigo, {})
                         
                         cap_data = []
                         tot_o, tot_ma, tot_mp, tot_e = 0, 0, 0, 0
-                        for cap_num, cap_name in [('2', 'Materiales y suministros'), ('3', 'Servicios generales'), ('4', 'Transferencias')]:
+                        for cap_num, cap_name in [(str(cap), NOMBRES_CAPITULO.get(cap, '')) for cap in capitulos_sel]:
                             c = caps_ur.get(cap_num, {})
                             o, ma, mp, e = c.get('Original', 0), c.get('Modificado_anual', 0), c.get('Modificado_periodo', 0), c.get('Ejercido', 0)
                             d = mp - e
@@ -243,13 +370,12 @@ if uploaded_file is not None:
                         df_cap = pd.DataFrame(cap_data)
                         st.dataframe(df_cap.style.format({'Original': '${:,.2f}', 'Mod. Anual': '${:,.2f}', 'Mod. Periodo': '${:,.2f}', 'Ejercido': '${:,.2f}', 'Disponible': '${:,.2f}', '% Avance': '{:.2f}%'}), use_container_width=True, hide_index=True)
                         
-                        # Top 5 partidas
-                        st.markdown("#### Cinco partidas con mayor disponible")
-                        partidas_ur = resultados.get('partidas_por_ur', {}).get(ur_codigo, [])
+                        # Partidas con mayor disponible
+                        st.markdown("#### Partidas con mayor disponible" if top_partidas is None else f"#### {top_partidas} partidas con mayor disponible")
                         if partidas_ur:
                             total_disp = datos_ur['Disponible_periodo']
                             part_data = []
-                            for p in partidas_ur[:5]:
+                            for p in partidas_ur:
                                 pct_r = p['Disponible'] / total_disp * 100 if total_disp > 0 else 0
                                 part_data.append({'Partida': p['Partida'], 'Programa': p['Programa'], 'Denom. Programa': p.get('Denom_Programa', ''), 'Disponible': p['Disponible'], '% del Total': pct_r})
                             df_part = pd.DataFrame(part_data)
@@ -318,16 +444,28 @@ if uploaded_file is not None:
                     fig_bar.update_layout(barmode='stack', xaxis_tickangle=-45)
                     st.plotly_chart(fig_bar, use_container_width=True, key="bar_sicop")
         
-        # Descarga
+        # Descarga: el Excel solo se genera cuando se solicita
         st.markdown("---")
+        tipo_reporte = 'MAP' if es_map else 'SICOP'
         if es_map:
-            excel_bytes = generar_excel_map(resultados)
             filename_excel = f'Cuadro_Presupuesto_{date.today().strftime("%d%b%Y").upper()}.xlsx'
         else:
-            excel_bytes = generar_excel_sicop(resultados)
             filename_excel = f'Estado_Ejercicio_SICOP_{date.today().strftime("%d%b%Y").upper()}.xlsx'
         
-        st.download_button(label="Descargar Excel", data=excel_bytes, file_name=filename_excel, mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        solicitud_excel = (hash_archivo, tipo_reporte, filename)
+        if st.session_state.get('excel_solicitado') == solicitud_excel or st.button("Generar Excel"):
+            st.session_state['excel_solicitado'] = solicitud_excel
+            with st.spinner("Generando Excel..."):
+                excel_bytes = excel_cacheado(resultados, hash_archivo, tipo_reporte, filename)
+            st.download_button(label="Descargar Excel", data=excel_bytes, file_name=filename_excel, mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        
+        # Detalle: todos los registros procesados, escrito en streaming
+        filename_detalle = f'Detalle_{tipo_reporte}_{date.today().strftime("%d%b%Y").upper()}.xlsx'
+        if st.session_state.get('detalle_solicitado') == solicitud_excel or st.button(f"Generar detalle ({metadata['registros']:,} registros)"):
+            st.session_state['detalle_solicitado'] = solicitud_excel
+            with st.spinner("Generando detalle..."):
+                detalle_bytes = excel_cacheado(resultados, hash_archivo, tipo_reporte, filename, detalle=True)
+            st.download_button(label="Descargar detalle", data=detalle_bytes, file_name=filename_detalle, mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key="descargar_detalle")
         
     except Exception as e:
         st.error(f"Error: {str(e)}")
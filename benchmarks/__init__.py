@@ -0,0 +1,3 @@
+# ============================================================================
+# BENCHMARKS DE LECTURA, PROCESAMIENTO Y GENERACIÓN DE EXCEL
+# ============================================================================
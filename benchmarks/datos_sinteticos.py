@@ -0,0 +1,209 @@
+# ============================================================================
+# EXTRACTOS MAP Y SICOP SINTÉTICOS PARA BENCHMARKS
+# ============================================================================
+# Mismas columnas que los extractos reales (ORI_ENE..CONG_DIC, MOEN..MODI,
+# RESERVA_ENE..RESERVA_DIC, CONTROL_OPERATIVO...), URs y programas tomados de
+# config, más algunas columnas descriptivas que el reporte no usa.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import MONTH_NAMES, get_config_by_year
+from csv_loader import MESES_MAP, MESES_RESERVA, MESES_MODIFICACION
+
+# Renglones generados y escritos a la vez
+TAMANO_BLOQUE = 200_000
+
+# Capítulos de gasto y su peso en los extractos
+CAPITULOS = [1, 2, 3, 4, 5, 6, 7]
+PESOS_CAPITULO = [0.30, 0.20, 0.30, 0.12, 0.05, 0.02, 0.01]
+
+CONTROLES_OPERATIVOS = [0, 10, 20, 40, 50, 51]
+PESOS_CONTROL_OPERATIVO = [0.45, 0.20, 0.05, 0.05, 0.15, 0.10]
+
+# Partidas que el reporte excluye; se incluyen para ejercitar los filtros
+PARTIDAS_EXCLUIDAS = [39801, 39810]
+
+# Programas que no están en el catálogo del año
+PROGRAMAS_EXTRA = ['K025', 'R099', 'W001']
+
+
+def nombre_archivo(fecha, tipo):
+    """Nombre con la convención de los extractos: 15-MAY-2026_MAP.csv"""
+    return f'{fecha.day:02d}-{MONTH_NAMES[fecha.month - 1]}-{fecha.year}_{tipo.upper()}.csv'
+
+
+def _pesos_zipf(n, rng):
+    """Pesos decrecientes en orden aleatorio: pocas URs concentran los renglones"""
+    pesos = 1.0 / np.arange(1, n + 1)
+    rng.shuffle(pesos)
+    return pesos / pesos.sum()
+
+
+def _catalogo_partidas(rng, n_partidas=600):
+    """Claves de partida de 5 dígitos (capítulo, concepto, genérica, específica)"""
+    capitulo = rng.choice(CAPITULOS, n_partidas, p=PESOS_CAPITULO)
+    concepto = rng.integers(1, 10, n_partidas)
+    generica = rng.integers(0, 10, n_partidas)
+    especifica = rng.integers(0, 10, n_partidas)
+    partidas = pd.DataFrame({
+        'CAPITULO': capitulo, 'CONCEPTO': concepto,
+        'PARTIDA_GENERICA': generica, 'PARTIDA_ESPECIFICA': especifica,
+    })
+    partidas['PARTIDA'] = (capitulo * 10000 + concepto * 1000 + generica * 100 + especifica * 10 + 1)
+    partidas.loc[:len(PARTIDAS_EXCLUIDAS) - 1, 'PARTIDA'] = PARTIDAS_EXCLUIDAS
+    partidas.loc[:len(PARTIDAS_EXCLUIDAS) - 1, 'CAPITULO'] = 3
+    return partidas.drop_duplicates('PARTIDA').reset_index(drop=True)
+
+
+def _importes(rng, n, escala, prob_cero):
+    """Importes con dos decimales, sesgados a la derecha y con ceros"""
+    valores = np.round(rng.gamma(0.8, escala, n), 2)
+    valores[rng.random(n) < prob_cero] = 0.0
+    return valores
+
+
+def _repartir_mensual(rng, total, meses_activos=12):
+    """Reparte un total anual por renglón en 12 meses (ceros fuera de meses_activos)"""
+    pesos = rng.dirichlet(np.ones(12), len(total))
+    pesos[:, meses_activos:] = 0.0
+    return np.round(total[:, None] * pesos, 2)
+
+
+# ============================================================================
+# MAP
+# ============================================================================
+
+def generar_map(filas, fecha, semilla=0):
+    """DataFrame con el layout de un extracto MAP de `filas` renglones"""
+    rng = np.random.default_rng(semilla)
+    config = get_config_by_year(fecha.year)
+    denominaciones = config['denominaciones']
+
+    urs = np.array(config['urs_validas'])
+    programas = np.array(list(config['programas_nombres']) + PROGRAMAS_EXTRA)
+    partidas = _catalogo_partidas(np.random.default_rng(1000 + semilla))
+
+    ur = rng.choice(urs, filas, p=_pesos_zipf(len(urs), rng))
+    programa = rng.choice(programas, filas, p=_pesos_zipf(len(programas), rng))
+    partida = partidas['PARTIDA'].to_numpy()[rng.integers(0, len(partidas), filas)]
+
+    datos = {
+        'CICLO': np.full(filas, fecha.year),
+        'RAMO': np.full(filas, 8),
+        'UNIDAD': ur,
+        'DESC_UNIDAD': pd.Series(ur).map(denominaciones).fillna('').to_numpy(),
+        'PROGRAMA': programa,
+        'DESC_PROGRAMA': pd.Series(programa).map(config['programas_nombres']).fillna('').to_numpy(),
+        'PARTIDA': partida,
+    }
+    original = _importes(rng, filas, 2e5, 0.25)
+    modificado = np.round(original * rng.lognormal(0.0, 0.3, filas), 2)
+    ejercido = np.round(modificado * rng.uniform(0.0, 1.0, filas), 2)
+    congelado = _importes(rng, filas, 5e4, 0.85)
+    for prefijo, total, meses in [('ORI', original, 12), ('MOD', modificado, 12),
+                                  ('EJE', ejercido, fecha.month), ('CONG', congelado, 12)]:
+        mensual = _repartir_mensual(rng, total, meses)
+        for i, mes in enumerate(MESES_MAP):
+            datos[f'{prefijo}_{mes}'] = mensual[:, i]
+    return pd.DataFrame(datos)
+
+
+# ============================================================================
+# SICOP
+# ============================================================================
+
+def generar_sicop(filas, fecha, semilla=0):
+    """DataFrame con el layout de un extracto SICOP de `filas` renglones"""
+    rng = np.random.default_rng(semilla)
+    config = get_config_by_year(fecha.year)
+
+    # Claves tal como vienen en el extracto: URs vigentes, claves anteriores
+    # que se remapean y algunas que el reporte descarta
+    urs = list(dict.fromkeys(
+        list(config['urs_validas']) + [str(k) for k in config['mapeo_ur']] +
+        list(config.get('fusion_urs', {})) + ['999', 'X00']
+    ))
+    urs = np.array(urs)
+    programas = np.array(list(config['programas_nombres']) + PROGRAMAS_EXTRA)
+    partidas = _catalogo_partidas(np.random.default_rng(2000 + semilla))
+
+    idx_partida = rng.integers(0, len(partidas), filas)
+    datos = {
+        'CICLO': np.full(filas, fecha.year),
+        'RAMO': np.full(filas, 8),
+        'ID_UNIDAD': rng.choice(urs, filas, p=_pesos_zipf(len(urs), rng)),
+        'PROGRAMA_PRESUPUESTARIO': rng.choice(programas, filas, p=_pesos_zipf(len(programas), rng)),
+        'FUENTE_FINANCIAMIENTO': rng.choice([1, 2, 3], filas, p=[0.9, 0.07, 0.03]),
+        'ENTIDAD_FEDERATIVA': rng.integers(1, 33, filas),
+        'CONTROL_OPERATIVO': rng.choice(CONTROLES_OPERATIVOS, filas, p=PESOS_CONTROL_OPERATIVO),
+    }
+    for col in ['CAPITULO', 'CONCEPTO', 'PARTIDA_GENERICA', 'PARTIDA_ESPECIFICA']:
+        datos[col] = partidas[col].to_numpy()[idx_partida]
+
+    original = _importes(rng, filas, 2e5, 0.25)
+    modificado = np.round(original * rng.lognormal(0.0, 0.3, filas), 2)
+    avance = rng.uniform(0.0, 1.0, filas)
+    ejercido = np.round(modificado * avance * 0.7, 2)
+    devengado = np.round(modificado * avance * 0.2, 2)
+    tramite = np.round(modificado * avance * 0.1, 2)
+    tramite[rng.random(filas) < 0.8] = 0.0
+    reservas = _importes(rng, filas, 2e4, 0.8)
+    datos.update({
+        'ORIGINAL': original,
+        'MODIFICADO_AUTORIZADO': modificado,
+        'RESERVAS': reservas,
+        'EJERCIDO': ejercido,
+        'DEVENGADO': devengado,
+        'EJERCIDO_TRAMITE': tramite,
+    })
+    mensual = _repartir_mensual(rng, modificado)
+    for i, mes in enumerate(MESES_MODIFICACION):
+        datos[f'MO{mes}'] = mensual[:, i]
+    mensual = _repartir_mensual(rng, reservas)
+    for i, mes in enumerate(MESES_RESERVA):
+        datos[f'RESERVA_{mes}'] = mensual[:, i]
+
+    df = pd.DataFrame(datos)
+    # Vacíos como en los extractos reales
+    df.loc[rng.random(filas) < 0.01, 'DEVENGADO'] = np.nan
+    df.loc[rng.random(filas) < 0.01, 'EJERCIDO_TRAMITE'] = np.nan
+    return df
+
+
+GENERADORES = {
+    'MAP': generar_map,
+    'SICOP': generar_sicop,
+}
+
+
+def escribir_extracto(ruta, tipo, filas, fecha, semilla=0, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Escribe en ruta un CSV latin-1 de `filas` renglones, generado por bloques
+    para que la memoria no dependa del tamaño del archivo.
+    """
+    generador = GENERADORES[tipo.upper()]
+    temporal = f'{ruta}.{os.getpid()}.tmp'
+    escritos = 0
+    bloque = 0
+    with open(temporal, 'w', encoding='latin-1', newline='') as f:
+        while escritos < filas:
+            n = min(tamano_bloque, filas - escritos)
+            df = generador(n, fecha, semilla=semilla * 100_003 + bloque)
+            df.to_csv(f, index=False, header=(bloque == 0))
+            escritos += n
+            bloque += 1
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def obtener_extracto(directorio, tipo, filas, fecha, semilla=0):
+    """Ruta del extracto sintético; solo se genera si no existe ya en directorio"""
+    carpeta = os.path.join(directorio, f'{tipo.upper()}_{filas}_s{semilla}')
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, nombre_archivo(fecha, tipo))
+    if not os.path.exists(ruta):
+        escribir_extracto(ruta, tipo, filas, fecha, semilla)
+    return ruta
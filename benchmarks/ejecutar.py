@@ -0,0 +1,297 @@
+# ============================================================================
+# EJECUCIÓN DE BENCHMARKS: LECTURA, PROCESAMIENTO Y EXCEL
+# ============================================================================
+"""
+Uso, desde la raíz del proyecto:
+
+    python -m benchmarks.ejecutar
+    python -m benchmarks.ejecutar --filas 10000 100000 1000000 --reportes SICOP
+    python -m benchmarks.ejecutar --motores pandas arrow
+    python -m benchmarks.ejecutar --comparar benchmarks/resultados/A.json benchmarks/resultados/B.json
+
+Cada caso (reporte x renglones x motor) corre en un proceso aparte para que el pico de
+memoria (RSS) de un caso no contamine al siguiente. Los resultados se guardan
+en benchmarks/resultados/ como JSON, uno por ejecución.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import date, datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIR_DATOS = os.path.join(RAIZ, 'benchmarks', 'datos')
+DIR_RESULTADOS = os.path.join(RAIZ, 'benchmarks', 'resultados')
+
+FILAS_DEFAULT = [10_000, 100_000]
+REPORTES = ['MAP', 'SICOP']
+FECHA_DEFAULT = date(2026, 5, 15)
+MOTOR_DEFAULT = 'pandas'
+
+# Etapas medidas, en orden
+ETAPAS = ['lectura', 'procesar', 'excel', 'excel_detalle']
+
+# Cambio relativo a partir del cual --comparar marca una regresión, y
+# diferencia mínima para no marcar ruido en etapas muy cortas o pequeñas
+UMBRAL_REGRESION = 0.10
+DIFERENCIA_MINIMA = {'tiempos_s': 0.05, 'rss_pico_mb': 10.0}
+
+
+# ============================================================================
+# MEDICIÓN DENTRO DEL PROCESO DEL CASO
+# ============================================================================
+
+def rss_pico_mb():
+    """Pico de memoria residente del proceso hasta el momento, en MB"""
+    # Linux: VmHWM es propio del proceso; ru_maxrss se hereda del padre a
+    # través de fork/exec y mezclaría la memoria del generador de datos
+    try:
+        with open('/proc/self/status') as f:
+            for linea in f:
+                if linea.startswith('VmHWM:'):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS reporta bytes; el resto de los Unix, KB
+        return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except (ImportError, AttributeError):
+        return None
+
+
+def medir_caso(ruta, tipo, detalle=False):
+    """
+    Lee, procesa y genera el Excel de un extracto, midiendo cada etapa por
+    separado. El RSS de cada etapa es el pico acumulado al terminarla.
+    """
+    from csv_loader import leer_extracto
+    from result_cache import PROCESADORES, GENERADORES_EXCEL
+    from excel_detalle import generar_excel_detalle
+
+    tipo = tipo.upper()
+    tiempos = {}
+    rss = {'inicial': rss_pico_mb()}
+
+    inicio = time.perf_counter()
+    df = leer_extracto(ruta, tipo)
+    tiempos['lectura'] = time.perf_counter() - inicio
+    rss['lectura'] = rss_pico_mb()
+    registros = len(df)
+
+    inicio = time.perf_counter()
+    resultados = PROCESADORES[tipo](df, os.path.basename(ruta))
+    tiempos['procesar'] = time.perf_counter() - inicio
+    rss['procesar'] = rss_pico_mb()
+
+    inicio = time.perf_counter()
+    excel_bytes = GENERADORES_EXCEL[tipo](resultados)
+    tiempos['excel'] = time.perf_counter() - inicio
+    rss['excel'] = rss_pico_mb()
+    tamanos = {'excel': len(excel_bytes)}
+
+    if detalle:
+        inicio = time.perf_counter()
+        detalle_bytes = generar_excel_detalle(resultados, tipo)
+        tiempos['excel_detalle'] = time.perf_counter() - inicio
+        rss['excel_detalle'] = rss_pico_mb()
+        tamanos['excel_detalle'] = len(detalle_bytes)
+
+    return {
+        'registros': registros,
+        'registros_procesados': resultados['metadata']['registros'],
+        'tiempos_s': tiempos,
+        'rss_pico_mb': rss,
+        'bytes': tamanos,
+    }
+
+
+# ============================================================================
+# ORQUESTACIÓN
+# ============================================================================
+
+def _caso_aislado(ruta, tipo, detalle, motor=MOTOR_DEFAULT):
+    comando = [sys.executable, '-m', 'benchmarks.ejecutar', '--caso', tipo, ruta]
+    if detalle:
+        comando.append('--detalle')
+    salida = subprocess.run(comando, cwd=RAIZ, check=True, capture_output=True, text=True,
+                            env={**os.environ, 'SADER_MOTOR': motor}).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def _combinar(mediciones):
+    """Mejor tiempo y mayor pico de memoria de varias repeticiones"""
+    combinado = dict(mediciones[0])
+    combinado['tiempos_s'] = {
+        etapa: min(m['tiempos_s'][etapa] for m in mediciones) for etapa in mediciones[0]['tiempos_s']
+    }
+    combinado['rss_pico_mb'] = {
+        etapa: max((m['rss_pico_mb'][etapa] for m in mediciones if m['rss_pico_mb'][etapa] is not None), default=None)
+        for etapa in mediciones[0]['rss_pico_mb']
+    }
+    return combinado
+
+
+def _version():
+    """Commit actual (con marca si hay cambios sin commit), si hay git disponible"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        cambios = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=RAIZ,
+                                 capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f'{commit}-modificado' if cambios else commit
+
+
+def _entorno():
+    import numpy
+    import openpyxl
+    import pandas
+    return {
+        'python': platform.python_version(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__,
+        'openpyxl': openpyxl.__version__,
+        'plataforma': platform.platform(),
+        'procesador': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def ejecutar(filas=FILAS_DEFAULT, reportes=REPORTES, fecha=FECHA_DEFAULT, repeticiones=1,
+             detalle=False, semilla=0, directorio_datos=DIR_DATOS, motores=(MOTOR_DEFAULT,)):
+    """
+    Corre todos los casos y devuelve el dict de resultados (el mismo que se
+    guarda como JSON). Con varios motores, cada extracto se mide con cada uno.
+    """
+    from benchmarks.datos_sinteticos import obtener_extracto
+
+    casos = []
+    for tipo in reportes:
+        for n in filas:
+            ruta = obtener_extracto(directorio_datos, tipo, n, fecha, semilla)
+            for motor in motores:
+                mediciones = [_caso_aislado(ruta, tipo, detalle, motor) for _ in range(repeticiones)]
+                caso = {'reporte': tipo, 'filas': n, 'motor': motor, 'bytes_csv': os.path.getsize(ruta),
+                        **_combinar(mediciones)}
+                casos.append(caso)
+                print(_resumen_caso(caso), flush=True)
+
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'version': _version(),
+        'entorno': _entorno(),
+        'parametros': {'fecha_extracto': fecha.isoformat(), 'repeticiones': repeticiones,
+                       'semilla': semilla, 'detalle': detalle, 'motores': list(motores)},
+        'casos': casos,
+    }
+
+
+def guardar_resultados(resultados, directorio=DIR_RESULTADOS):
+    os.makedirs(directorio, exist_ok=True)
+    marca = datetime.now().strftime('%Y%m%d_%H%M%S')
+    ruta = os.path.join(directorio, f'{marca}_{resultados["version"] or "sin_git"}.json')
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+    return ruta
+
+
+# ============================================================================
+# REPORTE Y COMPARACIÓN
+# ============================================================================
+
+def _resumen_caso(caso):
+    partes = [f"{caso['reporte']:<5} {caso['filas']:>9,} filas {caso.get('motor', MOTOR_DEFAULT):<6}"]
+    for etapa in ETAPAS:
+        if etapa in caso['tiempos_s']:
+            rss = caso['rss_pico_mb'].get(etapa)
+            rss_txt = f'{rss:,.0f} MB' if rss is not None else 's/d'
+            partes.append(f"{etapa} {caso['tiempos_s'][etapa]:.3f}s ({rss_txt})")
+    return ' | '.join(partes)
+
+
+def comparar(anterior, nuevo, umbral=UMBRAL_REGRESION):
+    """
+    Compara dos resultados caso por caso. Devuelve las líneas del reporte y
+    el número de etapas que empeoraron más que el umbral (tiempo o memoria).
+    """
+    def llave(caso):
+        # Los resultados anteriores a los motores son todos de pandas
+        return caso['reporte'], caso['filas'], caso.get('motor', MOTOR_DEFAULT)
+
+    previos = {llave(c): c for c in anterior['casos']}
+    lineas = [f"{anterior.get('version')} -> {nuevo.get('version')}"]
+    regresiones = 0
+    for caso in nuevo['casos']:
+        previo = previos.get(llave(caso))
+        if previo is None:
+            continue
+        lineas.append(f"{caso['reporte']} {caso['filas']:,} filas ({llave(caso)[2]})")
+        for etapa in ETAPAS:
+            for medida, etiqueta, unidad in (('tiempos_s', 'tiempo', 's'), ('rss_pico_mb', 'rss', 'MB')):
+                antes = previo[medida].get(etapa)
+                despues = caso[medida].get(etapa)
+                if not antes or despues is None:
+                    continue
+                cambio = despues / antes - 1
+                marca = ''
+                if cambio > umbral and despues - antes >= DIFERENCIA_MINIMA[medida]:
+                    marca = '  <-- regresión'
+                    regresiones += 1
+                lineas.append(f'  {etapa:<14} {etiqueta:<6} {antes:>10.3f} -> {despues:>10.3f} {unidad:<2} ({cambio:+.1%}){marca}')
+    return lineas, regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks de lectura, procesamiento y Excel MAP/SICOP')
+    parser.add_argument('--filas', type=int, nargs='+', default=FILAS_DEFAULT)
+    parser.add_argument('--reportes', nargs='+', default=REPORTES, type=str.upper, choices=REPORTES)
+    parser.add_argument('--fecha', default=FECHA_DEFAULT.isoformat(), help='fecha del extracto (AAAA-MM-DD)')
+    parser.add_argument('--repeticiones', type=int, default=1)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--motores', nargs='+', default=[MOTOR_DEFAULT], choices=['pandas', 'arrow', 'polars'],
+                        help='motores de agregación a medir sobre los mismos extractos')
+    parser.add_argument('--detalle', action='store_true', help='medir también el Excel de detalle')
+    parser.add_argument('--salida', default=DIR_RESULTADOS, help='directorio de resultados JSON')
+    parser.add_argument('--comparar', nargs=2, metavar=('ANTERIOR', 'NUEVO'))
+    parser.add_argument('--umbral', type=float, default=UMBRAL_REGRESION,
+                        help='cambio relativo que --comparar marca como regresión')
+    parser.add_argument('--caso', nargs=2, metavar=('TIPO', 'RUTA'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.caso:
+        tipo, ruta = args.caso
+        print(json.dumps(medir_caso(ruta, tipo, args.detalle)))
+        return 0
+
+    if args.comparar:
+        with open(args.comparar[0], encoding='utf-8') as f:
+            anterior = json.load(f)
+        with open(args.comparar[1], encoding='utf-8') as f:
+            nuevo = json.load(f)
+        lineas, regresiones = comparar(anterior, nuevo, args.umbral)
+        print('\n'.join(lineas))
+        return 1 if regresiones else 0
+
+    resultados = ejecutar(
+        filas=args.filas, reportes=args.reportes, fecha=date.fromisoformat(args.fecha),
+        repeticiones=args.repeticiones, detalle=args.detalle, semilla=args.semilla, motores=args.motores,
+    )
+    print(f'Resultados: {guardar_resultados(resultados, args.salida)}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
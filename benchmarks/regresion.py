@@ -0,0 +1,350 @@
+# ============================================================================
+# REGRESIÓN DE RESULTADOS: IMPLEMENTACIÓN DE REFERENCIA VS CANDIDATA
+# ============================================================================
+"""
+Uso, desde la raíz del proyecto:
+
+    python -m benchmarks.regresion                      # HEAD vs árbol de trabajo
+    python -m benchmarks.regresion --referencia 1f6e7fa
+    python -m benchmarks.regresion --referencia ../otra_copia --corpus ruta/extractos
+    python -m benchmarks.regresion --referencia HEAD --motor arrow
+
+Procesa el mismo corpus de extractos con las dos implementaciones, genera los
+Excel y compara todos los valores de los resultados (totales, subtotales,
+categorias, programas, capitulos_por_ur, partidas_por_ur, congelados,
+resumen...) y todas las celdas de los libros. Los importes se comparan al
+centavo y los porcentajes de forma exacta. Sale con código 1 si hay diferencias.
+"""
+
+import argparse
+import datetime as dt
+import glob
+import hashlib
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIR_DATOS = os.path.join(RAIZ, 'benchmarks', 'datos')
+DIR_CORPUS = os.path.join(DIR_DATOS, 'corpus_regresion')
+DIR_GOLDEN = os.path.join(DIR_DATOS, 'golden')
+
+# Corpus sintético: (reporte, fecha del extracto, renglones, semilla).
+# Cubre ambos años de configuración, cierre de año anterior, diciembre
+# (periodo anual) y meses intermedios.
+CORPUS_SINTETICO = [
+    ('MAP', dt.date(2025, 9, 30), 4000, 1),
+    ('MAP', dt.date(2026, 2, 10), 4000, 2),
+    ('MAP', dt.date(2026, 5, 15), 4000, 3),
+    ('MAP', dt.date(2026, 12, 31), 4000, 4),
+    ('SICOP', dt.date(2025, 2, 10), 4000, 5),
+    ('SICOP', dt.date(2025, 12, 31), 4000, 6),
+    ('SICOP', dt.date(2026, 1, 31), 4000, 7),
+    ('SICOP', dt.date(2026, 5, 15), 4000, 8),
+    ('SICOP', dt.date(2026, 12, 31), 4000, 9),
+]
+
+# Llaves del resultado que no se comparan (el cubo es un índice interno de
+# arreglos; sus consultas deben coincidir con los dicts que sí se comparan)
+LLAVES_EXCLUIDAS = {'df_procesado', 'config', 'cubo'}
+
+TOLERANCIA_IMPORTE = 0.005   # al centavo
+TOLERANCIA_PORCENTAJE = 1e-9
+
+MAX_DIFERENCIAS_MOSTRADAS = 40
+
+
+# ============================================================================
+# CORPUS
+# ============================================================================
+
+def corpus_sintetico(directorio=DIR_CORPUS):
+    """Genera (una sola vez) los extractos del corpus sintético"""
+    from benchmarks.datos_sinteticos import obtener_extracto
+    return [obtener_extracto(directorio, tipo, filas, fecha, semilla)
+            for tipo, fecha, filas, semilla in CORPUS_SINTETICO]
+
+
+def tipo_extracto(ruta):
+    return 'MAP' if 'MAP' in os.path.basename(ruta).upper() else 'SICOP'
+
+
+def _hash_corpus(archivos):
+    h = hashlib.sha256()
+    for ruta in archivos:
+        h.update(os.path.basename(ruta).encode())
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(1 << 20), b''):
+                h.update(bloque)
+    return h.hexdigest()[:16]
+
+
+# ============================================================================
+# CAPTURA (corre dentro del árbol a evaluar)
+# ============================================================================
+
+def normalizar(valor):
+    """Convierte resultados (DataFrames, numpy, fechas...) a JSON comparable"""
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(valor, pd.DataFrame):
+        return {'columnas': [str(c) for c in valor.columns],
+                'filas': [normalizar(fila) for fila in valor.to_dict('records')]}
+    if isinstance(valor, pd.Series):
+        return normalizar(valor.to_dict())
+    if isinstance(valor, dict):
+        return {str(k): normalizar(v) for k, v in valor.items() if k not in LLAVES_EXCLUIDAS}
+    if isinstance(valor, (list, tuple)):
+        return [normalizar(v) for v in valor]
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return repr(valor)
+    if isinstance(valor, (dt.date, dt.datetime)):
+        return valor.isoformat()
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return valor
+    return str(valor)
+
+
+def celdas_libro(excel_bytes):
+    """{hoja: {celda: [valor, es_porcentaje]}} de todas las celdas con valor"""
+    import io
+    from openpyxl import load_workbook
+
+    wb = load_workbook(io.BytesIO(excel_bytes), read_only=True)
+    hojas = {}
+    for ws in wb.worksheets:
+        celdas = {}
+        for fila in ws.iter_rows():
+            for cell in fila:
+                if cell.value is None or not hasattr(cell, 'coordinate'):
+                    continue
+                celdas[cell.coordinate] = [normalizar(cell.value), '%' in (cell.number_format or '')]
+        hojas[ws.title] = celdas
+    wb.close()
+    return hojas
+
+
+def _leer(ruta, tipo):
+    """Lee con el csv_loader del árbol evaluado, o como lo hacía app.py antes de él"""
+    try:
+        from csv_loader import leer_extracto
+    except ImportError:
+        import pandas as pd
+        return pd.read_csv(ruta, encoding='latin-1', low_memory=False)
+    return leer_extracto(ruta, tipo)
+
+
+def capturar(raiz_arbol, archivos):
+    """
+    Procesa el corpus con el código de raiz_arbol y devuelve la captura
+    normalizada. Debe correr en un proceso propio: importa los módulos del
+    reporte desde raiz_arbol.
+    """
+    # Solo el árbol evaluado: sin la raíz del candidato (cwd de -m), un
+    # árbol de referencia sin csv_loader importaría el del candidato
+    raiz_arbol = os.path.abspath(raiz_arbol)
+    sys.path[:] = [raiz_arbol] + [p for p in sys.path if p not in ('', RAIZ, os.getcwd())]
+    from map_processor import procesar_map
+    from sicop_processor import procesar_sicop
+    from excel_map import generar_excel_map
+    from excel_sicop import generar_excel_sicop
+
+    procesadores = {'MAP': (procesar_map, generar_excel_map), 'SICOP': (procesar_sicop, generar_excel_sicop)}
+    captura = {}
+    for ruta in archivos:
+        tipo = tipo_extracto(ruta)
+        procesar, generar_excel = procesadores[tipo]
+        nombre = os.path.basename(ruta)
+        entrada = {}
+        try:
+            resultados = procesar(_leer(ruta, tipo), nombre)
+            entrada['resultados'] = normalizar(resultados)
+        except Exception as e:
+            entrada['resultados'] = {'error': f'{type(e).__name__}: {e}'}
+            captura[nombre] = entrada
+            continue
+        try:
+            entrada['excel'] = celdas_libro(generar_excel(resultados))
+        except Exception as e:
+            entrada['excel'] = {'error': f'{type(e).__name__}: {e}'}
+        captura[nombre] = entrada
+    return captura
+
+
+def _capturar_aislado(raiz_arbol, archivos, motor=None):
+    """Captura en un proceso aparte; motor fija SADER_MOTOR solo para ese proceso"""
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        salida = f.name
+    entorno = {**os.environ, 'SADER_MOTOR': motor} if motor else None
+    try:
+        subprocess.run(
+            [sys.executable, '-m', 'benchmarks.regresion', '--capturar', raiz_arbol, salida, *archivos],
+            cwd=RAIZ, check=True, env=entorno,
+        )
+        with open(salida, encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(salida)
+
+
+# ============================================================================
+# ÁRBOL DE REFERENCIA
+# ============================================================================
+
+def _git(*args):
+    return subprocess.run(['git', *args], cwd=RAIZ, capture_output=True, text=True, check=True).stdout.strip()
+
+
+def captura_referencia(referencia, archivos, usar_cache=True):
+    """
+    Captura de la implementación de referencia: un directorio con otra copia
+    del proyecto, o un commit/rama de git (se extrae a un worktree temporal).
+    Las capturas de commits se guardan en benchmarks/datos/golden/ por
+    commit, corpus y fecha (los libros llevan la fecha del día).
+    """
+    if os.path.isdir(referencia):
+        return _capturar_aislado(referencia, archivos)
+
+    commit = _git('rev-parse', '--verify', f'{referencia}^{{commit}}')
+    ruta_golden = os.path.join(
+        DIR_GOLDEN, f'{commit[:12]}_{_hash_corpus(archivos)}_{dt.date.today().isoformat()}.json'
+    )
+    if usar_cache and os.path.exists(ruta_golden):
+        with open(ruta_golden, encoding='utf-8') as f:
+            return json.load(f)
+
+    worktree = tempfile.mkdtemp(prefix='sader_referencia_')
+    try:
+        _git('worktree', 'add', '--detach', '--force', worktree, commit)
+        captura = _capturar_aislado(worktree, archivos)
+    finally:
+        try:
+            _git('worktree', 'remove', '--force', worktree)
+        except subprocess.CalledProcessError:
+            pass
+        shutil.rmtree(worktree, ignore_errors=True)
+
+    os.makedirs(DIR_GOLDEN, exist_ok=True)
+    with open(ruta_golden, 'w', encoding='utf-8') as f:
+        json.dump(captura, f, ensure_ascii=False)
+    return captura
+
+
+# ============================================================================
+# COMPARACIÓN
+# ============================================================================
+
+def _numero(valor):
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool)
+
+
+def _iguales(a, b, es_porcentaje):
+    if _numero(a) and _numero(b):
+        tolerancia = TOLERANCIA_PORCENTAJE if es_porcentaje else TOLERANCIA_IMPORTE
+        return abs(a - b) < tolerancia
+    return a == b
+
+
+def diferencias(a, b, ruta=''):
+    """Lista de (ruta, referencia, candidata) con todos los valores distintos"""
+    if isinstance(a, dict) and isinstance(b, dict):
+        difs = []
+        for llave in list(a) + [k for k in b if k not in a]:
+            sub = f'{ruta}.{llave}' if ruta else llave
+            if llave not in a:
+                difs.append((sub, '<no existe>', b[llave]))
+            elif llave not in b:
+                difs.append((sub, a[llave], '<no existe>'))
+            else:
+                difs.extend(diferencias(a[llave], b[llave], sub))
+        return difs
+    if isinstance(a, list) and isinstance(b, list):
+        difs = []
+        if len(a) != len(b):
+            difs.append((f'{ruta}.len', len(a), len(b)))
+        for i, (x, y) in enumerate(zip(a, b)):
+            difs.extend(diferencias(x, y, f'{ruta}[{i}]'))
+        return difs
+    return [] if _iguales(a, b, 'Pct' in ruta) else [(ruta, a, b)]
+
+
+def comparar_capturas(referencia, candidata):
+    difs = []
+    for archivo in list(referencia) + [k for k in candidata if k not in referencia]:
+        ref = referencia.get(archivo, {})
+        cand = candidata.get(archivo, {})
+        difs.extend(diferencias(ref.get('resultados'), cand.get('resultados'), f'{archivo}:resultados'))
+        # Celdas: {hoja: {celda: [valor, es_porcentaje]}}
+        hojas_ref = ref.get('excel', {})
+        hojas_cand = cand.get('excel', {})
+        if 'error' in hojas_ref or 'error' in hojas_cand:
+            difs.extend(diferencias(hojas_ref, hojas_cand, f'{archivo}:excel'))
+            continue
+        for hoja in list(hojas_ref) + [h for h in hojas_cand if h not in hojas_ref]:
+            celdas_ref = hojas_ref.get(hoja, {})
+            celdas_cand = hojas_cand.get(hoja, {})
+            for celda in list(celdas_ref) + [c for c in celdas_cand if c not in celdas_ref]:
+                ruta = f'{archivo}:excel:{hoja}!{celda}'
+                if celda not in celdas_ref:
+                    difs.append((ruta, '<vacía>', celdas_cand[celda][0]))
+                elif celda not in celdas_cand:
+                    difs.append((ruta, celdas_ref[celda][0], '<vacía>'))
+                else:
+                    (valor_ref, pct_ref), (valor_cand, pct_cand) = celdas_ref[celda], celdas_cand[celda]
+                    if not _iguales(valor_ref, valor_cand, pct_ref or pct_cand):
+                        difs.append((ruta, valor_ref, valor_cand))
+    return difs
+
+
+def _corto(valor, largo=100):
+    texto = repr(valor)
+    return texto if len(texto) <= largo else texto[:largo - 3] + '...'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compara resultados y Excel de dos implementaciones')
+    parser.add_argument('--referencia', default='HEAD', help='commit/rama de git o directorio (default: HEAD)')
+    parser.add_argument('--candidato', default=RAIZ, help='directorio a evaluar (default: árbol de trabajo)')
+    parser.add_argument('--corpus', help='directorio con extractos *.csv (default: corpus sintético)')
+    parser.add_argument('--sin-cache', action='store_true', help='no reutilizar capturas guardadas de la referencia')
+    parser.add_argument('--motor', help='motor de agregación del candidato (pandas, arrow, polars)')
+    parser.add_argument('--capturar', nargs='+', metavar=('RAIZ', 'SALIDA'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.capturar:
+        raiz_arbol, salida, *archivos = args.capturar
+        captura = capturar(raiz_arbol, archivos)
+        with open(salida, 'w', encoding='utf-8') as f:
+            json.dump(captura, f, ensure_ascii=False)
+        return 0
+
+    if args.corpus:
+        archivos = sorted(glob.glob(os.path.join(args.corpus, '*.csv')))
+    else:
+        archivos = corpus_sintetico()
+    if not archivos:
+        parser.error('el corpus no tiene extractos')
+
+    referencia = captura_referencia(args.referencia, archivos, usar_cache=not args.sin_cache)
+    candidata = _capturar_aislado(args.candidato, archivos, args.motor)
+    difs = comparar_capturas(referencia, candidata)
+
+    n_celdas = sum(len(celdas) for entrada in candidata.values()
+                   for celdas in entrada.get('excel', {}).values() if isinstance(celdas, dict))
+    print(f'{len(archivos)} extractos, {n_celdas:,} celdas de Excel: {len(difs)} diferencias')
+    for ruta, a, b in difs[:MAX_DIFERENCIAS_MOSTRADAS]:
+        print(f'  {ruta}: {_corto(a)} -> {_corto(b)}')
+    if len(difs) > MAX_DIFERENCIAS_MOSTRADAS:
+        print(f'  ... y {len(difs) - MAX_DIFERENCIAS_MOSTRADAS} más')
+    return 1 if difs else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,7 +2,13 @@
 # CONFIGURACIÓN GLOBAL PARA SADER REPORTES
 # ============================================================================
 
+import calendar
+import re
+import warnings
+from collections.abc import Mapping
 from datetime import date, timedelta
+from functools import lru_cache
+from types import MappingProxyType
 from dateutil.relativedelta import relativedelta, MO
 from decimal import Decimal, ROUND_HALF_UP
 try:
@@ -11,12 +17,6 @@ except ImportError:
     def num2words(n, lang='es'):
         return str(n)
 
-# ============================================================================
-# LOGO BASE64
-# ============================================================================
-
-LOGO_BASE64 = """iVBORw0KGgoAAAANSUhEUgAAAcYAAABbCAMAAADeM9UyAAAAAXNSR0IArs4c6QAAAAlwSFlzAAAXEQAAFxEByibzPwAAAIRQTFRFR3BMYT40oYMsSR0xoYMuRhwwooQuQx0uoYQtQR4uooQtRhwvooQtQh0uooQtShsxooMtRxwwooQtooMtWhY2JSUlooQtWxY2JSUlooMtooQtWhY2JSUlooQtWxY2JSUlooQtWxY2JSUlWxY3JSUlpIUuWxY3JSUlWxY3Xxg5Wxc3JycnIa3V3QAAACl0Uk5TAAMJCxIWHiMqMjY/Q0pQWV5ma3d4eIONj5GgpKqyusbJ0drl6ery9Pnr4LqIAAAaIElEQVR42uzXgWrrOBAF0CtZ0VMmymQyUxSk4pBSGuL8/wfumqSFR2Gb5bnwXHw+wJh7mfEYi8VisVgsFovFYrFYfC/nHQDvlyTmyodIsRRL4FKSI45LJnPjPJilj5VzoxaoUrUCYBnLGfGRGicJLRRBbRWxp54TgFTCEs88BM8W60kVLZmi1orUe+kDAH4LyMt2nQFXzUlK1p+SsTapqXIxCX0GvJ2CvuXo8XfoMJ3VZv+06/BjcPOJiUNTrWISEYWDWAkAWZNTQa0Jf4Ht8/F57zCJ9eF4GYZhj5/ABQBoAk1GPoXocedjAGLR3lrilkvC/+FW2/3GYVLd4Tz86+CmKPH5dRiu1+tw7DB/nksAQD1bpIBPXMpcaugrU7SEh3VPr9fr5YApucMt+PN6grEeSxwNLyvMX66384UL4UPknFPAnVOrxozUc3x8bsaUhssGE9pe78lv8ccOw/Xm8gNqDDHUvjf3+9WaamZhMX0/bGJVCo6b1YjH7O+BP2NCx/foN/hj65fxYZ+X6m7fYW6itpKIGuGDC8rSKAsnomySPUbcJPcteSI8YnVPfHhdYzr35IfjaorRPn+uEW5znuHJYxRqI7WIGwcPskxcNZGoFiKxjFEouQpCK3jE5nK9GQ6TT+PwusEUDsPnGrvjMBwwN6ZAFU64CUQleTUWsV64JFNm0moEwKVTCs1i9Pja0xjR5AfEbrxTLy9bTGJ9ve/9Dh+2l/nVmHLuxQsDIQJAEiMTSjEXJulZJbMa53YyD8CzNMutqcdXunFubobd1H+NK0zj1/lTjeN7z61GstpKKxIQRQFE07G+UksOxlyMKrGwZOYkEQC05pN4UYcvrC/Xd8PRYTIOo6lrdL8tkeEJc5L6DG6JPLiqBsQqpdTExRrnrJQaF1IVzcTKmgAgVAFE3UOfnftAXtaYzvfWuL98T43OdZ3D94i1z9AM0FuVFMKpF65CapVJVTPXrHksVUnE2AgAjIGAr6zGk/Jy/u8j59d6u9vvNutfKweMun/Yudo1N3GeLRO+McbYjKhMncKySWF6/uf3hi8nDNNpO0+ud//03p3diQEjdCNZkjWJkhP8GqfodBjJq7quqzxibwWJkuDNuUEUsfdpDOrX8f1VgAXR/aZO2Ah+B0FSNudzdz7XhbvguRBW6xBAtUalLDVCSImCoxYSUQitlSKutAyllAqX8kCsYhZylcKHKKa3ui6u40+DnFPRdK/jhKE/N3VVllXd9K8b40Geb7otqtvh+wxJde6a6M1U13FB3+QPVe+iqs/99Zzch/Kybrq+r9g7NAZlt6W6N2Gqqq6LeTzKy6rprtfmLkM0zdxdu+w+kmfuWN3UZeCEK8+v44auejqRXhp6EFs1sYlChCGiNi0JgZhqraRRSpBGThInk1SaJMWzW0VNbQwfgTXj69ifoFn0MpTHfOT2cC6WfUDHlpJ1N1xnRoNqIbtLNsb66WP1Zqp1ktt/N22zsru+LmONqw52K919cKQx6w4C9dFkod11mWYzUhY1/bDOzJaRrLnJW81T1ou855WvoJlmvf90OTwXDFtjcA46Y4yFUEoaUq0USiLpG2KDmqsYDaUoETWSIh+AcR9/wSIk/RLvZYPT0x5FPy76Gu66c+FQMhnXUsbLO1f3PE1vdjedvy8NlddZP33XdZML2DQYOFbG88a3u9kQHWhkLrR2GPvElf8mVG7ddzOzmcTzJO98duHkPZ/uAfvYN1VVd/P4tXwui+Arkst6x8hI5EoKqbgvtTGatOCKrJImRRXPG5CEhIiT3NwKABH/Imm8JttTHCvZ2cziODRVWT2qbxzLJTdc84CJog0lQLXpaLjTWM3c9VVygqA4jxsrLre/c86Cbhu6Bkcam8m+nByOiuAuX+FSy21ovlM5rKfXQTXcp8jv2XOTrEXmWfYCngiufZ/SNYAPpZDWGq1DSK0gHUuFUpGdPCtZjohGGUOEhgOA0h7/0K2eunFNxqpV79UhAJpfTLbEFSuGoatOjyXr800rj2RU7kO9W4THcwLsrqnBae3NzbN+M+0jjRCV9XmNyfquvw7DcC3mkzby70X+aidG416O7vVB3noxxs0w3ZmTq34ekGLwKAQHQdoqCVxJqQQaFEhcm1SjVoREM4+GjAfgoU6tZj78DPkkbbl419cZXXCs8AyVe7plAY2i6SyW9Hc/Ow79sHkp5izD0ciifnSs3Cu55fa7syJH+vp+nI403pkfqyAIIheIZtfNhA9VvHIpzW487+Rttlfg7oqi67Ork7Ehg5yzxyHZEo+VRm20RsI0RqM5yVjTzKM2BmkOiVJPWq4FHOF4GbtoVkzjVLkz1nW1WxD1+zgo751n6oqo6FYPt6plp4l5+iF/s6+yHi3G/W7IsgA63o40QrkcLg6P4+R1a//DicXVyXu+yduPdxr70VU/FuN0Ez0HsfJibTkwDxZ4ClUrmVAaSZCyKDUnJXD6BQ0qREIyRDacrr4Q5+9b4yZ88/PtqsRR4eLanTKdW13ehWx7h505bZEqS67Oad3Ncxxr50NdPONmdnO9R2N1oHEb3d3Grfm549ltvMxr+2apUbdvEalHV9h/DgRnDGLPQy3CxTqVaBXzlVRKkw6V0FZIQagkaoVGoZQtCatIAQAXQsmYfRDgDPmd0rcLQrHGLDsTcq7RuSn3vM3ooqRgPVJtajksvHXfd5mzmbe3rn6Lxhx2KDcTPlh1tsq77clF7uDyO8ubpjod9gsKeBJ8TJXVPvhkCLkPoZW8VQASSWEqpDBkjBTUKklI2nJFIhSCa9NeUgAmLGmKf14Vd46DNccgp3pLY+HC+73Pau6JwlCtwZGj0X0adlpnywrrrHFffCg/QaPj/uhnV4mz3TOyfEpfHVXsOFP5NBrJtBIFQCwUoQJE3koAUDhHNFZZ0oJLpQVKVBp5GnOthY01GgUQog8gxM93Y+/PXB62Zreh6lc0utCwPJ9XrZx2NObD/jqnNyeIu/OexupA486bv6Gxdhd9SKMThFVds5viONOzkAo/1fFSzVE6NWJmkUlFShlttdZaKRQpajRpKIRRAo00CkMZAoQ6TZWJ4SeyOnfjvOrjCOSr8t4ot4s2HjZv6PQfbLa9p7Ea3QL6Dlh+2IZiv0WjE9WNHmzo/B6N52An7x7sFERl//pcGgX3QEpvjXa0JFJrTwcpRDKKyEiDJLWMU0kiJUqlEdooTny6hiylPw1wdo7svAWX7E3c3Uf7EOfs7azxENEdrbHeOc0DisOaBtWvaHRe4Gh6xS9pZHCAq+42XT/5jufSqFPFhV4plSq1JPxZo2iNVsZYnWpNxqo01BhqCkMjPVRhq0KJE93Sj+m4e+xcZl8mK4puFb4P3uqlhi0x273tLnPcdzodrfHUfGyNu4Xw8zSyVdz8VzQ2P3EKa1XWVYmetjZ6hEZzBRN8qbnfKsX9MAyZIE6tEpQqJCKdcj9WimtKYyNCirkNY8MAhI5bxKNXdUHc0K8YHqtpjrflnDmIY1k3HtKyn3UBBzsazx/3rFZPoNHd5pM0snwpuN5+huv1yTT6UqGxEsDzwEelAG0ap1KT9n0tpZBKIxotdYwKWIxakUCUGlNCZn2AVFuKMYQDNorcLsGhCeAxMTyXedFcFzLuWmK/T+NHTSLsz2lsFlH2NAZbdvEJGoNmGOd06dxURZ41bpV9HrwQQOnpR6rYWCW4SFGFSJIMTiCDnDQAhNbGZFAikTThHNqk0mMfdps5OBqv2aFTx50w9gXAH1qj83Y1g3dR/ymN7H0au8/S6OqBTX7aJxxPRqrj0FNaKF9ojWQ4xgpJG9KotZaSlAyn0y5ct0YikqbUhPBzRIuHHK4Ow76e7Tp9Hwgeh3MG8KfW6F6ZQ635dPocjacPaczBgf0ejafGLR4LymfTyGKhGcBke8CUljF4gibehJLaGlJSk0xRKylSD0DpsDVKIWqUxAB8z9fx+73ia2kxWBHlza605vLyq1v3+3O5J+x3aSz3Fda7rS9X1sdItf6YxnVdf5/G4mHo92gsXvfjz7fGsL1YABCIioGnpQROlmKSREoSSYNcCSSNqdA6BC/0jCZEIj27WSl4q1T6XgVnSQHYIdJbxHd66Yu8am6oq0OHiiu/fESjW4eP5lPPuYwLWB5Lrs2exv5A47GKwzbOql1S9Ts0Lhdeo/vtn0wjl6Y1KYDHJUoAzTWXrTGWpySFkkJoQcoYaUgLScgn5qRuVWu1EQCeMmjJ4jt9je5tPjy0M6/yviXP2JxGvGkby34zb3RLbJfAHdWwppLVwecG3YfW6Fg+vpruLFc++nXeGL19jKB/bqTK2gteLnxOAFELIbTPFAlrNEnUklAqacgYrcikhJqUD54ftty2yvKJRkvGav1uVHF0hs2u05HNVnItTkGSV82562/oznUe7aLdX1qjI2qJkNyuV+3sojzuN+7z72g4RKqPfLC8OrlRV65wI0caT0enckN32vnUZ1ojkmrRg6UeY0yKc46YatQ0GSAqpdEI0lbEAg1qxBSAGaGsvEgApiySQXXQcn9s83T6XNTrlHBtzsP4iM5FAvlCYx/A8QaORsfqPPDalEkUJUXdj65PIru6vf796WN1aP7fhdnDto84RI/ar/fF2juN+a4B8NCqkrnPT6ZRtIYu1l8rATGnVMrYnz6nqJEQtVRSa8MpTRVqQ1qjYKAkN3yiEdLWGmvjd4zxIxpfr/n60TW8OLhmKHfCe23K2Zv2muJ+9Wvfdf0wLu5gz1qz9my45oFq34yx6d9Jdq2iIGuuCzGu92aomKPD0Xjneeijo1O9u3yv7J9dxeEXKy+zLfnGAo+1VQCxnLcQfSLkpHyS3KSpElrNkY1C5aciNnErAfxYttYKcNhZUQNHp+qC1Ucb2rPpzMLFRMfHrR961pyDXnHPQZPD9nOVJVm1qHG/z7W/UbLZy+u1v7o+ylO3jZ6LJMmbq5sn2R/PDwWtVdq6LOupqe/ZTjUkMp5MZxp9KYSVsReTnusyk1WGPsScc01KKK1QE83bVV6IYSsA5EUaLT3YgUXdsQ/Ovc2OKKf7ccIw62s7OhTOZx28lFPYhGHrEHVdIg5jnz+Yg2P4dc1uDmmnW/b2L9xjj0/5Oj6MTtjRuLqE4+JYLNdttx7785OLcb5oEWenyCyJMEylRS516oEDk2RQEXKFChENKYHKD+M2ndNNkhaPyYZzecew5O5Qin5xgnN9KkuyvL4+tkp5iy6P9RnXEvW4V3yqh3HXItll4FC6Q6uvdKGo8x371TFxY84Zru5hd4uy2xIO99xO/OM3FbjLomJ8rlM11ihrZtJUi1yHhL5IbQxhTHpt0PG10qgkSDRKoUTDtQ2BL0tqKJSVsEPi3tlrtNP9Ts3nxXONXRmcgDG3+N/VGTyo8p29hsOrMhefN/vu630P3mLqjuDS0XifbBeGFFdneI9/NNA8TDM0ASxF+THbUz+88UOM1f0k2ipZ9OwqDpOWcNtn8qxV3MZCGOQcW0PCSGB+KKVETEUKQimhteBaTu42BvB5Gmt2iCK3yHM4Bzt6u9fRoS9OzXjcXao3Gtn8djvkh7fbzbPbCjpPjaXX7lxFsEfW9KtLO1cBQN4P1+vQFyvFDl2yfynG67k67Ta9toe7ngsGUM9lxi5aI6cNjkaH7Cba8Dr05zrZHMB4LZ74RY0yjlcm4jCW1ktDHsbcagBhTEqGLkITtUYjhzD1wrm2Cpw8AG3JoucdcvOsKMqyKLLgDb95Ua4oEsiGY90FysfYIyiqekFxenOH20zFDeW+8sPYKcnyPIsYOLhDSVk3TV3mwfwxySYskVRWVnVdVdW+kHS6DZeHZ4Agr+Z5MjZ/yiasV0XlJm/+jgDBTbQsOa1z5zdkJ3gapCXSzqRkS7EUoKQNYzn905IgQ9a2F31pJ8JECH5KCrUP3LbUIsnP/Q1pNbr+jDsaFxw9/W9V2fzDnvHXsIx9Qo7DFAyeBsbbVlJ78WGCD34obItKEQGEPo9T7XG6XChOddsairluSUil5gIetWRvEPAp1OORr3JYQ4S/X973Z+DtRdvWsplToVOAWAnJZctBEI+59i+tECKVfijVRRsbpyblKCRAaNCQscaDT8DtgUTgENXDuAY4f4n5MzC6XJBaNfOILcYxAGgUeLGkwjDW3CCEcRgDGCRtVJoqa/icU14IjTEaPgXXBFzn0bSPlZTnfpxH/rL4Cai2lepi43Tu6RCCZAyauI9CX6y9oFY+yJCLEC2XRqWSg05nDxyb1hhrQ/gkypW1uV/nOv22JmPsLyt/jtjOpRi57iJrVEqhgDma4RpI+J7PJbZWKSkplqm8kA/gWxO21loOnwUr3Xfu3f/fV9FfSj4F2aKlFmGGn2KYylgrz+Oh53ueESq1hrThs/Vhe2ll7AF42AoTxz78D0jqfhhXzFbZFBH8tcXPgTHRGpMuLBpUPATwFFctKVQphYDIzdzpQVJpaSQAeByAGxQp/G8I8ro5dzecz02VB38p/Dw8ScZqIWQI4BNxqVEAeILiWMnUGLykqbah54UxlyoFNrEsQYgULwSfwfGbTQ5fd8JO7I+SOnfR0+FmPp3YH5z9/w4m2hY1XS4CAOJ4dqyaATce00pzIaUHkrhGI9C2YiJeW6GtBj8N3+Ulf3lJTh/a/9uBL9/y/cDLtwQekb3kb3Pu5J8S9ii/5W7yXyAryzL5fWW/fMvg67cIHFhwm+BnZZjk2wv8B4h9Dy94URTDEoNyzUASg5S0SuddZOOlxshQ8olFNDdYHTJw2HHy49/v/0QfeNIvGeyRfSsY7PD1x45X9u3HvwHskXwt3ir7RwnB1wQ+gpv/339/fI3gN/HlJs4/3x9Pz79///eHI3aP7MdX+C/APNUatBc9O1llUaiYGx8YSVIIANxAaoRO154BNMYaQyG8h+jHtyQvGAQvX8oTQFB+eYlOZZJ9iSD/8iWB08uPr2XAii/T4eAlKl6C27+QvHx5WRnIvpRfv2fAituV68j3f76Xy5HsNpbnyZckeMkAkukm0e3C6CW/0ViwL7fJT8ntnGkwK27DLJ/vdEN+Gw5eioXGMr+deoLTJN4yT7TJUOTJSxaUN8nYLMNC47d/Izg5kfIfX7OvP14gm0VPIM9vtzrND/Wf0Qihba1qLziXHTmKUP1fe2fb8rgKhOGx1rU27ykRDYpBLH7w//+/M2PS7lnYPQd2WcqyuUubNurMdK7e9MlTSMZ+vV2g1w/y6GW0X3qtrb7Atb1axLhZ60f2fYw5kdtEyDEbJlwppZMppqKGFGNqZColKh5SLAaagtOkKw0sOZbdw10qKaW6J8WdrElTDACKRqijOLdraHksJfGpLNRWwqgweJBkywHvpoSy7JlYdesC095i+pjwUCQzWGUQCnOnDpZUa3C4mRociDhMxb4wMlMo/I7RAOU1WDqlcxlTiZAS7lfFfe7sxn7WW/+lR477yTa9vSC/dux7aK1Hf95ty6B/9g+/ev3wM4Pva8nFSZiKQTyyK0YoLmMxSiBD7DZbCpoRpOpy5Kpk9CphFEqZMh1OESE3IgeFQQDFYwSXJRjsFM11aAXWlYW5MggFO0ZDGLnBO8MnL4ydoEwpCgCQKTBafmDEYaVKUFhPhxvJqQZMXsPzpuRJKkQ8FHdgFMhHHCV1JSJt9cZIawQoSvVBjPBYbXt/bq3vgUQc58fYj+NMNz2zt2/HdVu99/MFfqTOlSBMiSGVZqlfcjJGBJdzjCXAVAYAZUKoGB0Ac0WxJYRYMbKQBZjcqJJwjzt6tgRkRQymilHiTjJa5gD/xgg131eMzSuT2OENMbAXRgoz1CSGu5IWzo8asByo9oYBIwuEf2CkmDKFWlJOtdzljZFSuRDKJzGyebPrOm72OX916Dg/Ho8Zda9TrqNtAUY/99rqFn4kzpAL8TNN0wl6i8BkDBxEjl3TKGoytXBR6Y2x2uLlxlAkYZRopaZTgDIl483hvA6WilEcGIs4ME7fYpzoTnbbM8UdY5cCTn1hVDlxtBomkcC7UKbmqMHlitEQRgMyh5cbMSWuIow0rLLjdeS1hjuM8Vk30m9U9uG9vcP1xm4tg124Zfv4w1vr76zVt8v1Aj9WF8wSk8SeNN3EmhIn00kkBowaupCf3CSxa1OpGNmB0VEnd2huQR+zkKdmUdXLSQoRshpwZSgNga6NpKmT4x3mCG+MbkLXhCm+3OgoUxKvP3jljrE4k6q3UtcsolkaUxY0YBO+caOMecKqXxhxNr08ML6+a5d0uJGHMiwfdWNV67e5nWf9fKzPdqfH2OUKpNu26m2drYb5fw76VUg5DMCWkJPjbIloQhEcB5Au4XOQIUfVxRyc4yoaxGii5C5Fg8uApuFQUNBQIMLYRAPApjjgpBDo4x8F7V0oYgqcm5RMwJZicBVykAKDuYBMowKgTCZUjASZAcnEGN1AOAJGEE3EWqU4ajBB1fB1OCcjMFA9bqSX0XCAfViEILHY6F5rhpidc6Ci+ey/c/Stf67rc31u3q+3Xh9n4rxf5w21Wu9HuNgR/lNCKVFxKMXrRjImJbWPKUVbQY9ScS4Zl4JWSA5cSRACSFwJJjltldwD8mMvTiKHCcnq6xpR1IkgRQ0DopGMgr13gKRw7DikHY4aJVX0rpbVWr9ZhpUdw0eB8igdUMewUILWYLHvVJzLOvZJMbZuVuv2/hj1tj3RgOtqt9mu3iNDbTePRD93pnDWReNK+OkedeHrYvYbS/+87n3rn3qbtW1Xrb3WYzvPvu/9c7V2RZD2Bp+Tcs4ZBT+P0Uj4K8QArNbPDbHdxrFf9ytw6PYyeo/e1J++xvGF/dq7+3t0gXHtR3+DW7ut8+ZHfLwDjH573M6L4v55+vLU80YOtFt7duPPxThe/ExHIdf2dnbjzxWDKwBcbueF4k+dOnXq1KlTp06dOnXq1KlTp36b/gGN+mEBlT1ZBAAAAABJRU5ErkJggg=="""
-
 # ============================================================================
 # MESES Y MAPEOS
 # ============================================================================
@@ -360,6 +360,26 @@ FUSION_URS_2026 = {
     '232': '924',
 }
 
+
+def compilar_mapeo_ur(mapeo_base, fusion_urs):
+    """
+    Compila el mapeo base y la fusión de URs en un solo dict plano
+    clave del extracto (str) -> UR final, con el mismo resultado que
+    aplicar primero el mapeo base y luego la fusión sobre la UR resultante.
+    """
+    tabla = {}
+    for origen, destino in mapeo_base.items():
+        destino = str(destino)
+        tabla[str(origen)] = fusion_urs.get(destino, destino)
+    # Las claves que solo aparecen en la fusión pasan directo
+    for origen, destino in fusion_urs.items():
+        tabla.setdefault(origen, destino)
+    return tabla
+
+
+TABLA_UR_2025 = compilar_mapeo_ur(MAPEO_UR_2025, {})
+TABLA_UR_2026 = compilar_mapeo_ur(MAPEO_UR_2026_BASE, FUSION_URS_2026)
+
 # ============================================================================
 # FUNCIONES AUXILIARES
 # ============================================================================
@@ -373,6 +393,69 @@ def round_like_excel(value, decimals=2):
     return float(d.quantize(Decimal(10) ** -decimals, rounding=ROUND_HALF_UP))
 
 
+def round_like_excel_array(values, decimals=2):
+    """
+    Versión vectorizada de round_like_excel para Series o arreglos completos.
+
+    Decide cada mitad sobre la representación decimal más corta del
+    flotante (la de str()), igual que Decimal(str(x)) con ROUND_HALF_UP,
+    por lo que 2.675 -> 2.68. Los NaN quedan en 0. Las magnitudes donde el
+    espaciado del flotante no permite distinguir la mitad se resuelven con
+    round_like_excel elemento por elemento.
+    """
+    import numpy as np
+    import pandas as pd
+    x = np.asarray(values, dtype='float64')
+    escalar = x.ndim == 0
+    x = np.atleast_1d(x)
+
+    escala = 10.0 ** decimals
+    ax = np.abs(x)
+    with np.errstate(invalid='ignore', over='ignore'):
+        entero = np.floor(ax * escala)
+        # La mitad (k + 0.5) / 10^d calculada con una sola división es el
+        # flotante más cercano a la mitad decimal exacta
+        mitad = (entero + 0.5) / escala
+        resultado = np.copysign(np.where(ax >= mitad, entero + 1, entero) / escala, x)
+        exactos = np.spacing(ax) * escala < 0.01
+
+    nulos = np.isnan(x)
+    resultado[nulos] = 0.0
+    inexactos = ~nulos & (~exactos if 0 <= decimals <= 15 else True)
+    if inexactos.any():
+        resultado[inexactos] = [round_like_excel(v, decimals) for v in x[inexactos]]
+
+    if escalar:
+        return float(resultado[0])
+    if isinstance(values, pd.Series):
+        return pd.Series(resultado, index=values.index, name=values.name)
+    return resultado
+
+
+def renglones_extracto(df):
+    """
+    Renglones del extracto original que representa df: len(df), o la suma
+    de la columna _renglones si df viene agrupado por claves (comparación
+    con el corte anterior, un renglón por grupo).
+    """
+    if '_renglones' in df.columns:
+        return int(df['_renglones'].sum())
+    return len(df)
+
+
+def top_por_grupo(df, grupo, columna, n=None):
+    """
+    Los n renglones con mayor `columna` de cada grupo (todos si n es None).
+    Un solo ordenamiento estable para todos los grupos, sin ciclo por grupo:
+    dentro de cada grupo quedan de mayor a menor y los empates conservan el
+    orden de df.
+    """
+    ordenado = df.sort_values(columna, ascending=False, kind='stable')
+    if n is None:
+        return ordenado
+    return ordenado.groupby(grupo, observed=True, sort=False).head(n)
+
+
 def numero_a_letras_mx(numero):
     """Convierte número a texto en español mexicano"""
     entero = int(numero)
@@ -415,26 +498,201 @@ def obtener_ultimo_dia_habil(fecha_referencia=None):
     return dia_analizado
 
 
-def detectar_fecha_archivo(filename):
-    """Detecta la fecha del nombre del archivo"""
-    import re
-    month_match = re.search(
-        r'(\d{2})[-_]?(ENE|FEB|MAR|ABR|MAY|JUN|JUL|AGO|SEP|OCT|NOV|DIC)[-_]?(\d{4})?',
-        filename, re.IGNORECASE
-    )
-    if month_match:
-        dia = int(month_match.group(1))
-        mes_nombre = month_match.group(2).upper()
-        año = int(month_match.group(3)) if month_match.group(3) else date.today().year
-        mes = MONTH_MAP[mes_nombre]
+# Fechas en el nombre del archivo, en orden de prioridad. Día y año son
+# opcionales en algunos formatos; sin día se toma el último del mes y sin
+# año el actual.
+_MESES_NOMBRE = '|'.join(list(MONTH_NAMES) + ['MZO'])
+PATRONES_FECHA_NOMBRE = (
+    # 19-FEB-2026_MAP.csv, 19FEB2026, 19-FEB
+    re.compile(rf'(?P<dia>\d{{2}})[-_]?(?P<mes>{_MESES_NOMBRE})[-_]?(?P<año>\d{{4}})?', re.IGNORECASE),
+    # 2026-02-19, 2026_02_19, 20260219
+    re.compile(r'(?<!\d)(?P<año>20\d{2})[-_.]?(?P<mes>0[1-9]|1[0-2])[-_.]?(?P<dia>[0-2]\d|3[01])(?!\d)'),
+    # 19-02-2026, 19.02.2026, 19_02_2026
+    re.compile(r'(?<!\d)(?P<dia>[0-2]?\d|3[01])[-_.](?P<mes>0?[1-9]|1[0-2])[-_.](?P<año>20\d{2})(?!\d)'),
+    # 2026-02, 2026_02 (solo mes)
+    re.compile(r'(?<!\d)(?P<año>20\d{2})[-_.](?P<mes>0[1-9]|1[0-2])(?!\d)'),
+    # FEB-2026, FEB2026 (solo mes)
+    re.compile(rf'(?<![A-Z])(?P<mes>{_MESES_NOMBRE})[-_]?(?P<año>20\d{{2}})(?!\d)', re.IGNORECASE),
+)
+
+MESES_POR_NOMBRE = {**MONTH_MAP, 'MZO': 3}
+
+# Año suelto en el nombre (MAP_2025.csv), para acompañar al mes del contenido
+PATRON_AÑO_NOMBRE = re.compile(r'(?<!\d)(20\d{2})(?!\d)')
+
+
+@lru_cache(maxsize=4096)
+def _fecha_en_nombre(filename):
+    """(día o None, mes, año o None) del primer formato que reconoce, o None"""
+    # Tramos del nombre con un día que no existe en el mes (31-FEB-2026): se
+    # siguen buscando otras fechas, pero no la de solo mes dentro del tramo
+    invalidos = []
+    for patron in PATRONES_FECHA_NOMBRE:
+        for encontrado in patron.finditer(filename):
+            inicio, fin = encontrado.span()
+            if any(inicio < fin_invalido and inicio_invalido < fin for inicio_invalido, fin_invalido in invalidos):
+                continue
+            partes = encontrado.groupdict()
+            mes = partes['mes']
+            mes = MESES_POR_NOMBRE[mes.upper()] if mes.isalpha() else int(mes)
+            dia = int(partes['dia']) if partes.get('dia') else None
+            año = int(partes['año']) if partes.get('año') else None
+            try:
+                date(año or 2000, mes, dia or 1)
+            except ValueError:
+                if dia is not None:
+                    invalidos.append((inicio, fin))
+                continue
+            return dia, mes, año
+    return None
+
+
+def fecha_en_nombre(filename):
+    """
+    (fecha, mes, año) que trae el nombre del archivo, o None si no trae una
+    fecha reconocible. Una fecha con un día que no existe (31-FEB-2026) no
+    cuenta ni se ajusta al último día del mes, pero se usa otra fecha válida
+    del mismo nombre si la hay. Sin año se toma el actual; sin día, el último
+    del mes.
+    """
+    partes = _fecha_en_nombre(filename)
+    if partes is None:
+        return None
+    dia, mes, año = partes
+    año = año or date.today().year
+    dia = dia or calendar.monthrange(año, mes)[1]
+    try:
         return date(año, mes, dia), mes, año
-    return date.today(), date.today().month, date.today().year
+    except ValueError:
+        # 29 de febrero sin año explícito en un año no bisiesto
+        return date(año, mes, calendar.monthrange(año, mes)[1]), mes, año
+
+
+def mes_por_contenido(df):
+    """
+    Mes del corte según el contenido: el último con ejercido distinto de
+    cero (EJE_ENE..EJE_DIC del MAP). None si df no trae esas columnas.
+
+    SICOP no tiene respaldo por contenido: sus columnas mensuales (MOEN..MODI,
+    RESERVA_ENE..RESERVA_DIC) están calendarizadas todo el año y su ejercido
+    es un acumulado sin mes, así que el último mes con importe sería siempre
+    diciembre. Sin fecha en el nombre, SICOP usa la de hoy (fecha_inferida).
+    """
+    import numpy as np
+    columnas = [f'EJE_{mes}' for mes in MONTH_NAMES]
+    if df is None or not all(col in df.columns for col in columnas):
+        return None
+    con_importe = np.flatnonzero(df[columnas].fillna(0).ne(0).any().to_numpy())
+    return int(con_importe[-1]) + 1 if len(con_importe) else None
+
+
+def detectar_fecha_archivo(filename, df=None, con_origen=False):
+    """
+    Detecta la fecha del corte: del nombre del archivo (ver
+    PATRONES_FECHA_NOMBRE) o, si no la trae, del contenido de df
+    (mes_por_contenido, al último día del mes, con el año suelto del nombre
+    o el actual). Si tampoco se puede, usa la fecha de hoy con una
+    advertencia.
+
+    Args:
+        con_origen: agregar de dónde salió la fecha ('nombre', 'contenido'
+            u 'hoy'), para avisar al usuario cuando se supuso la de hoy
+
+    Returns:
+        tuple (fecha, mes, año), o (fecha, mes, año, origen) con con_origen
+    """
+    encontrada = fecha_en_nombre(filename)
+    if encontrada is not None:
+        fecha, origen = encontrada, 'nombre'
+    else:
+        hoy = date.today()
+        mes = mes_por_contenido(df)
+        if mes is not None:
+            año = PATRON_AÑO_NOMBRE.search(filename)
+            año = int(año.group(1)) if año else hoy.year
+            fecha, origen = (date(año, mes, calendar.monthrange(año, mes)[1]), mes, año), 'contenido'
+        else:
+            warnings.warn(f'No se encontró la fecha del corte en {filename!r}; se usa la de hoy', stacklevel=2)
+            fecha, origen = (hoy, hoy.month, hoy.year), 'hoy'
+    return (*fecha, origen) if con_origen else fecha
+
+
+# Secciones del reporte SICOP, en el orden en que se presentan
+SECCIONES_UR = ('sector_central', 'oficinas', 'organos_desconcentrados', 'entidades_paraestatales')
+
+# URs que, además de los órganos desconcentrados y las entidades
+# paraestatales, solo consideran CONTROL_OPERATIVO 0 y 50 (sin 51)
+URS_CO_REDUCIDO_EXTRA = ('RJL',)
+
+
+class ConfigAnual(Mapping):
+    """
+    Configuración compilada de un año. Es inmutable (listas como tuplas,
+    dicts de solo lectura) y get_config_by_year la construye una sola vez,
+    por lo que todas las solicitudes comparten la misma instancia.
+
+    Se consulta como dict (config['oficinas']) y además trae precalculadas
+    las búsquedas de los procesadores:
+        - urs_validas: URs de las cuatro secciones, en orden
+        - conjunto_urs_validas: las mismas como frozenset
+        - seccion_por_ur: UR -> sección ('sector_central', 'oficinas'...)
+        - urs_co_reducido: frozenset de URs con filtro de CO reducido
+        - programas: frozenset de claves del catálogo de programas
+    """
+
+    __slots__ = ('_datos', '_año')
+
+    def __init__(self, año, datos):
+        urs_validas = tuple(dict.fromkeys(ur for seccion in SECCIONES_UR for ur in datos[seccion]))
+        datos = dict(datos)
+        datos.update({
+            'urs_validas': urs_validas,
+            'conjunto_urs_validas': frozenset(urs_validas),
+            'seccion_por_ur': {ur: seccion for seccion in reversed(SECCIONES_UR) for ur in datos[seccion]},
+            'urs_co_reducido': frozenset(
+                (*datos['organos_desconcentrados'], *datos['entidades_paraestatales'], *URS_CO_REDUCIDO_EXTRA)
+            ),
+            'programas': frozenset(datos['programas_nombres']),
+        })
+        congelados = {}
+        for clave, valor in datos.items():
+            if isinstance(valor, list):
+                valor = tuple(valor)
+            elif isinstance(valor, dict):
+                valor = MappingProxyType(valor)
+            congelados[clave] = valor
+        object.__setattr__(self, '_datos', congelados)
+        object.__setattr__(self, '_año', año)
+
+    def __getitem__(self, clave):
+        return self._datos[clave]
+
+    def __iter__(self):
+        return iter(self._datos)
+
+    def __len__(self):
+        return len(self._datos)
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError('ConfigAnual es inmutable')
+
+    def __reduce__(self):
+        # Entre procesos se reconstruye desde la caché del año, no se copia
+        return get_config_by_year, (self._año,)
+
+    def __repr__(self):
+        return f'ConfigAnual({self._año})'
 
 
 def get_config_by_year(año):
-    """Obtiene la configuración según el año"""
+    """Obtiene la configuración (compartida, de solo lectura) según el año"""
+    return _config_compilada(2025 if año <= 2025 else 2026)
+
+
+@lru_cache(maxsize=None)
+def _config_compilada(año):
     if año <= 2025:
-        return {
+        return ConfigAnual(año, {
             'programas_nombres': PROGRAMAS_NOMBRES_2025,
             'programas_especificos': PROGRAMAS_ESPECIFICOS_2025,
             'nombres_especiales': NOMBRES_ESPECIALES_2025,
@@ -446,10 +704,11 @@ def get_config_by_year(año):
             'entidades_paraestatales': ENTIDADES_PARAESTATALES_2025,
             'mapeo_ur': MAPEO_UR_2025,
             'fusion_urs': {},
+            'tabla_ur': TABLA_UR_2025,
             'usar_2026': False,
-        }
+        })
     else:
-        return {
+        return ConfigAnual(año, {
             'programas_nombres': PROGRAMAS_NOMBRES_2026,
             'programas_especificos': PROGRAMAS_ESPECIFICOS_2026,
             'nombres_especiales': NOMBRES_ESPECIALES_2026,
@@ -461,5 +720,6 @@ def get_config_by_year(año):
             'entidades_paraestatales': ENTIDADES_PARAESTATALES_2026,
             'mapeo_ur': MAPEO_UR_2026_BASE,
             'fusion_urs': FUSION_URS_2026,
+            'tabla_ur': TABLA_UR_2026,
             'usar_2026': True,
-        }
+        })
@@ -0,0 +1,228 @@
+# ============================================================================
+# COMPARACIÓN CON EL CORTE ANTERIOR
+# ============================================================================
+# Cada corte se guarda compactado por claves (UR, programa, partida, CO...)
+# junto con una huella por grupo (suma de los hashes de sus renglones). Al
+# subir el siguiente corte del mismo reporte y año se reportan los grupos
+# nuevos, eliminados y modificados.
+#
+# No es un recálculo incremental: cada archivo nuevo se lee, se huella y se
+# agrupa completo, y los procesadores calculan el reporte entero sobre el
+# extracto compactado, que da los mismos resultados (ver
+# csv_loader.compactar_importes) con menos renglones; su columna _renglones
+# conserva cuántos renglones del extracto agrupa cada uno
+# (config.renglones_extracto). Del corte anterior solo se toman las huellas
+# para el reporte de cambios: sus resultados no se reutilizan, porque el
+# reporte redondea y elige top-N sobre los totales completos.
+#
+# Los cortes se guardan por reporte y año en CACHE_DIR/cortes, sin
+# distinguir quién subió el archivo: una instalación es de un solo equipo.
+# Si varias áreas comparten el servidor, cada una necesita su propio
+# SADER_CACHE_DIR (otra instancia de la app); si no, cada corte se compara
+# contra el último que subió cualquiera.
+
+import json
+import os
+import tempfile
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+from config import fecha_en_nombre
+from csv_loader import columnas_reporte
+from extract_cache import CACHE_DIR, hash_contenido, leer_bytes, leer_extracto_cacheado
+
+DIR_CORTES = os.path.join(CACHE_DIR, 'cortes')
+
+# Cambiar si cambia la forma de los agregados o de la huella
+VERSION_FORMATO = 1
+
+# Columna de UR del extracto (antes del remapeo) para el reporte de cambios
+COLUMNA_UR = {
+    'MAP': 'UNIDAD',
+    'SICOP': 'ID_UNIDAD',
+}
+
+# Diferencia mínima por columna que se reporta como cambio (medio centavo)
+TOLERANCIA_DIFERENCIA = 0.005
+
+
+def comparacion_disponible():
+    """Los cortes se guardan en Feather: requiere pyarrow"""
+    return feather is not None
+
+
+def claves_e_importes(df, tipo):
+    """Columnas de agrupación e importes del reporte presentes en df"""
+    columnas = columnas_reporte(tipo)
+    claves = [col for col, dtype in columnas.items() if dtype != 'float64' and col in df.columns]
+    importes = [col for col, dtype in columnas.items() if dtype == 'float64' and col in df.columns]
+    return claves, importes
+
+
+# ============================================================================
+# AGREGADOS Y HUELLAS POR GRUPO
+# ============================================================================
+
+def compactar_con_huellas(df, tipo):
+    """
+    Igual que csv_loader.compactar_importes, y en la misma pasada de groupby
+    agrega por grupo _hash (suma módulo 2**64 de los hashes de sus renglones,
+    no depende del orden), _renglones y _llave (hash de los valores de las
+    claves, para cruzar cortes con una sola columna).
+    """
+    claves, importes = claves_e_importes(df, tipo)
+    marco = df[claves + importes].assign(
+        _hash=pd.util.hash_pandas_object(df[claves + importes], index=False).to_numpy(),
+        _renglones=1,
+    )
+    grupos = marco.groupby(claves, observed=True, dropna=False, sort=False).sum().reset_index()
+    grupos['_llave'] = pd.util.hash_pandas_object(grupos[claves], index=False).to_numpy()
+    return grupos
+
+
+# ============================================================================
+# CORTES EN DISCO
+# ============================================================================
+
+def _ruta(tipo, año):
+    return os.path.join(DIR_CORTES, f'{tipo.upper()}_{año}_v{VERSION_FORMATO}')
+
+
+def cargar_corte(tipo, año):
+    """Agregados y datos del último corte guardado, o (None, None)"""
+    ruta = _ruta(tipo, año)
+    try:
+        with open(ruta + '.json', encoding='utf-8') as f:
+            info = json.load(f)
+        agregados = feather.read_table(ruta + '.feather').to_pandas()
+    except (OSError, ValueError):
+        return None, None
+    return agregados, info
+
+
+def guardar_corte(agregados, tipo, año, info):
+    """Reemplaza el corte guardado del reporte y año (datos primero, luego info)"""
+    os.makedirs(DIR_CORTES, exist_ok=True)
+    ruta = _ruta(tipo, año)
+    for extension, escribir in (
+        ('.feather', lambda destino: feather.write_feather(agregados, destino)),
+        ('.json', lambda destino: _escribir_json(info, destino)),
+    ):
+        # Temporal propio: dos trabajos pueden guardar el mismo corte a la vez
+        descriptor, temporal = tempfile.mkstemp(
+            dir=DIR_CORTES, prefix=os.path.basename(ruta) + extension + '.', suffix='.tmp'
+        )
+        os.close(descriptor)
+        try:
+            escribir(temporal)
+            os.replace(temporal, ruta + extension)
+        except BaseException:
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+            raise
+
+
+def _escribir_json(info, ruta):
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False)
+
+
+# ============================================================================
+# REPORTE DE CAMBIOS
+# ============================================================================
+
+def comparar_cortes(grupos, previo, tipo, info_previa=None):
+    """
+    Reporte de cambios entre los agregados del corte actual y los del
+    anterior: grupos nuevos, eliminados y modificados (algún renglón
+    distinto), URs afectadas y diferencia neta por columna de importe.
+    """
+    claves, importes = claves_e_importes(grupos, tipo)
+    if previo is not None and set(claves + importes + ['_llave', '_hash']) <= set(previo.columns):
+        posiciones = pd.Index(previo['_llave']).get_indexer(grupos['_llave'])
+        nuevos = posiciones < 0
+        hash_previo = previo['_hash'].to_numpy()[np.where(nuevos, 0, posiciones)]
+        modificados = ~nuevos & (hash_previo != grupos['_hash'].to_numpy())
+        eliminados = previo.loc[~previo['_llave'].isin(grupos['_llave']).to_numpy()]
+    else:
+        previo = None
+        nuevos = np.ones(len(grupos), dtype=bool)
+        modificados = np.zeros(len(grupos), dtype=bool)
+        eliminados = grupos.iloc[:0]
+
+    urs = set()
+    columna_ur = COLUMNA_UR[tipo.upper()]
+    if columna_ur in claves:
+        for serie in (grupos.loc[nuevos | modificados, columna_ur], eliminados[columna_ur]):
+            urs.update(str(ur) for ur in serie.dropna().unique())
+
+    diferencias = {}
+    if previo is not None:
+        for col in importes:
+            diferencia = float(grupos[col].sum() - previo[col].sum())
+            if abs(diferencia) >= TOLERANCIA_DIFERENCIA:
+                diferencias[col] = round(diferencia, 2)
+
+    afectados = nuevos | modificados
+    return {
+        'corte_anterior': info_previa,
+        'renglones': int(grupos['_renglones'].sum()),
+        'grupos': len(grupos),
+        'nuevos': int(nuevos.sum()),
+        'eliminados': len(eliminados),
+        'modificados': int(modificados.sum()),
+        'sin_cambio': int((~afectados).sum()),
+        'renglones_con_cambios': int(grupos.loc[afectados, '_renglones'].sum()),
+        'urs_con_cambios': sorted(urs),
+        'diferencias': diferencias,
+    }
+
+
+def leer_compactado(archivo, tipo, filename):
+    """
+    Lee el extracto (con el caché de extract_cache), lo compacta por claves,
+    lo compara con el último corte guardado del mismo reporte y año, y lo
+    guarda como base del siguiente. Si es el mismo archivo que el corte
+    guardado no se vuelve a leer ni a agrupar.
+
+    El corte guardado es uno por reporte y año para toda la instalación
+    (ver el encabezado del módulo).
+
+    Returns:
+        tuple (DataFrame compactado listo para procesar, con _renglones por
+        grupo; hash del contenido; reporte de cambios contra el corte
+        anterior)
+    """
+    tipo = tipo.upper()
+    datos = leer_bytes(archivo)
+    hash_archivo = hash_contenido(datos)
+    # Año del corte para separar los cortes guardados; sin fecha en el nombre, el actual
+    encontrada = fecha_en_nombre(filename)
+    año = encontrada[2] if encontrada else date.today().year
+
+    previo, info_previa = cargar_corte(tipo, año)
+    if info_previa is not None and info_previa.get('hash_archivo') == hash_archivo:
+        grupos, cambios = previo, info_previa['cambios']
+    else:
+        df, _ = leer_extracto_cacheado(datos, tipo)
+        grupos = compactar_con_huellas(df, tipo)
+        cambios = comparar_cortes(
+            grupos, previo, tipo,
+            info_previa and {'archivo': info_previa['archivo'], 'hash_archivo': info_previa['hash_archivo']},
+        )
+        try:
+            guardar_corte(grupos, tipo, año, {'archivo': filename, 'hash_archivo': hash_archivo, 'cambios': cambios})
+        except OSError:
+            pass
+
+    claves, importes = claves_e_importes(grupos, tipo)
+    return grupos[claves + importes + ['_renglones']], hash_archivo, cambios
@@ -0,0 +1,169 @@
+# ============================================================================
+# LECTURA DE ARCHIVOS MAP Y SICOP
+# ============================================================================
+
+import logging
+
+import pandas as pd
+
+MESES_MAP = ['ENE', 'FEB', 'MAR', 'ABR', 'MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT', 'NOV', 'DIC']
+MESES_RESERVA = ['ENE', 'FEB', 'MZO', 'ABR', 'MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT', 'NOV', 'DIC']
+MESES_MODIFICACION = ['EN', 'FE', 'MR', 'AB', 'MY', 'JN', 'JL', 'AG', 'SE', 'OC', 'NO', 'DI']
+
+# ============================================================================
+# COLUMNAS Y TIPOS POR REPORTE
+# ============================================================================
+
+# Códigos: categóricos (pocos valores distintos, muchos renglones)
+# Claves numéricas: int32
+# Importes: float64 (único tipo de punto flotante)
+
+COLUMNAS_MAP = {
+    'UNIDAD': 'category',
+    'PROGRAMA': 'category',
+    'PARTIDA': 'int32',
+    **{f'{prefijo}_{mes}': 'float64'
+       for prefijo in ['ORI', 'MOD', 'EJE', 'CONG'] for mes in MESES_MAP},
+}
+
+COLUMNAS_SICOP = {
+    'ID_UNIDAD': 'category',
+    'PROGRAMA_PRESUPUESTARIO': 'category',
+    'CAPITULO': 'int32',
+    'CONCEPTO': 'int32',
+    'PARTIDA_GENERICA': 'int32',
+    'PARTIDA_ESPECIFICA': 'int32',
+    'CONTROL_OPERATIVO': 'int32',
+    'ORIGINAL': 'float64',
+    'MODIFICADO_AUTORIZADO': 'float64',
+    'RESERVAS': 'float64',
+    'EJERCIDO': 'float64',
+    'DEVENGADO': 'float64',
+    'EJERCIDO_TRAMITE': 'float64',
+    **{f'MO{mes}': 'float64' for mes in MESES_MODIFICACION},
+    **{f'RESERVA_{mes}': 'float64' for mes in MESES_RESERVA},
+}
+
+COLUMNAS_POR_REPORTE = {
+    'MAP': COLUMNAS_MAP,
+    'SICOP': COLUMNAS_SICOP,
+}
+
+TAMANO_BLOQUE = 200_000
+
+# Mensajes de read_csv cuando una clave int32 trae vacíos o valores que no
+# son enteros exactos; con esos (y con OverflowError) se relee como float64
+ERRORES_ENTEROS = ('Integer column has NA values', 'cannot safely convert')
+
+_log = logging.getLogger(__name__)
+
+
+def columnas_reporte(tipo):
+    """Devuelve el dict columna -> dtype que necesita el reporte ('MAP' o 'SICOP')"""
+    try:
+        return COLUMNAS_POR_REPORTE[tipo.upper()]
+    except KeyError:
+        raise ValueError(f"Tipo de reporte desconocido: {tipo!r}") from None
+
+
+def _dtypes(tipo, enteros_con_vacios=False):
+    """dtypes de lectura; con enteros_con_vacios las claves int32 se leen como float64"""
+    columnas = columnas_reporte(tipo)
+    if not enteros_con_vacios:
+        return columnas
+    return {col: ('float64' if dtype == 'int32' else dtype) for col, dtype in columnas.items()}
+
+
+def _read_csv(archivo, tipo, enteros_con_vacios=False, **kwargs):
+    """read_csv con poda de columnas y tipos compactos"""
+    columnas = columnas_reporte(tipo)
+    return pd.read_csv(
+        archivo,
+        encoding='latin-1',
+        usecols=lambda col: col in columnas,
+        dtype=_dtypes(tipo, enteros_con_vacios),
+        **kwargs
+    )
+
+
+def _es_error_de_enteros(error):
+    """El error de read_csv viene de forzar int32 en una clave entera"""
+    return isinstance(error, OverflowError) or any(texto in str(error) for texto in ERRORES_ENTEROS)
+
+
+def _con_respaldo(archivo, lectura):
+    """
+    Ejecuta lectura(enteros_con_vacios=False) y, si alguna clave entera trae
+    vacíos o valores que no caben en int32 (ver ERRORES_ENTEROS), repite la
+    lectura con esas claves como float64, igual que las infería read_csv sin
+    tipos, y lo deja en el log. Cualquier otro error se propaga.
+    """
+    posicion = archivo.tell() if hasattr(archivo, 'tell') else None
+    try:
+        return lectura(False)
+    except (ValueError, OverflowError) as error:
+        if not _es_error_de_enteros(error):
+            raise
+        _log.warning('%s: claves enteras con vacíos o fuera de rango (%s); se leen como float64',
+                     getattr(archivo, 'name', archivo if isinstance(archivo, str) else 'extracto'), error)
+        if posicion is not None:
+            archivo.seek(posicion)
+        return lectura(True)
+
+
+def compactar_importes(df, tipo):
+    """
+    Agrupa los renglones con las mismas claves (UR, partida, programa, CO...)
+    sumando los importes. Todos los reportes son sumas sobre esas claves, por
+    lo que el resultado es equivalente con muchos menos renglones. Los importes
+    vacíos se suman como cero.
+    """
+    columnas = columnas_reporte(tipo)
+    claves = [col for col, dtype in columnas.items() if dtype != 'float64' and col in df.columns]
+    importes = [col for col, dtype in columnas.items() if dtype == 'float64' and col in df.columns]
+    return df.groupby(claves, observed=True, dropna=False, sort=False)[importes].sum().reset_index()
+
+
+def leer_bloques(archivo, tipo, tamano_bloque=TAMANO_BLOQUE, enteros_con_vacios=False):
+    """Itera el archivo en bloques de renglones ya podados y tipados"""
+    with _read_csv(archivo, tipo, enteros_con_vacios, chunksize=tamano_bloque) as lector:
+        yield from lector
+
+
+def _leer_compactado(archivo, tipo, tamano_bloque, enteros_con_vacios):
+    acumulado = None
+    for bloque in leer_bloques(archivo, tipo, tamano_bloque, enteros_con_vacios):
+        parcial = compactar_importes(bloque, tipo)
+        if acumulado is not None:
+            parcial = compactar_importes(pd.concat([acumulado, parcial], ignore_index=True), tipo)
+        acumulado = parcial
+
+    dtypes = _dtypes(tipo, enteros_con_vacios)
+    if acumulado is None:
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in dtypes.items()})
+    # concat de categóricos con categorías distintas regresa object
+    return acumulado.astype({col: dtypes[col] for col in acumulado.columns})
+
+
+def leer_extracto(archivo, tipo, compactar=False, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Lee un extracto MAP o SICOP solo con las columnas que usa el reporte.
+
+    Args:
+        archivo: ruta o archivo abierto (p. ej. el UploadedFile de Streamlit)
+        tipo: 'MAP' o 'SICOP'
+        compactar: si es True, lee en bloques y acumula cada bloque ya
+            agrupado por claves (ver compactar_importes), de modo que la
+            memoria pico depende del número de combinaciones y no de renglones
+        tamano_bloque: renglones por bloque cuando compactar=True
+
+    Returns:
+        DataFrame listo para procesar_map / procesar_sicop
+    """
+    if compactar:
+        return _con_respaldo(archivo, lambda enteros_con_vacios: _leer_compactado(
+            archivo, tipo, tamano_bloque, enteros_con_vacios
+        ))
+    return _con_respaldo(archivo, lambda enteros_con_vacios: _read_csv(
+        archivo, tipo, enteros_con_vacios
+    ))
@@ -0,0 +1,148 @@
+# ============================================================================
+# CUBO DE AGREGADOS PARA LOS DASHBOARDS
+# ============================================================================
+# Sumas por combinación de dimensiones (MAP: UR, capítulo, partida y
+# programa; SICOP: además la clase de CONTROL_OPERATIVO, que el extracto MAP
+# no trae) guardadas como arreglos de numpy: un código entero por dimensión
+# y celda, y por importe mensual una matriz 12 x celdas acumulada por mes
+# (renglón m = enero a m+1), así que el corte a cualquier mes es un renglón
+# contiguo. Cualquier corte del dashboard (UR, capítulos, mes, top-N de
+# partidas) se resuelve filtrando y sumando esos arreglos, sin volver al
+# extracto.
+
+import numpy as np
+import pandas as pd
+
+MESES = 12
+
+
+def _columna(df, origen):
+    return origen if isinstance(origen, pd.Series) else df[origen]
+
+
+def _sumar(codigos, valores, n):
+    """Suma de valores por código (los NaN cuentan como cero)"""
+    return np.bincount(codigos, weights=np.nan_to_num(valores, nan=0.0), minlength=n)
+
+
+def construir_cubo(df, dimensiones, mensuales=None, anuales=None, mes=MESES):
+    """
+    Agrupa df por las dimensiones y suma los importes.
+
+    Args:
+        df: DataFrame con los renglones a agregar
+        dimensiones: dict nombre -> columna de df (o Series alineada con df)
+        mensuales: dict nombre -> lista de 12 columnas (enero a diciembre)
+        anuales: dict nombre -> columna sin desglose mensual
+        mes: mes del corte, valor por omisión de las consultas
+
+    Returns:
+        dict con dimensiones (nombres en orden), etiquetas (dimensión ->
+        arreglo de valores distintos), codigos (dimensión -> código por
+        celda), acumulados (nombre -> matriz 12 x celdas acumulada por mes),
+        anuales (nombre -> arreglo por celda), mes y celdas
+    """
+    mensuales = mensuales or {}
+    anuales = anuales or {}
+
+    etiquetas = {}
+    codigos_renglon = []
+    for nombre, origen in dimensiones.items():
+        codigos, valores = pd.factorize(_columna(df, origen), sort=True, use_na_sentinel=False)
+        etiquetas[nombre] = np.asarray(valores, dtype=object)
+        codigos_renglon.append(codigos)
+
+    forma = tuple(max(len(v), 1) for v in etiquetas.values())
+    if len(df):
+        clave = np.ravel_multi_index(codigos_renglon, forma)
+        celda, claves_celda = pd.factorize(clave)
+    else:
+        celda, claves_celda = np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    n = len(claves_celda)
+    codigos = dict(zip(etiquetas, np.unravel_index(claves_celda, forma))) if n else {
+        nombre: np.zeros(0, dtype=np.intp) for nombre in etiquetas
+    }
+
+    acumulados = {}
+    for nombre, columnas in mensuales.items():
+        matriz = np.zeros((MESES, n))
+        for i, col in enumerate(columnas):
+            if col in df.columns:
+                matriz[i] = _sumar(celda, df[col].to_numpy(dtype='float64'), n)
+        acumulados[nombre] = np.cumsum(matriz, axis=0, out=matriz)
+
+    return {
+        'dimensiones': list(etiquetas),
+        'etiquetas': etiquetas,
+        'codigos': codigos,
+        'acumulados': acumulados,
+        'anuales': {
+            nombre: _sumar(celda, _columna(df, col).to_numpy(dtype='float64'), n)
+            for nombre, col in anuales.items()
+        },
+        'mes': mes,
+        'celdas': n,
+    }
+
+
+def _mascara(cubo, filtros, excluir):
+    """Celdas que cumplen los filtros, o None si no hay ninguno (todas)"""
+    mascara = None
+    for criterios, incluir in ((filtros, True), (excluir, False)):
+        for dimension, valores in (criterios or {}).items():
+            en_lista = np.isin(cubo['etiquetas'][dimension], list(valores)) == incluir
+            cumple = en_lista[cubo['codigos'][dimension]]
+            mascara = cumple if mascara is None else mascara & cumple
+    return mascara
+
+
+def _seleccionar(valores, mascara):
+    return valores if mascara is None else valores[mascara]
+
+
+def consultar(cubo, por=(), filtros=None, excluir=None, mes=None):
+    """
+    Suma el cubo por las dimensiones `por` sobre las celdas que cumplen los
+    filtros.
+
+    Args:
+        cubo: dict de construir_cubo
+        por: dimensiones de agrupación (vacío = un solo renglón de totales)
+        filtros: dict dimensión -> valores a incluir
+        excluir: dict dimensión -> valores a descartar
+        mes: mes del corte para las columnas _periodo (por omisión el del cubo)
+
+    Returns:
+        DataFrame con una columna por dimensión de `por` y, por cada importe
+        mensual M, M_anual (12 meses) y M_periodo (enero al mes del corte);
+        los importes anuales van con su nombre. Ordenado por las dimensiones.
+    """
+    mes = cubo['mes'] if mes is None else mes
+    por = list(por)
+    mascara = _mascara(cubo, filtros, excluir)
+
+    if por:
+        forma = tuple(max(len(cubo['etiquetas'][d]), 1) for d in por)
+        clave = np.ravel_multi_index([_seleccionar(cubo['codigos'][d], mascara) for d in por], forma)
+        claves_grupo, grupos = np.unique(clave, return_inverse=True)
+        n = len(claves_grupo)
+        resultado = {
+            d: cubo['etiquetas'][d][codigos]
+            for d, codigos in zip(por, np.unravel_index(claves_grupo, forma))
+        }
+    else:
+        seleccionadas = cubo['celdas'] if mascara is None else int(mascara.sum())
+        grupos = np.zeros(seleccionadas, dtype=np.intp)
+        n = 1
+        resultado = {}
+
+    def sumar(valores):
+        return np.bincount(grupos, weights=_seleccionar(valores, mascara), minlength=n)
+
+    for nombre, acumulado in cubo['acumulados'].items():
+        resultado[f'{nombre}_anual'] = sumar(acumulado[MESES - 1])
+        resultado[f'{nombre}_periodo'] = sumar(acumulado[mes - 1]) if mes > 0 else np.zeros(n)
+    for nombre, valores in cubo['anuales'].items():
+        resultado[nombre] = sumar(valores)
+
+    return pd.DataFrame(resultado)
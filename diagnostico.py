@@ -0,0 +1,114 @@
+# ============================================================================
+# DIAGNÓSTICO: TIEMPO, MEMORIA Y CONTADORES POR ETAPA
+# ============================================================================
+# medir() escucha los avisos de etapas del hilo actual y arma un registro con
+# la duración, el cambio de memoria residente y los contadores (renglones que
+# entran y salen de cada filtro, aciertos de caché...) de cada etapa. Las
+# etapas marcadas dentro de un bloque `with etapa(...)` quedan como sus
+# subetapas (nivel 1): el bloque 'procesamiento' abarca 'preparacion',
+# 'filtro' y 'agregacion'. La app
+# lo muestra en el panel "Diagnóstico" y procesar_lote lo deja en el resumen
+# y, con --log-json, como una línea JSON por archivo.
+#
+# La memoria es la del proceso: en el servidor de Streamlit, con otros
+# trabajos corriendo a la vez, el cambio por etapa es aproximado.
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from etapas import escuchar
+
+
+def memoria_mb():
+    """Memoria residente actual del proceso en MB, o None si no se puede medir"""
+    # Linux: segundo campo de statm, en páginas
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def _redondear(valor, decimales):
+    return round(valor, decimales) if valor is not None else None
+
+
+def _cerrar_etapa(abierta):
+    """Completa tiempo y memoria de la etapa abierta (etapa, inicio, memoria al inicio, es bloque)"""
+    etapa, inicio, memoria_inicio, _ = abierta
+    memoria = memoria_mb()
+    etapa['segundos'] = round(time.perf_counter() - inicio, 4)
+    if memoria is not None and memoria_inicio is not None:
+        etapa['memoria_mb'] = round(memoria - memoria_inicio, 1)
+    etapa['memoria_final_mb'] = _redondear(memoria, 1)
+
+
+@contextmanager
+def medir(**datos):
+    """
+    Registra las etapas del hilo actual mientras dura el bloque.
+
+    Args:
+        **datos: campos fijos del registro (archivo, tipo...)
+
+    Yields:
+        dict con los datos, inicio (ISO), memoria_inicial_mb, etapas (lista
+        en orden de inicio con etapa, nivel (0, o 1 dentro de un bloque),
+        segundos, memoria_mb (cambio), memoria_final_mb y contadores),
+        contadores avisados fuera de una etapa y, al salir del bloque,
+        duracion_s y memoria_final_mb
+    """
+    registro = {
+        **datos,
+        'inicio': datetime.now().isoformat(timespec='seconds'),
+        'memoria_inicial_mb': _redondear(memoria_mb(), 1),
+        'etapas': [],
+        'contadores': {},
+    }
+    # Pila de etapas abiertas: bloques y, encima, a lo más una marca
+    abiertas = []
+
+    def oyente(evento, nombre, valor):
+        if evento in ('inicio', 'fin') and abiertas and not abiertas[-1][3]:
+            # Una marca termina al empezar otra etapa o al cerrarse su bloque
+            _cerrar_etapa(abiertas.pop())
+        if evento == 'inicio':
+            etapa = {'etapa': nombre, 'nivel': sum(1 for abierta in abiertas if abierta[3]), 'segundos': None,
+                     'memoria_mb': None, 'memoria_final_mb': None, 'contadores': {}}
+            registro['etapas'].append(etapa)
+            abiertas.append((etapa, time.perf_counter(), memoria_mb(), valor == 'bloque'))
+        elif evento == 'fin':
+            while abiertas:
+                abierta = abiertas.pop()
+                _cerrar_etapa(abierta)
+                if abierta[3] and abierta[0]['etapa'] == nombre:
+                    break
+        elif evento == 'contador':
+            contadores = abiertas[-1][0]['contadores'] if abiertas else registro['contadores']
+            contadores[nombre] = contadores.get(nombre, 0) + valor
+
+    inicio = time.perf_counter()
+    try:
+        with escuchar(oyente):
+            yield registro
+    finally:
+        while abiertas:
+            _cerrar_etapa(abiertas.pop())
+        registro['duracion_s'] = round(time.perf_counter() - inicio, 4)
+        registro['memoria_final_mb'] = _redondear(memoria_mb(), 1)
+
+
+def escribir_json(registro, destino=None):
+    """Escribe el registro como una línea JSON (por omisión en stderr)"""
+    destino = destino or sys.stderr
+    destino.write(json.dumps(registro, ensure_ascii=False, default=str) + '\n')
+    destino.flush()
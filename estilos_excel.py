@@ -0,0 +1,168 @@
+# ============================================================================
+# ESTILOS INSTITUCIONALES COMPARTIDOS POR LOS GENERADORES DE EXCEL
+# ============================================================================
+
+from openpyxl.styles import Font, Alignment, Border, Side, PatternFill, NamedStyle
+
+# ============================================================================
+# COLORES Y FORMATOS
+# ============================================================================
+
+COLOR_VINO = '9B2247'
+COLOR_BEIGE = 'E6D194'
+COLOR_VERDE = '002F2A'
+COLOR_GRIS = '98989A'
+COLOR_BLANCO = 'FFFFFF'
+
+FMT_MONEY = '_-* #,##0.00_-;\\-* #,##0.00_-;_-* "-"??_-;_-@_-'
+FMT_PCT = '0.00%'
+
+
+def _relleno(color):
+    return PatternFill(start_color=color, end_color=color, fill_type='solid')
+
+
+FILL_HEADER = _relleno(COLOR_VINO)
+FILL_TOTAL = _relleno(COLOR_BEIGE)
+FILL_SUBTOTAL = _relleno(COLOR_VERDE)
+FILL_GRAY = _relleno(COLOR_GRIS)
+FILL_WHITE = _relleno(COLOR_BLANCO)
+
+# Fondo de cada tipo de renglón
+FONDOS = {
+    'total': FILL_TOTAL,
+    'gris': FILL_GRAY,
+    'blanco': FILL_WHITE,
+}
+
+BORDER_DOTTED = Border(
+    top=Side(style='dotted'),
+    bottom=Side(style='dotted'),
+    left=Side(style='dotted'),
+    right=Side(style='dotted')
+)
+
+ALIGN_CENTER = Alignment(horizontal='center', vertical='center', wrap_text=True)
+ALIGN_LEFT = Alignment(horizontal='left', vertical='top', wrap_text=True)
+ALIGN_RIGHT = Alignment(horizontal='right', vertical='top')
+ALIGN_JUSTIFY = Alignment(horizontal='justify', vertical='top', wrap_text=True)
+ALIGN_TOP = Alignment(vertical='top')
+
+
+def _fuente(size, bold=False, color=None, italic=False):
+    return Font(name='Noto Sans', size=size, bold=bold, italic=italic, color=color)
+
+
+# ============================================================================
+# ESTILOS POR REPORTE
+# ============================================================================
+# Cada estilo es un dict de atributos (font, fill, border, alignment,
+# number_format). Los NamedStyle se construyen al registrarlos, uno por libro,
+# porque openpyxl los liga al libro al que se agregan.
+
+def _estilos_map():
+    font_header = _fuente(11, bold=True, color=COLOR_BLANCO)
+    font_title = _fuente(11, bold=True)
+    font_data = _fuente(11)
+    font_notes = _fuente(10)
+
+    estilos = {
+        'map_oficina': dict(font=font_title, alignment=Alignment(horizontal='right', vertical='center')),
+        'map_titulo': dict(font=font_title, alignment=ALIGN_CENTER),
+        'map_encabezado': dict(font=font_header, fill=FILL_HEADER, alignment=ALIGN_CENTER, border=BORDER_DOTTED),
+        'map_nota': dict(font=font_notes),
+        'map_nota_titulo': dict(font=_fuente(10, bold=True)),
+        'map_concepto_total': dict(font=font_title, fill=FILL_TOTAL, alignment=ALIGN_RIGHT, border=BORDER_DOTTED),
+    }
+    for fondo, fill in FONDOS.items():
+        font_importe = font_title if fondo == 'total' else font_data
+        estilos[f'map_importe_{fondo}'] = dict(
+            font=font_importe, fill=fill, number_format=FMT_MONEY,
+            alignment=Alignment(horizontal='right', vertical='top'), border=BORDER_DOTTED,
+        )
+        estilos[f'map_porcentaje_{fondo}'] = dict(
+            font=font_importe, fill=fill, number_format=FMT_PCT,
+            alignment=Alignment(horizontal='center', vertical='top'), border=BORDER_DOTTED,
+        )
+        if fondo != 'total':
+            estilos[f'map_concepto_{fondo}'] = dict(
+                font=font_data, fill=fill, alignment=ALIGN_LEFT, border=BORDER_DOTTED,
+            )
+            estilos[f'map_concepto_subtotal_{fondo}'] = dict(
+                font=font_title, fill=fill, alignment=ALIGN_JUSTIFY, border=BORDER_DOTTED,
+            )
+    return estilos
+
+
+def _estilos_sicop():
+    font_header = _fuente(14, bold=True, color=COLOR_BLANCO)
+    font_title = _fuente(14, bold=True)
+    font_subtotal_white = _fuente(14, bold=True, color=COLOR_BLANCO)
+
+    estilos = {
+        'sicop_oficina': dict(font=font_title, alignment=Alignment(horizontal='right', vertical='center', wrap_text=True)),
+        'sicop_titulo': dict(font=font_title, alignment=ALIGN_CENTER),
+        'sicop_encabezado': dict(font=font_header, fill=FILL_HEADER, alignment=ALIGN_CENTER, border=BORDER_DOTTED),
+        'sicop_nota': dict(font=font_title, fill=FILL_WHITE, alignment=ALIGN_LEFT),
+    }
+    # Total general (beige, texto negro) y subtotales de sección (verde, texto blanco)
+    for tipo, fill, font, align_texto in [
+        ('total', FILL_TOTAL, font_title, ALIGN_RIGHT),
+        ('subtotal', FILL_SUBTOTAL, font_subtotal_white, ALIGN_LEFT),
+    ]:
+        estilos[f'sicop_{tipo}_texto'] = dict(font=font, fill=fill, alignment=align_texto, border=BORDER_DOTTED)
+        estilos[f'sicop_{tipo}_importe'] = dict(font=font, fill=fill, number_format=FMT_MONEY, alignment=ALIGN_TOP, border=BORDER_DOTTED)
+        estilos[f'sicop_{tipo}_porcentaje'] = dict(font=font, fill=fill, number_format=FMT_PCT, alignment=ALIGN_TOP, border=BORDER_DOTTED)
+    # Renglones de UR alternando blanco y gris
+    for fondo in ('blanco', 'gris'):
+        fill = FONDOS[fondo]
+        estilos[f'sicop_ur_clave_{fondo}'] = dict(font=font_title, fill=fill, alignment=ALIGN_CENTER, border=BORDER_DOTTED)
+        estilos[f'sicop_ur_denominacion_{fondo}'] = dict(font=font_title, fill=fill, alignment=ALIGN_LEFT, border=BORDER_DOTTED)
+        estilos[f'sicop_ur_importe_{fondo}'] = dict(font=font_title, fill=fill, number_format=FMT_MONEY, alignment=ALIGN_TOP, border=BORDER_DOTTED)
+        estilos[f'sicop_ur_porcentaje_{fondo}'] = dict(font=font_title, fill=fill, number_format=FMT_PCT, alignment=ALIGN_TOP, border=BORDER_DOTTED)
+    return estilos
+
+
+def _estilos_detalle():
+    font_data = _fuente(10)
+    return {
+        'detalle_titulo': dict(font=_fuente(14, bold=True), alignment=Alignment(horizontal='left', vertical='center')),
+        'detalle_subtitulo': dict(font=_fuente(10, italic=True), alignment=Alignment(horizontal='left', vertical='center')),
+        'detalle_encabezado': dict(font=_fuente(11, bold=True, color=COLOR_BLANCO), fill=FILL_HEADER,
+                                   alignment=ALIGN_CENTER, border=BORDER_DOTTED),
+        'detalle_texto': dict(font=font_data, alignment=Alignment(horizontal='center', vertical='top'), border=BORDER_DOTTED),
+        'detalle_entero': dict(font=font_data, alignment=Alignment(horizontal='center', vertical='top'),
+                               border=BORDER_DOTTED, number_format='0'),
+        'detalle_importe': dict(font=font_data, alignment=ALIGN_TOP, border=BORDER_DOTTED, number_format=FMT_MONEY),
+    }
+
+
+ESTILOS_POR_REPORTE = {
+    'MAP': _estilos_map(),
+    'SICOP': _estilos_sicop(),
+    'DETALLE': _estilos_detalle(),
+}
+
+
+# ============================================================================
+# REGISTRO Y APLICACIÓN
+# ============================================================================
+
+def registrar_estilos(wb, reporte):
+    """Registra en el libro los estilos con nombre del reporte ('MAP', 'SICOP' o 'DETALLE')"""
+    existentes = set(wb.named_styles)
+    for nombre, atributos in ESTILOS_POR_REPORTE[reporte.upper()].items():
+        if nombre not in existentes:
+            wb.add_named_style(NamedStyle(name=nombre, **atributos))
+
+
+def aplicar_estilo(ws, rango, nombre):
+    """Aplica un estilo registrado a todas las celdas de un rango ('B6:H6', 'C7')"""
+    celdas = ws[rango]
+    if not isinstance(celdas, tuple):
+        celdas = ((celdas,),)
+    elif not isinstance(celdas[0], tuple):
+        celdas = (celdas,)
+    for fila in celdas:
+        for cell in fila:
+            cell.style = nombre
@@ -0,0 +1,78 @@
+# ============================================================================
+# ETAPAS DEL PROCESAMIENTO
+# ============================================================================
+# La lectura, los procesadores y la generación del Excel avisan en qué etapa
+# van (marcar, o el bloque `with etapa(...)`) y cuentan lo que pasa en ella
+# (renglones que entran y salen de un filtro, aciertos de caché...). Quien
+# quiera seguir el avance o medir (la cola de trabajos, diagnostico) registra
+# un oyente para el hilo actual con escuchar(); sin oyentes los avisos no
+# hacen nada.
+
+import threading
+from contextlib import contextmanager
+
+# Etapas de un procesamiento completo, en orden
+ETAPAS = ['lectura', 'procesamiento', 'preparacion', 'filtro', 'agregacion', 'excel']
+
+NOMBRES_ETAPA = {
+    'lectura': 'Leyendo el extracto',
+    'procesamiento': 'Procesando',
+    'preparacion': 'Preparando columnas',
+    'filtro': 'Filtrando renglones',
+    'agregacion': 'Calculando agregados',
+    'excel': 'Generando Excel',
+}
+
+_local = threading.local()
+
+
+def _oyentes():
+    return getattr(_local, 'oyentes', ())
+
+
+def _avisar(evento, nombre, valor=None):
+    for oyente in _oyentes():
+        oyente(evento, nombre, valor)
+
+
+@contextmanager
+def escuchar(oyente):
+    """
+    Llama a oyente(evento, nombre, valor) con cada aviso de este hilo
+    mientras dure el bloque. evento es 'inicio' (empieza la etapa nombre;
+    valor es 'bloque' si es un bloque `with etapa(...)` y None si es una
+    marca), 'fin' (termina el bloque de la etapa nombre) o 'contador' (suma
+    valor al contador nombre).
+    """
+    previos = _oyentes()
+    _local.oyentes = previos + (oyente,)
+    try:
+        yield
+    finally:
+        _local.oyentes = previos
+
+
+def marcar(etapa):
+    """
+    Avisa que el hilo actual empieza `etapa`; termina al empezar la
+    siguiente o al terminar el bloque de etapa que la contiene
+    """
+    _avisar('inicio', etapa)
+
+
+@contextmanager
+def etapa(nombre):
+    """
+    Bloque de la etapa `nombre`. Las etapas marcadas dentro son sus
+    subetapas: terminan con él, y el bloque mide también lo que duran.
+    """
+    _avisar('inicio', nombre, 'bloque')
+    try:
+        yield
+    finally:
+        _avisar('fin', nombre)
+
+
+def contar(nombre, valor=1):
+    """Suma valor al contador `nombre` de la etapa en curso"""
+    _avisar('contador', nombre, valor)
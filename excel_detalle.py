@@ -0,0 +1,177 @@
+# ============================================================================
+# GENERADOR DE EXCEL DE DETALLE - ESCRITURA EN STREAMING
+# ============================================================================
+
+import io
+from datetime import date
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+
+from config import formatear_fecha, obtener_ultimo_dia_habil, renglones_extracto
+from estilos_excel import registrar_estilos
+
+# Renglones de datos por hoja (Excel admite 1,048,576 incluyendo encabezados)
+FILAS_POR_HOJA = 1_000_000
+
+# Renglones que se convierten a objetos de Python a la vez
+TAMANO_BLOQUE = 20_000
+
+# Los encabezados ocupan las filas 1 a 4; los datos empiezan en la 5
+FILA_ENCABEZADOS = 4
+
+# ============================================================================
+# COLUMNAS DEL DETALLE POR REPORTE
+# ============================================================================
+
+# (encabezado, columna de df_procesado o función df -> Series, estilo, ancho)
+COLUMNAS_DETALLE = {
+    'SICOP': [
+        ('UR', 'Nueva UR', 'detalle_texto', 8),
+        ('Programa', 'PROGRAMA_PRESUPUESTARIO', 'detalle_texto', 12),
+        ('Partida', 'Partida', 'detalle_entero', 10),
+        ('CO', 'CONTROL_OPERATIVO', 'detalle_entero', 6),
+        ('Original', 'ORIGINAL', 'detalle_importe', 20),
+        ('Modificado', 'MODIFICADO_AUTORIZADO', 'detalle_importe', 20),
+        ('Ejercido', 'EJERCIDO_REAL', 'detalle_importe', 20),
+        ('Disponible', lambda df: df['MODIFICADO_AUTORIZADO'] - df['EJERCIDO_REAL'], 'detalle_importe', 20),
+    ],
+    'MAP': [
+        ('UR', 'UNIDAD', 'detalle_texto', 8),
+        ('Programa', 'PROGRAMA', 'detalle_texto', 12),
+        ('Partida', 'PARTIDA', 'detalle_entero', 10),
+        ('Capítulo', 'CAPITULO', 'detalle_entero', 9),
+        ('Original', 'ORIGINAL', 'detalle_importe', 20),
+        ('Modificado anual', 'MOD_ANUAL', 'detalle_importe', 20),
+        ('Modificado al periodo', 'MOD_PERIODO', 'detalle_importe', 20),
+        ('Ejercido', 'EJERCIDO', 'detalle_importe', 20),
+        ('Congelado anual', 'CONG_ANUAL', 'detalle_importe', 20),
+        ('Disponible al periodo', lambda df: df['MOD_PERIODO'] - df['EJERCIDO'], 'detalle_importe', 20),
+    ],
+}
+
+# Orden de los renglones: UR y partida
+ORDEN_DETALLE = {
+    'SICOP': ['Nueva UR', 'Partida'],
+    'MAP': ['UNIDAD', 'PARTIDA'],
+}
+
+TITULOS_DETALLE = {
+    'SICOP': 'Detalle por UR y partida del Sistema de Contabilidad y Presupuesto (SICOP)',
+    'MAP': 'Detalle por UR, programa y partida del Módulo de Adecuaciones Presupuestarias (MAP)',
+}
+
+
+# ============================================================================
+# ESCRITURA
+# ============================================================================
+
+def _celda(ws, valor, estilo):
+    cell = WriteOnlyCell(ws, value=valor)
+    cell.style = estilo
+    return cell
+
+
+def _orden_renglones(df, columnas):
+    """Permutación que ordena df por columnas (la primera es la llave principal)"""
+    llaves = [df[col].astype(str).to_numpy() if df[col].dtype == object or str(df[col].dtype) == 'category'
+              else df[col].to_numpy() for col in columnas if col in df.columns]
+    if not llaves:
+        return np.arange(len(df))
+    return np.lexsort(llaves[::-1])
+
+
+def _a_lista(valores):
+    """Convierte un bloque de numpy a objetos de Python; NaN queda como celda vacía"""
+    if valores.dtype.kind == 'f':
+        vacios = np.isnan(valores)
+        if vacios.any():
+            valores = valores.astype(object)
+            valores[vacios] = None
+    return valores.tolist()
+
+
+def _iniciar_hoja(wb, titulo_hoja, titulo, subtitulo, columnas):
+    ws = wb.create_sheet(titulo_hoja)
+    # Anchos, filtros y paneles deben fijarse antes del primer renglón
+    for col_idx, (_, _, _, ancho) in enumerate(columnas, 1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = ancho
+    ws.freeze_panes = f'A{FILA_ENCABEZADOS + 1}'
+
+    ws.append([_celda(ws, titulo, 'detalle_titulo')])
+    ws.append([_celda(ws, subtitulo, 'detalle_subtitulo')])
+    ws.append([])
+    ws.append([_celda(ws, encabezado, 'detalle_encabezado') for encabezado, _, _, _ in columnas])
+    return ws
+
+
+def escribir_detalle(wb, df, tipo, titulo_hoja='Detalle'):
+    """
+    Agrega a un libro write_only una o más hojas con todos los renglones de
+    df (df_procesado del reporte), ordenados por UR y partida.
+
+    Los renglones se escriben en streaming: cada uno se serializa al
+    agregarse, por lo que la memoria no crece con el número de renglones.
+    Las celdas de datos son las mismas en todos los renglones (una por
+    columna con su estilo con nombre) y solo cambia su valor.
+    """
+    tipo = tipo.upper()
+    columnas = COLUMNAS_DETALLE[tipo]
+    registrar_estilos(wb, 'DETALLE')
+
+    arreglos = []
+    for _, origen, _, _ in columnas:
+        serie = origen(df) if callable(origen) else df[origen]
+        if str(serie.dtype) == 'category':
+            serie = serie.astype(object)
+        arreglos.append(serie.to_numpy())
+    orden = _orden_renglones(df, ORDEN_DETALLE[tipo])
+
+    ultimo_habil = obtener_ultimo_dia_habil(date.today())
+    registros = renglones_extracto(df)
+    if registros != len(df):
+        # Extracto agrupado por claves (comparación con el corte anterior): un renglón por grupo
+        subtitulo = f'{registros:,} registros agrupados en {len(df):,} renglones. Corte al {formatear_fecha(ultimo_habil)}.'
+    else:
+        subtitulo = f'{registros:,} registros. Corte al {formatear_fecha(ultimo_habil)}.'
+    ultima_col = get_column_letter(len(columnas))
+
+    n_hojas = max(1, -(-len(df) // FILAS_POR_HOJA))
+    for hoja in range(n_hojas):
+        nombre = titulo_hoja if hoja == 0 else f'{titulo_hoja} ({hoja + 1})'
+        ws = _iniciar_hoja(wb, nombre, TITULOS_DETALLE[tipo], subtitulo, columnas)
+        inicio = hoja * FILAS_POR_HOJA
+        fin = min(len(df), inicio + FILAS_POR_HOJA)
+        ws.auto_filter.ref = f'A{FILA_ENCABEZADOS}:{ultima_col}{FILA_ENCABEZADOS + max(fin - inicio, 1)}'
+
+        celdas = [_celda(ws, None, estilo) for _, _, estilo, _ in columnas]
+        for desde in range(inicio, fin, TAMANO_BLOQUE):
+            indices = orden[desde:min(fin, desde + TAMANO_BLOQUE)]
+            for valores in zip(*[_a_lista(arreglo[indices]) for arreglo in arreglos]):
+                for cell, valor in zip(celdas, valores):
+                    cell.value = valor
+                ws.append(celdas)
+
+
+def generar_excel_detalle(resultados, tipo):
+    """
+    Genera el Excel de detalle (un renglón por registro de df_procesado) en
+    modo write_only de openpyxl.
+
+    Args:
+        resultados: dict con los resultados de procesar_map / procesar_sicop
+        tipo: 'MAP' o 'SICOP'
+
+    Returns:
+        bytes: contenido del archivo Excel
+    """
+    wb = Workbook(write_only=True)
+    escribir_detalle(wb, resultados['df_procesado'], tipo)
+
+    output = io.BytesIO()
+    wb.save(output)
+    output.seek(0)
+
+    return output.getvalue()
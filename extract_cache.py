@@ -0,0 +1,202 @@
+# ============================================================================
+# CACHÉ EN DISCO DE EXTRACTOS YA LEÍDOS (FEATHER)
+# ============================================================================
+
+import os
+import io
+import hashlib
+import tempfile
+import threading
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+from csv_loader import leer_extracto, columnas_reporte
+from etapas import contar
+
+CACHE_DIR = os.environ.get(
+    'SADER_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'sader_reportes_cache')
+)
+CACHE_MAX_BYTES = int(float(os.environ.get('SADER_CACHE_MAX_MB', '1024')) * 1024 * 1024)
+
+# Cambiar si cambia la forma en que csv_loader tipa o poda las columnas
+VERSION_FORMATO = 1
+
+EXTENSION = '.feather'
+
+_estadisticas = {'aciertos': 0, 'fallos': 0, 'escrituras': 0, 'desalojos': 0, 'errores': 0}
+# Los trabajos en segundo plano leen extractos desde varios hilos
+_candado = threading.Lock()
+
+
+def _sumar(contador):
+    with _candado:
+        _estadisticas[contador] += 1
+
+
+def cache_disponible():
+    """Indica si pyarrow está instalado para leer y escribir Feather"""
+    return feather is not None
+
+
+def leer_bytes(archivo):
+    """Obtiene el contenido completo de una ruta, bytes o archivo abierto"""
+    if isinstance(archivo, (bytes, bytearray)):
+        return bytes(archivo)
+    if isinstance(archivo, (str, os.PathLike)):
+        with open(archivo, 'rb') as f:
+            return f.read()
+    if hasattr(archivo, 'getvalue'):
+        return archivo.getvalue()
+    posicion = archivo.tell()
+    datos = archivo.read()
+    archivo.seek(posicion)
+    return datos
+
+
+def hash_contenido(datos):
+    """SHA-256 del contenido del archivo"""
+    return hashlib.sha256(datos).hexdigest()
+
+
+def clave_cache(hash_archivo, tipo, compactar=False):
+    """Clave de la entrada: contenido + reporte + modo de lectura + formato"""
+    modo = 'compacto' if compactar else 'completo'
+    return f'{hash_archivo}_{tipo.upper()}_{modo}_v{VERSION_FORMATO}'
+
+
+def _ruta(clave):
+    return os.path.join(CACHE_DIR, clave + EXTENSION)
+
+
+def _entradas():
+    """Lista (ruta, tamaño, último uso) de las entradas en disco"""
+    if not os.path.isdir(CACHE_DIR):
+        return []
+    entradas = []
+    for nombre in os.listdir(CACHE_DIR):
+        if not nombre.endswith(EXTENSION):
+            continue
+        ruta = os.path.join(CACHE_DIR, nombre)
+        try:
+            info = os.stat(ruta)
+        except FileNotFoundError:
+            continue
+        entradas.append((ruta, info.st_size, info.st_mtime))
+    return entradas
+
+
+def desalojar(max_bytes=None):
+    """Borra las entradas usadas menos recientemente hasta quedar bajo el límite"""
+    limite = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entradas = sorted(_entradas(), key=lambda e: e[2])
+    total = sum(tamano for _, tamano, _ in entradas)
+    for ruta, tamano, _ in entradas:
+        if total <= limite:
+            break
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+        total -= tamano
+        _sumar('desalojos')
+
+
+def _guardar(df, clave):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    ruta = _ruta(clave)
+    # Temporal propio de esta escritura: dos hilos del mismo proceso pueden
+    # guardar el mismo extracto a la vez
+    descriptor, temporal = tempfile.mkstemp(dir=CACHE_DIR, prefix=f'{clave}.', suffix='.tmp')
+    os.close(descriptor)
+    try:
+        # Sin compresión para poder mapear el archivo en memoria al leerlo
+        feather.write_feather(df, temporal, compression='uncompressed')
+        os.replace(temporal, ruta)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+    _sumar('escrituras')
+    desalojar()
+
+
+def _cargar(clave):
+    ruta = _ruta(clave)
+    if not os.path.exists(ruta):
+        return None
+    tabla = feather.read_table(ruta, memory_map=True)
+    os.utime(ruta)  # marca de uso para el desalojo LRU
+    return tabla.to_pandas()
+
+
+def leer_extracto_cacheado(archivo, tipo, compactar=False):
+    """
+    Igual que csv_loader.leer_extracto, pero guarda el DataFrame tipado y
+    podado en disco (Feather) bajo el hash del contenido. Si el mismo archivo
+    se vuelve a subir se lee mapeado en memoria sin volver a parsear el CSV.
+    Sin pyarrow se comporta igual que leer_extracto.
+
+    Returns:
+        tuple (DataFrame, hash del contenido)
+    """
+    datos = leer_bytes(archivo)
+    hash_archivo = hash_contenido(datos)
+    columnas_reporte(tipo)  # valida el tipo antes de tocar el disco
+
+    if not cache_disponible():
+        return leer_extracto(io.BytesIO(datos), tipo, compactar=compactar), hash_archivo
+
+    clave = clave_cache(hash_archivo, tipo, compactar)
+    try:
+        df = _cargar(clave)
+    except Exception:
+        # Entrada corrupta o incompleta: se descarta y se vuelve a leer
+        _sumar('errores')
+        df = None
+        try:
+            os.remove(_ruta(clave))
+        except OSError:
+            pass
+
+    if df is not None:
+        _sumar('aciertos')
+        contar('cache_extractos_aciertos')
+        return df, hash_archivo
+
+    _sumar('fallos')
+    contar('cache_extractos_fallos')
+    df = leer_extracto(io.BytesIO(datos), tipo, compactar=compactar)
+    try:
+        _guardar(df, clave)
+    except OSError:
+        _sumar('errores')
+    return df, hash_archivo
+
+
+def estadisticas():
+    """Contadores del proceso y ocupación actual del caché en disco"""
+    entradas = _entradas()
+    with _candado:
+        contadores = dict(_estadisticas)
+    return {
+        **contadores,
+        'entradas': len(entradas),
+        'bytes': sum(tamano for _, tamano, _ in entradas),
+        'max_bytes': CACHE_MAX_BYTES,
+        'directorio': CACHE_DIR,
+        'disponible': cache_disponible(),
+    }
+
+
+def vaciar_cache():
+    """Elimina todas las entradas del caché"""
+    for ruta, _, _ in _entradas():
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
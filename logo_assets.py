@@ -0,0 +1,60 @@
+# ============================================================================
+# LOGO SADER PARA LOS REPORTES EXCEL
+# ============================================================================
+
+import io
+import os
+from functools import lru_cache
+
+from openpyxl.drawing.image import Image as OpenpyxlImage
+
+RUTA_LOGO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'logo_sader.png')
+
+# Aprox 37.8 pixeles por cm
+PX_POR_CM = 37.8
+
+# (ancho, alto) en pixeles de cada reporte
+TAMANO_LOGO_MAP = (int(6.19 * PX_POR_CM), int(1.25 * PX_POR_CM))     # 6.19 x 1.25 cm
+TAMANO_LOGO_SICOP = (int(7.33 * PX_POR_CM), int(1.39 * PX_POR_CM))   # 7.33 x 1.39 cm
+
+
+@lru_cache(maxsize=1)
+def logo_original():
+    """Bytes PNG del logo a tamaño original (se lee del disco una sola vez)"""
+    with open(RUTA_LOGO, 'rb') as f:
+        return f.read()
+
+
+@lru_cache(maxsize=8)
+def logo_png(ancho_px, alto_px):
+    """
+    Bytes PNG del logo redimensionado a ancho_px x alto_px. Se calcula una
+    vez por tamaño y por proceso; los libros siguientes reutilizan los bytes.
+    Devuelve None si el logo no se puede leer (también queda memorizado, para
+    no reintentar en cada libro).
+    """
+    try:
+        from PIL import Image as PILImage
+
+        pil_image = PILImage.open(io.BytesIO(logo_original()))
+        pil_image = pil_image.resize((ancho_px, alto_px), PILImage.Resampling.LANCZOS)
+        img_stream = io.BytesIO()
+        pil_image.save(img_stream, format="PNG")
+        return img_stream.getvalue()
+    except (ImportError, OSError, ValueError):
+        return None
+
+
+def imagen_logo(ancho_px, alto_px):
+    """
+    Imagen de openpyxl lista para ws.add_image. openpyxl lee el stream al
+    guardar el libro, por eso cada libro recibe su propio BytesIO.
+    Devuelve None si no hay logo disponible.
+    """
+    datos = logo_png(ancho_px, alto_px)
+    if datos is None:
+        return None
+    logo_img = OpenpyxlImage(io.BytesIO(datos))
+    logo_img.width = ancho_px
+    logo_img.height = alto_px
+    return logo_img
@@ -6,16 +6,62 @@ import pandas as pd
 import numpy as np
 from datetime import date
 from config import (
-    MONTH_NAMES, round_like_excel, detectar_fecha_archivo,
-    get_config_by_year, numero_a_letras_mx
+    MONTH_NAMES, round_like_excel, round_like_excel_array, detectar_fecha_archivo,
+    get_config_by_year, numero_a_letras_mx, top_por_grupo, renglones_extracto
 )
+from cubo import construir_cubo, consultar
+from etapas import marcar, contar
+from motor import sumar_por
+
+# Columnas por renglón -> llaves de los totales del reporte MAP
+COLUMNAS_IMPORTE = {
+    'ORIGINAL': 'Original',
+    'MOD_ANUAL': 'ModificadoAnualNeto',
+    'MOD_PERIODO': 'ModificadoPeriodoNeto',
+    'EJERCIDO': 'Ejercido',
+}
+
+# Partidas que no entran al dashboard presupuesto (además del capítulo 1)
+PARTIDAS_EXCLUIR = [39801, 39810]
+
+# Partidas con mayor disponible que se guardan por UR; el dashboard pide
+# otras cantidades al cubo
+TOP_PARTIDAS = 5
+
+
+def sumar_importes(df):
+    """Suma y redondea como Excel las columnas de importe del reporte MAP"""
+    sumas = round_like_excel_array(df[list(COLUMNAS_IMPORTE)].sum(), 2)
+    return dict(zip(COLUMNAS_IMPORTE.values(), sumas.tolist()))
+
+
+def congelados_por_programa(sumas_prog, orden_prog):
+    """
+    Congelado anual por programa para las notas 3/, 4/ y 5/ del cuadro MAP,
+    que excel_map lee de resultados['congelados'].
+    
+    Args:
+        sumas_prog: DataFrame de sumas por PROGRAMA con la columna CONG_ANUAL
+        orden_prog: programas en orden de aparición en el extracto
+    
+    Returns:
+        dict con 'valores' (programa -> importe redondeado como Excel) y
+        'textos' (programa -> importe en letras)
+    """
+    presentes = [prog for prog in orden_prog if prog in sumas_prog.index]
+    valores = round_like_excel_array(sumas_prog['CONG_ANUAL'].reindex(presentes), 2).to_dict()
+    return {
+        'valores': valores,
+        'textos': {prog: numero_a_letras_mx(valor) for prog, valor in valores.items()},
+    }
 
 
 def procesar_map(df, filename):
     """Procesa un archivo MAP y genera el resumen presupuestario"""
+    marcar('preparacion')
     
     # Detectar fecha del archivo
-    fecha_archivo, mes_archivo, año_archivo = detectar_fecha_archivo(filename)
+    fecha_archivo, mes_archivo, año_archivo, origen_fecha = detectar_fecha_archivo(filename, df, con_origen=True)
     
     # Obtener configuración según el año
     config = get_config_by_year(año_archivo)
@@ -42,14 +88,30 @@ def procesar_map(df, filename):
     # Extraer capitulo de PARTIDA
     df['CAPITULO'] = df['PARTIDA'].astype(str).str[0].astype(int)
     
+    # Llave de UR (texto sin espacios) en orden de aparición en el archivo
+    ur_llave = df['UNIDAD'].astype(str).str.strip()
+    
+    # Cubo UR x capítulo x partida x programa con importes mensuales, para
+    # los cortes del dashboard que no están precalculados abajo
+    cubo = construir_cubo(
+        df,
+        {'UR': ur_llave, 'CAPITULO': 'CAPITULO', 'PARTIDA': 'PARTIDA', 'PROGRAMA': 'PROGRAMA'},
+        mensuales={'ORIGINAL': cols_ori, 'MODIFICADO': cols_mod, 'EJERCIDO': cols_eje, 'CONGELADO': cols_cong},
+        mes=mes_archivo,
+    )
+    
+    marcar('filtro')
+    
     # =========================================================================
     # FILTROS PARA DASHBOARD PRESUPUESTO
     # - Excluir Capítulo 1 (Servicios Personales)
-    # - Excluir partida 39801
+    # - Excluir partidas 39801 y 39810
     # =========================================================================
-    PARTIDAS_EXCLUIR = [39801, 39810]  # Partidas a excluir del dashboard
-    
     df_dashboard = df[(df['CAPITULO'] != 1) & (~df['PARTIDA'].isin(PARTIDAS_EXCLUIR))].copy()
+    contar('renglones_entrada', len(df))
+    contar('renglones_salida', len(df_dashboard))
+    
+    marcar('agregacion')
     
     # =========================================================================
     # CALCULOS POR UR PARA DASHBOARD
@@ -59,155 +121,180 @@ def procesar_map(df, filename):
     capitulos_por_ur = {}
     partidas_por_ur = {}
     
-    for ur in df['UNIDAD'].unique():
-        ur_str = str(ur).strip()
-        
-        # Datos filtrados para dashboard (sin cap 1, sin 39801)
-        df_ur = df_dashboard[df_dashboard['UNIDAD'].astype(str).str.strip() == ur_str]
-        
-        if len(df_ur) == 0:
-            continue
-        
-        # KPIs principales
-        original = round_like_excel(df_ur['ORIGINAL'].sum(), 2)
-        mod_anual = round_like_excel(df_ur['MOD_ANUAL'].sum(), 2)
-        mod_periodo = round_like_excel(df_ur['MOD_PERIODO'].sum(), 2)
-        ejercido = round_like_excel(df_ur['EJERCIDO'].sum(), 2)
-        cong_anual = round_like_excel(df_ur['CONG_ANUAL'].sum(), 2)
-        cong_periodo = round_like_excel(df_ur['CONG_PERIODO'].sum(), 2)
-        
-        disp_anual = round_like_excel(mod_anual - ejercido, 2)
-        disp_periodo = round_like_excel(mod_periodo - ejercido, 2)
-        
-        resultados_por_ur[ur_str] = {
-            'Original': original,
-            'Modificado_anual': mod_anual,
-            'Modificado_periodo': mod_periodo,
-            'Ejercido': ejercido,
-            'Disponible_anual': disp_anual,
-            'Disponible_periodo': disp_periodo,
-            'Congelado_anual': cong_anual,
-            'Congelado_periodo': cong_periodo,
-            'Pct_avance_anual': ejercido / mod_anual if mod_anual > 0 else 0,
-            'Pct_avance_periodo': ejercido / mod_periodo if mod_periodo > 0 else 0,
-        }
-        
-        # Por capítulo
-        caps = {}
-        for cap in [2, 3, 4]:
-            df_cap = df_ur[df_ur['CAPITULO'] == cap]
-            caps[str(cap)] = {
-                'Original': round_like_excel(df_cap['ORIGINAL'].sum(), 2),
-                'Modificado_anual': round_like_excel(df_cap['MOD_ANUAL'].sum(), 2),
-                'Modificado_periodo': round_like_excel(df_cap['MOD_PERIODO'].sum(), 2),
-                'Ejercido': round_like_excel(df_cap['EJERCIDO'].sum(), 2),
-            }
-        capitulos_por_ur[ur_str] = caps
-        
-        # Top partidas con mayor disponible
-        df_part = df_ur.groupby(['PARTIDA', 'PROGRAMA']).agg({
-            'ORIGINAL': 'sum',
-            'MOD_ANUAL': 'sum',
-            'MOD_PERIODO': 'sum',
-            'EJERCIDO': 'sum'
-        }).reset_index()
-        df_part['Disponible'] = df_part['MOD_PERIODO'] - df_part['EJERCIDO']
-        df_part = df_part[df_part['Disponible'] > 0].sort_values('Disponible', ascending=False).head(5)
-        
-        partidas_list = []
-        for _, row in df_part.iterrows():
-            partidas_list.append({
-                'Partida': int(row['PARTIDA']),
-                'Programa': row['PROGRAMA'],
-                'Denom_Programa': config['programas_nombres'].get(row['PROGRAMA'], ''),
-                'Disponible': round_like_excel(row['Disponible'], 2),
-            })
-        partidas_por_ur[ur_str] = partidas_list
+    ur_dashboard = ur_llave.loc[df_dashboard.index].rename('UR')
+    
+    # KPIs principales: una sola agregación por UR
+    sumas_ur = sumar_por(
+        df_dashboard, [ur_dashboard],
+        ['ORIGINAL', 'MOD_ANUAL', 'MOD_PERIODO', 'EJERCIDO', 'CONG_ANUAL', 'CONG_PERIODO']
+    )
+    urs_dashboard = [ur for ur in ur_llave.unique() if ur in sumas_ur.index]
+    sumas_ur = sumas_ur.reindex(urs_dashboard)
+    
+    mod_anual = round_like_excel_array(sumas_ur['MOD_ANUAL'], 2)
+    mod_periodo = round_like_excel_array(sumas_ur['MOD_PERIODO'], 2)
+    ejercido = round_like_excel_array(sumas_ur['EJERCIDO'], 2)
+    kpis_ur = pd.DataFrame({
+        'Original': round_like_excel_array(sumas_ur['ORIGINAL'], 2),
+        'Modificado_anual': mod_anual,
+        'Modificado_periodo': mod_periodo,
+        'Ejercido': ejercido,
+        'Disponible_anual': round_like_excel_array(mod_anual - ejercido, 2),
+        'Disponible_periodo': round_like_excel_array(mod_periodo - ejercido, 2),
+        'Congelado_anual': round_like_excel_array(sumas_ur['CONG_ANUAL'], 2),
+        'Congelado_periodo': round_like_excel_array(sumas_ur['CONG_PERIODO'], 2),
+    })
+    
+    for ur_str, datos in kpis_ur.to_dict('index').items():
+        datos['Pct_avance_anual'] = datos['Ejercido'] / datos['Modificado_anual'] if datos['Modificado_anual'] > 0 else 0
+        datos['Pct_avance_periodo'] = datos['Ejercido'] / datos['Modificado_periodo'] if datos['Modificado_periodo'] > 0 else 0
+        resultados_por_ur[ur_str] = datos
+    
+    # Por capítulo (2, 3, 4)
+    capitulos = [2, 3, 4]
+    sumas_cap = sumar_por(
+        df_dashboard, [ur_dashboard, 'CAPITULO'], ['ORIGINAL', 'MOD_ANUAL', 'MOD_PERIODO', 'EJERCIDO']
+    ).reindex(
+        pd.MultiIndex.from_product([urs_dashboard, capitulos], names=['UR', 'CAPITULO']), fill_value=0.0
+    )
+    filas_cap = iter(pd.DataFrame({
+        'Original': round_like_excel_array(sumas_cap['ORIGINAL'], 2),
+        'Modificado_anual': round_like_excel_array(sumas_cap['MOD_ANUAL'], 2),
+        'Modificado_periodo': round_like_excel_array(sumas_cap['MOD_PERIODO'], 2),
+        'Ejercido': round_like_excel_array(sumas_cap['EJERCIDO'], 2),
+    }).to_dict('records'))
+    for ur_str in urs_dashboard:
+        capitulos_por_ur[ur_str] = {str(cap): next(filas_cap) for cap in capitulos}
+    
+    # Top partidas con mayor disponible
+    df_part = sumar_por(
+        df_dashboard, [ur_dashboard, 'PARTIDA', 'PROGRAMA'], ['ORIGINAL', 'MOD_ANUAL', 'MOD_PERIODO', 'EJERCIDO']
+    ).reset_index()
+    df_part['Disponible'] = df_part['MOD_PERIODO'] - df_part['EJERCIDO']
+    df_part = df_part[df_part['Disponible'] > 0]
+    df_part = df_part.assign(Disponible_redondeado=round_like_excel_array(df_part['Disponible'], 2))
+    
+    # Las de mayor disponible de cada UR, en una pasada para todas
+    partidas_por_ur = {ur_str: [] for ur_str in urs_dashboard}
+    df_top = top_por_grupo(df_part, 'UR', 'Disponible', TOP_PARTIDAS)
+    programas = df_top['PROGRAMA'].astype(object)
+    registros = pd.DataFrame({
+        'Partida': df_top['PARTIDA'].astype(int),
+        'Programa': programas,
+        'Denom_Programa': programas.map(config['programas_nombres']).fillna(''),
+        'Disponible': df_top['Disponible_redondeado'].astype(float),
+    }).to_dict('records')
+    for ur_str, registro in zip(df_top['UR'], registros):
+        partidas_por_ur[ur_str].append(registro)
     
     # =========================================================================
     # CALCULOS GLOBALES (para el reporte general MAP - incluye todo)
     # =========================================================================
     
     # Totales generales (sin filtrar, para compatibilidad con reporte MAP original)
-    totales = {
-        'Original': round_like_excel(df['ORIGINAL'].sum(), 2),
-        'ModificadoAnualNeto': round_like_excel(df['MOD_ANUAL'].sum(), 2),
-        'ModificadoPeriodoNeto': round_like_excel(df['MOD_PERIODO'].sum(), 2),
-        'Ejercido': round_like_excel(df['EJERCIDO'].sum(), 2),
-    }
+    totales = sumar_importes(df)
     
     # Por categoría (para reporte MAP original)
-    categorias = {}
-    
-    # Servicios personales = Cap 1
-    df_sp = df[df['CAPITULO'] == 1]
-    categorias['servicios_personales'] = {
-        'Original': round_like_excel(df_sp['ORIGINAL'].sum(), 2),
-        'ModificadoAnualNeto': round_like_excel(df_sp['MOD_ANUAL'].sum(), 2),
-        'ModificadoPeriodoNeto': round_like_excel(df_sp['MOD_PERIODO'].sum(), 2),
-        'Ejercido': round_like_excel(df_sp['EJERCIDO'].sum(), 2),
-    }
-    
-    # Gasto corriente = Cap 2 y 3
-    df_gc = df[df['CAPITULO'].isin([2, 3])]
-    categorias['gasto_corriente'] = {
-        'Original': round_like_excel(df_gc['ORIGINAL'].sum(), 2),
-        'ModificadoAnualNeto': round_like_excel(df_gc['MOD_ANUAL'].sum(), 2),
-        'ModificadoPeriodoNeto': round_like_excel(df_gc['MOD_PERIODO'].sum(), 2),
-        'Ejercido': round_like_excel(df_gc['EJERCIDO'].sum(), 2),
-    }
-    
-    # Subsidios = Cap 4
-    df_sub = df[df['CAPITULO'] == 4]
-    categorias['subsidios'] = {
-        'Original': round_like_excel(df_sub['ORIGINAL'].sum(), 2),
-        'ModificadoAnualNeto': round_like_excel(df_sub['MOD_ANUAL'].sum(), 2),
-        'ModificadoPeriodoNeto': round_like_excel(df_sub['MOD_PERIODO'].sum(), 2),
-        'Ejercido': round_like_excel(df_sub['EJERCIDO'].sum(), 2),
-    }
-    
-    # Otros = Cap 5, 6, 7
-    df_otros = df[df['CAPITULO'].isin([5, 6, 7])]
-    categorias['otros_programas'] = {
-        'Original': round_like_excel(df_otros['ORIGINAL'].sum(), 2),
-        'ModificadoAnualNeto': round_like_excel(df_otros['MOD_ANUAL'].sum(), 2),
-        'ModificadoPeriodoNeto': round_like_excel(df_otros['MOD_PERIODO'].sum(), 2),
-        'Ejercido': round_like_excel(df_otros['EJERCIDO'].sum(), 2),
+    categorias = {
+        'servicios_personales': sumar_importes(df[df['CAPITULO'] == 1]),        # Cap 1
+        'gasto_corriente': sumar_importes(df[df['CAPITULO'].isin([2, 3])]),     # Cap 2 y 3
+        'subsidios': sumar_importes(df[df['CAPITULO'] == 4]),                   # Cap 4
+        'otros_programas': sumar_importes(df[df['CAPITULO'].isin([5, 6, 7])]),  # Cap 5, 6, 7
+        'bienes_muebles': sumar_importes(df[df['CAPITULO'] == 5]),              # Cap 5
     }
     
-    # Bienes muebles = Cap 5
-    df_bm = df[df['CAPITULO'] == 5]
-    categorias['bienes_muebles'] = {
-        'Original': round_like_excel(df_bm['ORIGINAL'].sum(), 2),
-        'ModificadoAnualNeto': round_like_excel(df_bm['MOD_ANUAL'].sum(), 2),
-        'ModificadoPeriodoNeto': round_like_excel(df_bm['MOD_PERIODO'].sum(), 2),
-        'Ejercido': round_like_excel(df_bm['EJERCIDO'].sum(), 2),
-    }
+    # Por programa, en orden de aparición; los congelados anuales son para
+    # las notas 3/, 4/ y 5/ del cuadro MAP
+    sumas_prog = sumar_por(df, ['PROGRAMA'], list(COLUMNAS_IMPORTE) + ['CONG_ANUAL'])
+    orden_prog = df['PROGRAMA'].unique()
+    programas = pd.DataFrame({
+        clave: round_like_excel_array(sumas_prog[col].reindex(orden_prog, fill_value=0), 2)
+        for col, clave in COLUMNAS_IMPORTE.items()
+    }).to_dict('index')
     
-    # Por programa
-    programas = {}
-    for prog in df['PROGRAMA'].unique():
-        df_prog = df[df['PROGRAMA'] == prog]
-        programas[prog] = {
-            'Original': round_like_excel(df_prog['ORIGINAL'].sum(), 2),
-            'ModificadoAnualNeto': round_like_excel(df_prog['MOD_ANUAL'].sum(), 2),
-            'ModificadoPeriodoNeto': round_like_excel(df_prog['MOD_PERIODO'].sum(), 2),
-            'Ejercido': round_like_excel(df_prog['EJERCIDO'].sum(), 2),
-        }
+    congelados = congelados_por_programa(sumas_prog, orden_prog)
     
     return {
         'totales': totales,
         'categorias': categorias,
         'programas': programas,
+        'congelados': congelados,
         'resultados_por_ur': resultados_por_ur,
         'capitulos_por_ur': capitulos_por_ur,
         'partidas_por_ur': partidas_por_ur,
+        'cubo': cubo,
         'metadata': {
             'fecha_archivo': fecha_archivo,
             'mes': mes_archivo,
             'año': año_archivo,
-            'registros': len(df),
+            'registros': renglones_extracto(df),
+            # Sin fecha en el nombre ni en el contenido: se supuso la de hoy
+            'fecha_inferida': origen_fecha == 'hoy',
             'config': config,
         },
         'df_procesado': df,
     }
+
+
+def consultar_dashboard_ur(cubo, ur, mes, config, capitulos=(2, 3, 4), top=TOP_PARTIDAS):
+    """
+    KPIs, capítulos y partidas de una UR para el dashboard presupuesto al
+    corte de cualquier mes, desde el cubo de procesar_map. Devuelve lo mismo
+    que resultados_por_ur[ur], capitulos_por_ur[ur] y partidas_por_ur[ur];
+    al mes del archivo los importes coinciden con ellos.
+    
+    El ejercido al corte es el acumulado hasta el mes; en el mes del archivo
+    (o después) es todo lo registrado, igual que en el reporte. top es la
+    cantidad de partidas (None = todas las que tienen disponible).
+    """
+    filtro = {'UR': [ur]}
+    excluir = {'CAPITULO': [1], 'PARTIDA': PARTIDAS_EXCLUIR}
+    columna_ejercido = 'EJERCIDO_anual' if mes >= cubo['mes'] else 'EJERCIDO_periodo'
+    
+    def importes(sumas):
+        mod_anual = round_like_excel_array(sumas['MODIFICADO_anual'], 2)
+        mod_periodo = round_like_excel_array(sumas['MODIFICADO_periodo'], 2)
+        ejercido = round_like_excel_array(sumas[columna_ejercido], 2)
+        return pd.DataFrame({
+            'Original': round_like_excel_array(sumas['ORIGINAL_anual'], 2),
+            'Modificado_anual': mod_anual,
+            'Modificado_periodo': mod_periodo,
+            'Ejercido': ejercido,
+            'Disponible_anual': round_like_excel_array(mod_anual - ejercido, 2),
+            'Disponible_periodo': round_like_excel_array(mod_periodo - ejercido, 2),
+            'Congelado_anual': round_like_excel_array(sumas['CONGELADO_anual'], 2),
+            'Congelado_periodo': round_like_excel_array(sumas['CONGELADO_periodo'], 2),
+        })
+    
+    datos = importes(consultar(cubo, filtros=filtro, excluir=excluir, mes=mes)).to_dict('records')[0]
+    datos['Pct_avance_anual'] = datos['Ejercido'] / datos['Modificado_anual'] if datos['Modificado_anual'] > 0 else 0
+    datos['Pct_avance_periodo'] = datos['Ejercido'] / datos['Modificado_periodo'] if datos['Modificado_periodo'] > 0 else 0
+    
+    sumas_cap = consultar(cubo, ['CAPITULO'], filtros={**filtro, 'CAPITULO': list(capitulos)},
+                          excluir={'PARTIDA': PARTIDAS_EXCLUIR}, mes=mes)
+    filas_cap = importes(sumas_cap)[['Original', 'Modificado_anual', 'Modificado_periodo', 'Ejercido']]
+    por_capitulo = dict(zip(sumas_cap['CAPITULO'].astype(int), filas_cap.to_dict('records')))
+    vacio = dict.fromkeys(filas_cap.columns, 0.0)
+    capitulos_ur = {str(cap): por_capitulo.get(cap, dict(vacio)) for cap in capitulos}
+    
+    sumas_part = consultar(cubo, ['PARTIDA', 'PROGRAMA'], filtros=filtro, excluir=excluir, mes=mes)
+    sumas_part['Disponible'] = sumas_part['MODIFICADO_periodo'] - sumas_part[columna_ejercido]
+    sumas_part = sumas_part[sumas_part['Disponible'] > 0]
+    if top is not None:
+        sumas_part = sumas_part.nlargest(top, 'Disponible')
+    else:
+        sumas_part = sumas_part.sort_values('Disponible', ascending=False, kind='stable')
+    partidas = [
+        {
+            'Partida': int(partida),
+            'Programa': programa,
+            'Denom_Programa': config['programas_nombres'].get(programa, ''),
+            'Disponible': float(disponible),
+        }
+        for partida, programa, disponible in zip(
+            sumas_part['PARTIDA'], sumas_part['PROGRAMA'],
+            round_like_excel_array(sumas_part['Disponible'], 2),
+        )
+    ]
+    
+    return datos, capitulos_ur, partidas
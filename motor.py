@@ -0,0 +1,153 @@
+# ============================================================================
+# MOTOR DE AGREGACIÓN: PANDAS, ARROW O POLARS
+# ============================================================================
+# Las sumas agrupadas de map_processor y sicop_processor (por UR, capítulo,
+# partida, programa...) pasan por sumar_por, que las resuelve con el motor
+# elegido: pandas (groupby, el de siempre), arrow (group_by de
+# pyarrow.compute) o polars (group_by de una consulta lazy). Todos devuelven
+# el mismo DataFrame que df.groupby(claves, observed=True)[columnas].sum(); el
+# orden de las sumas en punto flotante puede cambiar en el último dígito,
+# nunca al centavo. El motor se elige con SADER_MOTOR o seleccionar_motor.
+#
+# Arrow y Polars existen para comparar motores, no como optimización: cada
+# llamada convierte a Arrow las columnas que suma (no hay nada que empujar a
+# la lectura, el DataFrame ya está en memoria) y el resultado de vuelta a
+# pandas, y esa conversión cuesta lo que ahorran sus groupby. En los
+# benchmarks de 1M renglones no son más rápidos que pandas.
+
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+MOTORES = ['pandas', 'arrow', 'polars']
+
+MOTOR = os.environ.get('SADER_MOTOR', 'pandas')
+
+
+def motores_disponibles():
+    """Motores que se pueden usar con las dependencias instaladas"""
+    disponibles = {'pandas': True, 'arrow': pa is not None, 'polars': pl is not None and pa is not None}
+    return [motor for motor in MOTORES if disponibles[motor]]
+
+
+def seleccionar_motor(nombre):
+    """
+    Fija el motor para el resto de la ejecución. También lo deja en
+    SADER_MOTOR para que lo hereden los procesos que se creen después.
+    """
+    global MOTOR
+    if nombre not in MOTORES:
+        raise ValueError(f"Motor desconocido: {nombre} (opciones: {', '.join(MOTORES)})")
+    if nombre not in motores_disponibles():
+        raise ValueError(f'El motor {nombre} requiere instalar {"pyarrow" if nombre == "arrow" else "polars y pyarrow"}')
+    MOTOR = nombre
+    os.environ['SADER_MOTOR'] = nombre
+
+
+def motor_activo():
+    return MOTOR
+
+
+# ============================================================================
+# SUMAS AGRUPADAS
+# ============================================================================
+
+def _serie_clave(df, clave):
+    return clave if isinstance(clave, pd.Series) else df[clave]
+
+
+def _a_tabla(df, claves, columnas):
+    """
+    Tabla Arrow con las claves y los importes. Las claves categóricas viajan
+    como sus códigos (nulo = NaN), para ordenar por el orden de las categorías.
+    """
+    arreglos = {}
+    categorias = {}
+    for clave in claves:
+        serie = _serie_clave(df, clave)
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            codigos = serie.cat.codes.to_numpy()
+            categorias[serie.name] = serie.cat.categories
+            arreglos[serie.name] = pa.array(codigos, mask=codigos < 0)
+        else:
+            arreglos[serie.name] = pa.Array.from_pandas(serie)
+    for col in columnas:
+        arreglos[col] = pa.Array.from_pandas(df[col])
+    return pa.table(arreglos), categorias
+
+
+def _a_pandas(tabla, nombres, columnas, categorias):
+    """Resultado agrupado (ya sin claves nulas y ordenado) como el de groupby"""
+    resultado = tabla.to_pandas()
+    for nombre, valores in categorias.items():
+        resultado[nombre] = pd.Categorical.from_codes(resultado[nombre], categories=valores)
+    return resultado.set_index(nombres)[columnas]
+
+
+def _sumar_arrow(tabla, nombres, columnas):
+    # min_count=0: un grupo sin valores suma 0, como en pandas
+    opciones = pc.ScalarAggregateOptions(skip_nulls=True, min_count=0)
+    agrupado = tabla.group_by(nombres).aggregate([(col, 'sum', opciones) for col in columnas])
+    agrupado = agrupado.rename_columns([
+        nombre[:-len('_sum')] if nombre.endswith('_sum') else nombre for nombre in agrupado.column_names
+    ])
+    # groupby de pandas descarta las claves nulas (dropna=True)
+    for nombre in nombres:
+        agrupado = agrupado.filter(pc.is_valid(agrupado[nombre]))
+    return agrupado.sort_by([(nombre, 'ascending') for nombre in nombres])
+
+
+def _sumar_polars(tabla, nombres, columnas):
+    consulta = (
+        pl.from_arrow(tabla).lazy()
+        .drop_nulls(nombres)
+        .group_by(nombres)
+        .agg([pl.col(col).sum() for col in columnas])
+        .sort(nombres)
+    )
+    return consulta.collect().to_arrow()
+
+
+def sumar_por(df, claves, columnas, motor=None):
+    """
+    Suma `columnas` de df agrupando por `claves`, con el motor indicado (por
+    omisión el activo). Con arrow o polars convierte las claves y columnas
+    en cada llamada.
+
+    Args:
+        df: DataFrame con los importes
+        claves: nombres de columna de df o Series alineadas con df (con nombre)
+        columnas: columnas de df a sumar
+        motor: 'pandas', 'arrow' o 'polars'
+
+    Returns:
+        DataFrame igual al de df.groupby(claves, observed=True)[columnas].sum():
+        índice (Multi)Index por las claves ordenadas, solo combinaciones con
+        renglones; las claves categóricas conservan sus categorías.
+    """
+    motor = motor or MOTOR
+    columnas = list(columnas)
+    if motor == 'pandas':
+        return df.groupby(list(claves), observed=True)[columnas].sum()
+
+    nombres = [_serie_clave(df, clave).name for clave in claves]
+    tabla, categorias = _a_tabla(df, claves, columnas)
+    if motor == 'arrow':
+        agrupado = _sumar_arrow(tabla, nombres, columnas)
+    elif motor == 'polars':
+        agrupado = _sumar_polars(tabla, nombres, columnas)
+    else:
+        raise ValueError(f"Motor desconocido: {motor} (opciones: {', '.join(MOTORES)})")
+    return _a_pandas(agrupado, nombres, columnas, categorias)
@@ -0,0 +1,105 @@
+# ============================================================================
+# PERFILADO OPCIONAL DE UN PROCESAMIENTO (CPROFILE / PYINSTRUMENT)
+# ============================================================================
+# Para investigar un corte lento sin tocar el código: con SADER_PERFILAR (o la
+# opción oculta del menú lateral, o --perfilar en procesar_lote) el
+# procesamiento y el Excel de un archivo corren bajo un perfilador y el
+# resultado queda en un archivo para adjuntarlo a un ticket:
+# - pyinstrument (muestreo, si está instalado): página HTML con el árbol de
+#   llamadas, PERFIL.html
+# - cProfile: estadísticas PERFIL.prof (pstats, snakeviz, gprof2dot...)
+#
+# SADER_PERFILAR acepta 1 (pyinstrument si está, si no cProfile),
+# pyinstrument o cprofile. Los perfiles de la app van a SADER_PERFILES_DIR;
+# los de procesar_lote, junto a los Excel.
+#
+# cProfile (biblioteca estándar) es el camino soportado; pyinstrument es un
+# extra opcional que no está en requirements.txt. Los procesamientos
+# perfilados corren de uno en uno: Python 3.12+ no permite dos perfiladores
+# activos a la vez, y la cola de trabajos corre varios en paralelo.
+
+import cProfile
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+PERFILADORES = ['pyinstrument', 'cprofile']
+
+MODO = os.environ.get('SADER_PERFILAR', '').strip().lower()
+
+DIRECTORIO = os.environ.get(
+    'SADER_PERFILES_DIR', os.path.join(tempfile.gettempdir(), 'sader_reportes_perfiles')
+)
+
+# Un solo bloque perfilado a la vez en el proceso
+_candado = threading.Lock()
+
+
+def perfilador_elegido(forzar=False):
+    """
+    Perfilador a usar: el de SADER_PERFILAR o, con forzar, el mejor
+    disponible. None si el perfilado está apagado.
+    """
+    modo = MODO if MODO not in ('', '0') else ('1' if forzar else '')
+    if not modo:
+        return None
+    if modo == 'cprofile' or pyinstrument is None:
+        return 'cprofile'
+    return 'pyinstrument'
+
+
+def _nombre_archivo(nombre, extension):
+    limpio = re.sub(r'[^A-Za-z0-9_.-]+', '_', nombre).strip('_') or 'perfil'
+    return f"Perfil_{limpio}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}{extension}"
+
+
+@contextmanager
+def perfilar(nombre, directorio=None, forzar=False):
+    """
+    Corre el bloque bajo el perfilador si el perfilado está activo (o con
+    forzar) y guarda el resultado en directorio (por omisión DIRECTORIO).
+    Solo mide el hilo actual. Si otro hilo está perfilando, espera a que
+    termine antes de correr el bloque (un solo perfilador activo por
+    proceso, requisito de cProfile en Python 3.12+).
+
+    Yields:
+        dict con perfilador y, al salir del bloque, archivo (ruta del
+        perfil); vacío si no se perfila
+    """
+    perfilador = perfilador_elegido(forzar)
+    info = {}
+    if perfilador is None:
+        yield info
+        return
+
+    directorio = directorio or DIRECTORIO
+    os.makedirs(directorio, exist_ok=True)
+    info['perfilador'] = perfilador
+    with _candado:
+        if perfilador == 'pyinstrument':
+            perfil = pyinstrument.Profiler()
+            perfil.start()
+            try:
+                yield info
+            finally:
+                perfil.stop()
+                info['archivo'] = os.path.join(directorio, _nombre_archivo(nombre, '.html'))
+                with open(info['archivo'], 'w', encoding='utf-8') as f:
+                    f.write(perfil.output_html())
+        else:
+            perfil = cProfile.Profile()
+            perfil.enable()
+            try:
+                yield info
+            finally:
+                perfil.disable()
+                info['archivo'] = os.path.join(directorio, _nombre_archivo(nombre, '.prof'))
+                perfil.dump_stats(info['archivo'])
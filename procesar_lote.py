@@ -0,0 +1,351 @@
+# ============================================================================
+# PROCESAMIENTO POR LOTE DE EXTRACTOS MAP Y SICOP (SIN STREAMLIT)
+# ============================================================================
+"""
+Uso, desde la raíz del proyecto:
+
+    python procesar_lote.py extractos/2025 --salida reportes/2025
+    python procesar_lote.py extractos/ --salida reportes   # incluye subdirectorios
+    python procesar_lote.py "extractos/*_SICOP.csv" --detalle --trabajadores 4
+    python procesar_lote.py extractos/ --tipo MAP --memoria-mb 6000
+    python procesar_lote.py extractos/2026 --motor arrow
+    python procesar_lote.py extractos/2026/15-MAY-2026_SICOP.csv --perfilar
+
+Cada extracto (CSV) se lee, se procesa con procesar_map / procesar_sicop y se
+genera su Excel en un proceso del pool. El tipo de reporte sale del nombre
+(DD-MMM-YYYY_SISTEMA.csv) o de --tipo, y la fecha con detectar_fecha_archivo:
+del nombre o, en MAP, del último mes con ejercido. Un archivo sin fecha que
+tampoco se pueda deducir del contenido se reporta como error en lugar de
+procesarse con la fecha de hoy.
+Los directorios se recorren con sus subdirectorios. Si dos extractos de
+directorios distintos se llaman igual, el nombre de sus Excel lleva además
+la ruta relativa (2025_15-MAY-2025_SICOP) para que no se sobrescriban.
+Al terminar se escribe resumen_lote.json en el directorio de salida con los
+totales de cada archivo. Sale con código 1 si algún archivo falló.
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from agregacion_paralela import nucleos_disponibles
+from config import fecha_en_nombre, mes_por_contenido
+from diagnostico import medir, escribir_json
+from etapas import contar, etapa
+import perfilado
+from motor import MOTORES, motor_activo, seleccionar_motor
+
+REPORTES = ['MAP', 'SICOP']
+
+# Tipo de reporte por el sufijo del nombre: 15-MAY-2026_SICOP.csv
+PATRON_TIPO = re.compile(r'(?<![A-Z])(MAP|SICOP)(?![A-Z])', re.IGNORECASE)
+
+NOMBRES_EXCEL = {
+    'MAP': 'Cuadro_Presupuesto',
+    'SICOP': 'Estado_Ejercicio_SICOP',
+}
+
+# Estimación de memoria pico por archivo: procesar un extracto ocupa del
+# orden de 10 veces el tamaño del CSV (1M renglones SICOP: 200 MB -> 1.8 GB)
+FACTOR_MEMORIA = 10
+MEMORIA_BASE_MB = 250
+
+# Fracción de la memoria disponible que se usa si no se indica --memoria-mb
+FRACCION_MEMORIA = 0.75
+
+ARCHIVO_RESUMEN = 'resumen_lote.json'
+
+
+# ============================================================================
+# ARCHIVOS Y RECURSOS
+# ============================================================================
+
+def buscar_extractos(entradas):
+    """
+    Rutas de CSV a partir de archivos, directorios (con sus subdirectorios)
+    o patrones glob (admiten **), sin repetir
+    """
+    rutas = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            for extension in ('*.csv', '*.CSV'):
+                rutas.extend(glob.glob(os.path.join(entrada, '**', extension), recursive=True))
+        elif os.path.isfile(entrada):
+            rutas.append(entrada)
+        else:
+            rutas.extend(glob.glob(entrada, recursive=True))
+    return sorted(dict.fromkeys(os.path.abspath(ruta) for ruta in rutas))
+
+
+def nombres_salida(rutas):
+    """
+    Nombre base de los archivos de salida de cada ruta: el del extracto sin
+    extensión o, si otro extracto del lote se llama igual, su ruta relativa
+    al directorio común con los separadores como _.
+
+    Raises:
+        ValueError: si aun así dos extractos quedan con el mismo nombre
+    """
+    bases = {ruta: os.path.splitext(os.path.basename(ruta))[0] for ruta in rutas}
+    cuentas = Counter(base.lower() for base in bases.values())
+    repetidas = {base for base, veces in cuentas.items() if veces > 1}
+    if repetidas:
+        comun = os.path.commonpath([os.path.dirname(ruta) for ruta in rutas])
+        for ruta, base in bases.items():
+            if base.lower() in repetidas:
+                relativa = os.path.splitext(os.path.relpath(ruta, comun))[0]
+                bases[ruta] = re.sub(r'[\\/]+', '_', relativa)
+    vistos = {}
+    for ruta, base in bases.items():
+        if base.lower() in vistos:
+            raise ValueError(f'{vistos[base.lower()]} y {ruta} generarían el mismo Excel ({base})')
+        vistos[base.lower()] = ruta
+    return bases
+
+
+def detectar_tipo(ruta, tipo=None):
+    """'MAP' o 'SICOP' según --tipo o el nombre del archivo; None si no se puede saber"""
+    if tipo:
+        return tipo.upper()
+    encontrado = PATRON_TIPO.search(os.path.splitext(os.path.basename(ruta))[0])
+    return encontrado.group(1).upper() if encontrado else None
+
+
+def memoria_disponible_mb():
+    """Memoria física disponible en MB, o None si el sistema no la reporta"""
+    # Linux: MemAvailable cuenta también el caché de páginas que se puede
+    # liberar; las páginas libres (SC_AVPHYS_PAGES) lo dejan fuera
+    try:
+        with open('/proc/meminfo') as f:
+            for renglon in f:
+                if renglon.startswith('MemAvailable:'):
+                    return int(renglon.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        pass
+    try:
+        import psutil
+        return psutil.virtual_memory().available / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def memoria_estimada_mb(ruta):
+    return MEMORIA_BASE_MB + FACTOR_MEMORIA * os.path.getsize(ruta) / (1024 * 1024)
+
+
+def calcular_trabajadores(rutas, trabajadores=None, memoria_mb=None):
+    """
+    Procesos del pool: a lo más uno por núcleo y por archivo, y no más de los
+    que caben en el presupuesto de memoria con el archivo más grande.
+    """
+    limite = trabajadores or nucleos_disponibles()
+    limite = min(limite, len(rutas)) if rutas else 1
+    if memoria_mb is None:
+        disponible = memoria_disponible_mb()
+        memoria_mb = disponible * FRACCION_MEMORIA if disponible is not None else None
+    if memoria_mb is not None and rutas:
+        por_archivo = max(memoria_estimada_mb(ruta) for ruta in rutas)
+        limite = min(limite, int(memoria_mb // por_archivo))
+    return max(1, limite)
+
+
+# ============================================================================
+# TRABAJO POR ARCHIVO (CORRE EN LOS PROCESOS DEL POOL)
+# ============================================================================
+
+def _escribir(ruta, datos):
+    temporal = f'{ruta}.{os.getpid()}.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(datos)
+    os.replace(temporal, ruta)
+
+
+def procesar_archivo(ruta, tipo, salida, detalle=False, perfilar=False, base=None):
+    """
+    Lee, procesa y genera el Excel de un extracto. Devuelve solo el resumen
+    (totales, rutas, tiempos y diagnóstico por etapa), no el DataFrame, para
+    no copiarlo de vuelta al proceso principal. Con perfilar (o
+    SADER_PERFILAR) el procesamiento y el Excel corren bajo el perfilador y
+    el perfil queda junto al Excel. base es el nombre de los archivos de
+    salida (por omisión, el del extracto sin extensión).
+    """
+    from csv_loader import leer_extracto
+    from result_cache import PROCESADORES, GENERADORES_EXCEL
+    from excel_detalle import generar_excel_detalle
+
+    nombre = os.path.basename(ruta)
+    base = base or os.path.splitext(nombre)[0]
+    tiempos = {}
+
+    with medir(archivo=nombre, tipo=tipo) as registro:
+        inicio = time.perf_counter()
+        with etapa('lectura'):
+            df = leer_extracto(ruta, tipo)
+            contar('renglones', len(df))
+        tiempos['lectura'] = time.perf_counter() - inicio
+
+        fecha_del_nombre = fecha_en_nombre(nombre) is not None
+        if not fecha_del_nombre and mes_por_contenido(df) is None:
+            raise ValueError('no se pudo determinar la fecha del corte (nombre DD-MMM-AAAA_TIPO.csv o AAAA-MM-DD)')
+
+        with perfilado.perfilar(base, directorio=salida, forzar=perfilar) as perfil:
+            inicio = time.perf_counter()
+            with etapa('procesamiento'):
+                resultados = PROCESADORES[tipo](df, nombre)
+            tiempos['procesar'] = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            with etapa('excel'):
+                excel = os.path.join(salida, f'{NOMBRES_EXCEL[tipo]}_{base}.xlsx')
+                _escribir(excel, GENERADORES_EXCEL[tipo](resultados))
+                archivos = {'excel': excel}
+                if detalle:
+                    archivos['excel_detalle'] = os.path.join(salida, f'Detalle_{base}.xlsx')
+                    _escribir(archivos['excel_detalle'], generar_excel_detalle(resultados, tipo))
+            tiempos['excel'] = time.perf_counter() - inicio
+    if 'archivo' in perfil:
+        archivos['perfil'] = perfil['archivo']
+
+    metadata = resultados['metadata']
+    return {
+        'fecha': metadata['fecha_archivo'].isoformat(),
+        'fecha_origen': 'nombre' if fecha_del_nombre else 'contenido',
+        'registros': len(df),
+        'registros_procesados': metadata['registros'],
+        'mes': metadata['mes'],
+        'año': metadata['año'],
+        'totales': {clave: float(valor) for clave, valor in resultados['totales'].items()},
+        'archivos': archivos,
+        'tiempos_s': {nombre_etapa: round(segundos, 3) for nombre_etapa, segundos in tiempos.items()},
+        'diagnostico': registro,
+    }
+
+
+# ============================================================================
+# ORQUESTACIÓN
+# ============================================================================
+
+def _renglon(caso):
+    if 'error' in caso:
+        return f"ERROR {caso['archivo']}: {caso['error']}"
+    total = sum(caso['tiempos_s'].values())
+    return f"{caso['tipo']:<5} {caso['archivo']} {caso['registros']:,} registros {total:.1f}s"
+
+
+def procesar_lote(rutas, salida, tipo=None, detalle=False, trabajadores=None, memoria_mb=None, log_json=False,
+                  perfilar=False):
+    """
+    Procesa todos los extractos en un pool de procesos y devuelve el resumen
+    (el mismo dict que se guarda como resumen_lote.json). Con log_json
+    escribe en stderr el diagnóstico de cada archivo como una línea JSON;
+    con perfilar deja el perfil de cada archivo junto a su Excel. Lanza
+    ValueError si dos extractos generarían el mismo Excel (nombres_salida).
+    """
+    os.makedirs(salida, exist_ok=True)
+    bases = nombres_salida(rutas)
+    casos = {}
+    pendientes = []
+    for ruta in rutas:
+        fecha = fecha_en_nombre(os.path.basename(ruta))
+        caso = {'archivo': os.path.basename(ruta), 'ruta': ruta, 'tipo': detectar_tipo(ruta, tipo),
+                'fecha': fecha[0].isoformat() if fecha else None}
+        casos[ruta] = caso
+        if caso['tipo'] not in REPORTES:
+            caso['error'] = 'no se pudo determinar el tipo de reporte (usa --tipo MAP o SICOP)'
+            print(_renglon(caso), flush=True)
+        else:
+            pendientes.append(ruta)
+
+    n_trabajadores = calcular_trabajadores(pendientes, trabajadores, memoria_mb)
+    inicio = time.perf_counter()
+    if pendientes:
+        # Un archivo por proceso: la memoria de un extracto grande se libera al terminar
+        with ProcessPoolExecutor(max_workers=n_trabajadores, max_tasks_per_child=1) as pool:
+            # Primero los más grandes, para que no queden al final solos
+            orden = sorted(pendientes, key=os.path.getsize, reverse=True)
+            futuros = {
+                pool.submit(procesar_archivo, ruta, casos[ruta]['tipo'], salida, detalle, perfilar, bases[ruta]): ruta
+                for ruta in orden
+            }
+            for futuro in as_completed(futuros):
+                caso = casos[futuros[futuro]]
+                try:
+                    caso.update(futuro.result())
+                except Exception as e:
+                    caso['error'] = f'{type(e).__name__}: {e}'
+                print(_renglon(caso), flush=True)
+                if log_json:
+                    escribir_json(caso.get('diagnostico') or {'archivo': caso['archivo'], 'tipo': caso['tipo'],
+                                                                'error': caso['error']})
+
+    ordenados = sorted(casos.values(), key=lambda c: (c['fecha'] or '', c['tipo'] or '', c['archivo']))
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'parametros': {'tipo': tipo, 'detalle': detalle, 'perfilar': perfilar, 'trabajadores': n_trabajadores,
+                       'memoria_mb': memoria_mb, 'motor': motor_activo()},
+        'duracion_s': round(time.perf_counter() - inicio, 3),
+        'procesados': sum('error' not in c for c in ordenados),
+        'errores': sum('error' in c for c in ordenados),
+        'archivos': ordenados,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Genera los reportes MAP/SICOP de varios extractos sin Streamlit')
+    parser.add_argument('entradas', nargs='+', help='archivos CSV, directorios o patrones glob')
+    parser.add_argument('--salida', default='reportes', help='directorio de los Excel y del resumen')
+    parser.add_argument('--tipo', type=str.upper, choices=REPORTES,
+                        help='tipo de reporte si no viene en el nombre de los archivos')
+    parser.add_argument('--detalle', action='store_true', help='generar también el Excel de detalle')
+    parser.add_argument('--trabajadores', type=int, help='procesos en paralelo (por omisión, uno por núcleo)')
+    parser.add_argument('--memoria-mb', type=float,
+                        help='memoria total para el lote (por omisión, 75%% de la disponible)')
+    parser.add_argument('--log-json', action='store_true',
+                        help='escribir en stderr el diagnóstico por etapa de cada archivo (una línea JSON)')
+    parser.add_argument('--perfilar', action='store_true',
+                        help='perfilar procesamiento y Excel de cada archivo (pyinstrument o cProfile)')
+    parser.add_argument('--motor', choices=MOTORES, help='motor de agregación (por omisión SADER_MOTOR o pandas)')
+    args = parser.parse_args(argv)
+
+    if args.motor:
+        try:
+            seleccionar_motor(args.motor)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+
+    rutas = buscar_extractos(args.entradas)
+    if not rutas:
+        print('No se encontraron extractos CSV', file=sys.stderr)
+        return 2
+    try:
+        nombres_salida(rutas)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    resumen = procesar_lote(rutas, args.salida, tipo=args.tipo, detalle=args.detalle,
+                            trabajadores=args.trabajadores, memoria_mb=args.memoria_mb, log_json=args.log_json,
+                            perfilar=args.perfilar)
+    ruta_resumen = os.path.join(args.salida, ARCHIVO_RESUMEN)
+    with open(ruta_resumen, 'w', encoding='utf-8') as f:
+        json.dump(resumen, f, indent=2, ensure_ascii=False)
+    print(f"{resumen['procesados']} procesados, {resumen['errores']} con error "
+          f"({resumen['parametros']['trabajadores']} procesos, {resumen['duracion_s']:.1f}s). "
+          f'Resumen: {ruta_resumen}')
+    return 1 if resumen['errores'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
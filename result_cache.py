@@ -0,0 +1,180 @@
+# ============================================================================
+# MEMORIA DE RESULTADOS DE PROCESAMIENTO ENTRE RERUNS DE STREAMLIT
+# ============================================================================
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import agregacion_paralela
+import config
+import csv_loader
+import cubo
+import etapas
+import cortes
+import map_processor
+import motor
+import sicop_processor
+import excel_map
+import excel_sicop
+import excel_detalle
+import estilos_excel
+import logo_assets
+from config import fecha_en_nombre
+from etapas import contar
+
+MAX_ENTRADAS = 8
+
+PROCESADORES = {
+    'MAP': map_processor.procesar_map,
+    'SICOP': sicop_processor.procesar_sicop,
+}
+
+GENERADORES_EXCEL = {
+    'MAP': excel_map.generar_excel_map,
+    'SICOP': excel_sicop.generar_excel_sicop,
+}
+
+
+def _version_codigo(*modulos):
+    """Hash del código fuente de los módulos que determinan un resultado"""
+    h = hashlib.sha256()
+    for modulo in modulos:
+        with open(modulo.__file__, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+VERSION_CODIGO = _version_codigo(
+    agregacion_paralela, config, cortes, csv_loader, cubo, etapas, map_processor, motor, sicop_processor
+)
+VERSION_EXCEL = _version_codigo(excel_map, excel_sicop, excel_detalle, estilos_excel, logo_assets)
+
+_resultados = OrderedDict()
+_candado = threading.Lock()
+_estadisticas = {'aciertos': 0, 'fallos': 0, 'invalidaciones': 0, 'excel_aciertos': 0, 'excel_generados': 0}
+
+
+def clave_resultados(hash_archivo, tipo, filename):
+    """
+    Clave de memoización: contenido del archivo, tipo de reporte, fecha
+    detectada en el nombre (define mes y configuración de año), año en curso
+    (define el cierre de año anterior) y versión del código. Sin fecha en el
+    nombre el procesador la toma del contenido (ya en el hash) o de hoy, así
+    que la clave lleva la fecha de hoy.
+    """
+    encontrada = fecha_en_nombre(filename)
+    fecha_archivo = encontrada[0] if encontrada else date.today()
+    return (hash_archivo, tipo.upper(), fecha_archivo, fecha_archivo.year, date.today().year, VERSION_CODIGO)
+
+
+def procesar_cacheado(df, filename, tipo, hash_archivo, recalcular=False):
+    """
+    Ejecuta procesar_map / procesar_sicop una sola vez por clave y devuelve
+    el mismo dict de resultados en los reruns siguientes. El procesador
+    recibe una copia superficial de df, porque procesar_map agrega columnas
+    (ORIGINAL, CAPITULO...) y df puede venir del caché de extractos.
+    Los resultados devueltos son compartidos: tratarlos como de solo lectura.
+    Con recalcular=True (perfilado) procesa aunque ya estén memorizados, sin
+    reemplazar los que otras sesiones ya usan.
+    """
+    clave = clave_resultados(hash_archivo, tipo, filename)
+    with _candado:
+        if clave in _resultados and not recalcular:
+            _resultados.move_to_end(clave)
+            _estadisticas['aciertos'] += 1
+            contar('cache_resultados_aciertos')
+            return _resultados[clave]['resultados']
+
+    contar('cache_resultados_fallos')
+    resultados = PROCESADORES[tipo.upper()](df.copy(deep=False), filename)
+
+    with _candado:
+        _estadisticas['fallos'] += 1
+        # Cada entrada guarda también los Excel generados a partir de ella
+        _resultados.setdefault(clave, {'resultados': resultados, 'excel': {}})
+        _resultados.move_to_end(clave)
+        while len(_resultados) > MAX_ENTRADAS:
+            _resultados.popitem(last=False)
+    return resultados
+
+
+def resultados_memorizados(hash_archivo, tipo, filename):
+    """
+    Resultados ya memorizados para el archivo, o None si nunca se procesó o
+    ya se desalojaron (no procesa nada).
+    """
+    clave = clave_resultados(hash_archivo, tipo, filename)
+    with _candado:
+        entrada = _resultados.get(clave)
+        if entrada is None:
+            return None
+        _resultados.move_to_end(clave)
+        return entrada['resultados']
+
+
+def excel_cacheado(resultados, hash_archivo, tipo, filename, detalle=False, recalcular=False):
+    """
+    Genera el Excel del reporte solo cuando se pide y lo memoriza junto a
+    los resultados de los que sale. El libro lleva la fecha de hoy en el
+    título y en las notas, por lo que la fecha también forma parte de la clave.
+    Con detalle=True genera el libro de detalle (excel_detalle) en lugar
+    del reporte institucional. Con recalcular=True lo genera de nuevo
+    aunque ya esté memorizado.
+
+    Returns:
+        bytes: contenido del archivo Excel
+    """
+    clave = clave_resultados(hash_archivo, tipo, filename)
+    clave_excel = (date.today(), VERSION_EXCEL, 'detalle' if detalle else 'reporte')
+    with _candado:
+        entrada = _resultados.get(clave)
+        if entrada is not None and clave_excel in entrada['excel'] and not recalcular:
+            _estadisticas['excel_aciertos'] += 1
+            contar('cache_excel_aciertos')
+            return entrada['excel'][clave_excel]
+
+    contar('cache_excel_fallos')
+    if detalle:
+        excel_bytes = excel_detalle.generar_excel_detalle(resultados, tipo)
+    else:
+        excel_bytes = GENERADORES_EXCEL[tipo.upper()](resultados)
+
+    with _candado:
+        _estadisticas['excel_generados'] += 1
+        entrada = _resultados.get(clave)
+        if entrada is not None and entrada['resultados'] is resultados:
+            # Los libros de otro día o de otra versión ya no se vuelven a pedir
+            entrada['excel'] = {
+                k: v for k, v in entrada['excel'].items() if k[:2] == clave_excel[:2]
+            }
+            entrada['excel'].setdefault(clave_excel, excel_bytes)
+    return excel_bytes
+
+
+def invalidar(hash_archivo=None, tipo=None):
+    """
+    Descarta resultados memorizados. Sin argumentos vacía todo; con
+    hash_archivo y/o tipo solo las entradas que coinciden.
+
+    Returns:
+        int: número de entradas eliminadas
+    """
+    with _candado:
+        claves = [
+            clave for clave in _resultados
+            if (hash_archivo is None or clave[0] == hash_archivo)
+            and (tipo is None or clave[1] == tipo.upper())
+        ]
+        for clave in claves:
+            del _resultados[clave]
+        _estadisticas['invalidaciones'] += len(claves)
+    return len(claves)
+
+
+def estadisticas():
+    """Contadores de aciertos/fallos y entradas en memoria"""
+    with _candado:
+        return {**_estadisticas, 'entradas': len(_resultados), 'max_entradas': MAX_ENTRADAS,
+                'version_codigo': VERSION_CODIGO, 'version_excel': VERSION_EXCEL}
@@ -6,9 +6,16 @@ import pandas as pd
 import numpy as np
 from datetime import date
 from config import (
-    MONTH_NAMES, round_like_excel, detectar_fecha_archivo,
-    get_config_by_year, numero_a_letras_mx
+    MONTH_NAMES, round_like_excel, round_like_excel_array, detectar_fecha_archivo,
+    get_config_by_year, numero_a_letras_mx, top_por_grupo, renglones_extracto
 )
+from cubo import construir_cubo, consultar
+from etapas import marcar, contar
+from motor import sumar_por
+from agregacion_paralela import usar_paralelo, calcular_agregados_paralelo
+
+# Partidas con mayor disponible que se guardan por UR
+TOP_PARTIDAS = 5
 
 
 def obtener_columnas_hasta_mes(mes_numero):
@@ -62,6 +69,139 @@ def mapear_ur(id_unidad, config):
     return id_str
 
 
+def normalizar_id_unidad(clave):
+    """
+    Clave de UR como la dejaba la lectura numérica de antes: sin espacios y,
+    si es numérica, sin ceros a la izquierda (' 0100 ' -> '100'). ID_UNIDAD
+    ahora se lee como texto (categoría) y conserva ambos.
+    """
+    clave = str(clave).strip()
+    return str(int(clave)) if clave.isdigit() else clave
+
+
+def mapear_urs(serie, config):
+    """
+    Versión vectorizada de mapear_ur para la columna completa: cada clave
+    distinta se normaliza (normalizar_id_unidad) y se resuelve una sola vez
+    con la tabla compilada del año, y el resultado se reparte a los
+    renglones por su código.
+    """
+    tabla = config['tabla_ur']
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+    resueltos = np.empty(len(unicos), dtype=object)
+    for i, clave in enumerate(unicos):
+        clave = normalizar_id_unidad(clave)
+        # Las claves fuera de la tabla siguen la regla completa de mapear_ur
+        resueltos[i] = tabla[clave] if clave in tabla else mapear_ur(clave, config)
+    return pd.Series(resueltos[codigos], index=serie.index)
+
+
+def usa_co_reducido(ur, config):
+    """Indica si la UR solo considera CONTROL_OPERATIVO 0 y 50 (sin 51)"""
+    return ur in config['urs_co_reducido']
+
+
+def calcular_agregados_ur(df, urs_validas, config, mes_archivo, periodo_es_anual):
+    """
+    Calcula en una sola pasada de groupby todas las sumas por UR, por
+    capítulo y por clase de CONTROL_OPERATIVO.
+    
+    Returns:
+        tuple con:
+        - resultados_ur: dict UR -> Original, Modificado_anual, Modificado_periodo, Ejercido
+        - capitulos_por_ur: dict UR -> capítulo ('2', '3', '4') -> importes
+        - df_partidas: DataFrame por (UR, Partida, Programa) con CO=10 y ejercido
+    """
+    urs = list(dict.fromkeys(urs_validas))
+    ur_cat = pd.Categorical(df['Nueva UR'].astype(str), categories=urs)
+    
+    # Clase de CO por renglón: 0 y 50 siempre; 51 solo si la UR no es de filtro reducido
+    urs_reducidas = [ur for ur in urs if ur in config['urs_co_reducido']]
+    co = df['CONTROL_OPERATIVO']
+    en_clase = co.isin([0, 50]) | ((co == 51) & ~df['Nueva UR'].isin(urs_reducidas))
+    es_co0 = co == 0
+    es_co10 = co == 10
+    
+    cols_a_usar = obtener_columnas_hasta_mes(mes_archivo)
+    cols_mod = [col for col in cols_a_usar['modificaciones'] if col in df.columns]
+    cols_res = [col for col in cols_a_usar['reservas'] if col in df.columns]
+    mod_bruto = df[cols_mod].sum(axis=1) if cols_mod else pd.Series(0.0, index=df.index)
+    cong_periodo = df[cols_res].sum(axis=1) if cols_res else pd.Series(0.0, index=df.index)
+    
+    valores = pd.DataFrame({
+        'UR': ur_cat,
+        'CAPITULO': df['CAPITULO'].to_numpy(),
+        'Registros': 1,
+        'Original': df['ORIGINAL'].where(es_co0).to_numpy(),
+        'Modificado_neto': (df['MODIFICADO_AUTORIZADO'] - df['RESERVAS']).where(en_clase).to_numpy(),
+        'Mod_bruto': mod_bruto.where(en_clase).to_numpy(),
+        'Cong_periodo': cong_periodo.where(en_clase).to_numpy(),
+        'Ejercido': df['EJERCIDO_REAL'].where(en_clase).to_numpy(),
+        'Cap_original': df['ORIGINAL'].where(es_co10).to_numpy(),
+        'Cap_mod_anual': df['MODIFICADO_AUTORIZADO'].where(es_co10).to_numpy(),
+        'Cap_mod_bruto': mod_bruto.where(es_co10).to_numpy(),
+        'Cap_cong_periodo': cong_periodo.where(es_co10).to_numpy(),
+    })
+    
+    # Totales por UR agrupando directamente por UR (no sumando los parciales
+    # por capítulo) para conservar el orden de suma y el redondeo del reporte
+    importes = valores.columns.drop(['UR', 'CAPITULO'])
+    por_capitulo = sumar_por(valores, ['UR', 'CAPITULO'], importes)
+    por_ur = sumar_por(valores, ['UR'], importes)
+    por_ur = por_ur.set_axis(por_ur.index.astype(str)).reindex(urs, fill_value=0)
+    
+    # Redondeo vectorizado sobre los agregados por UR
+    redondeo_ur = pd.DataFrame({
+        'Original': round_like_excel_array(por_ur['Original']),
+        'Modificado_anual': round_like_excel_array(por_ur['Modificado_neto']),
+        'Modificado_periodo': round_like_excel_array(por_ur['Mod_bruto'] - por_ur['Cong_periodo']),
+        'Ejercido': round_like_excel_array(por_ur['Ejercido']),
+    })
+    if periodo_es_anual:
+        redondeo_ur['Modificado_periodo'] = redondeo_ur['Modificado_anual']
+    
+    resultados_ur = redondeo_ur.to_dict('index')
+    for ur in por_ur.index[por_ur['Registros'] == 0]:
+        resultados_ur[ur] = {
+            'Original': 0, 'Modificado_anual': 0, 'Modificado_periodo': 0, 'Ejercido': 0
+        }
+    
+    # Por capítulo (2, 3, 4); combinaciones sin renglones quedan en cero
+    capitulos = [2, 3, 4]
+    por_cap = por_capitulo.reindex(
+        pd.MultiIndex.from_product([urs, capitulos], names=['UR', 'CAPITULO']), fill_value=0.0
+    )
+    mod_periodo = round_like_excel_array(por_cap['Cap_mod_bruto'] - por_cap['Cap_cong_periodo'])
+    ejercido = round_like_excel_array(por_cap['Ejercido'])
+    filas_cap = iter(pd.DataFrame({
+        'Original': round_like_excel_array(por_cap['Cap_original']),
+        'Modificado_anual': round_like_excel_array(por_cap['Cap_mod_anual']),
+        'Modificado_periodo': mod_periodo,
+        'Ejercido_acumulado': ejercido,
+        'Disponible_periodo': round_like_excel_array(mod_periodo - ejercido),
+    }).to_dict('records'))
+    capitulos_por_ur = {ur: {str(cap): next(filas_cap) for cap in capitulos} for ur in urs}
+    
+    # Partidas por (UR, Partida, Programa): modificado con CO=10, ejercido según clase
+    claves = ['UR', 'Partida', 'PROGRAMA_PRESUPUESTARIO']
+    base = pd.DataFrame({
+        'UR': ur_cat,
+        'Partida': df['Partida'].to_numpy(),
+        'PROGRAMA_PRESUPUESTARIO': df['PROGRAMA_PRESUPUESTARIO'].to_numpy(),
+        'ORIGINAL': df['ORIGINAL'].to_numpy(),
+        'MODIFICADO_AUTORIZADO': df['MODIFICADO_AUTORIZADO'].to_numpy(),
+        'EJERCIDO_REAL': df['EJERCIDO_REAL'].to_numpy(),
+    })
+    df_partidas = sumar_por(base[es_co10.to_numpy()], claves, ['ORIGINAL', 'MODIFICADO_AUTORIZADO']).reset_index()
+    df_eje_partidas = sumar_por(base[en_clase.to_numpy()], claves, ['EJERCIDO_REAL']).reset_index()
+    
+    df_partidas = df_partidas.merge(df_eje_partidas, on=claves, how='left')
+    df_partidas['EJERCIDO_REAL'] = df_partidas['EJERCIDO_REAL'].fillna(0)
+    df_partidas['Disponible'] = df_partidas['MODIFICADO_AUTORIZADO'] - df_partidas['EJERCIDO_REAL']
+    
+    return resultados_ur, capitulos_por_ur, df_partidas
+
+
 def procesar_sicop(df, filename):
     """
     Procesa el archivo SICOP y devuelve los resultados calculados.
@@ -74,121 +214,97 @@ def procesar_sicop(df, filename):
         - 'totales': dict con totales generales
         - 'metadata': información del archivo
     """
+    marcar('preparacion')
+    
     # Detectar fecha y configuración
-    fecha_archivo, mes_archivo, año_archivo = detectar_fecha_archivo(filename)
+    fecha_archivo, mes_archivo, año_archivo, origen_fecha = detectar_fecha_archivo(filename, df, con_origen=True)
     config = get_config_by_year(año_archivo)
     
     año_actual = date.today().year
     es_cierre_año_anterior = (mes_archivo in [1, 2]) and (año_archivo < año_actual)
     
-    # Aplicar mapeo de URs
-    df['ID_UNIDAD'] = df['ID_UNIDAD'].astype(str)
-    df['Nueva UR'] = df['ID_UNIDAD'].apply(lambda x: mapear_ur(x, config))
+    # Columnas calculadas (Nueva UR, Partida, EJERCIDO_REAL) sobre una copia
+    # superficial: el DataFrame del llamador no se modifica
+    ejercido_real = sum(
+        df[col].fillna(0) for col in ['EJERCIDO', 'DEVENGADO', 'EJERCIDO_TRAMITE'] if col in df.columns
+    )
+    df = df.assign(**{
+        'Nueva UR': mapear_urs(df['ID_UNIDAD'], config),
+        'Partida': (
+            df['CAPITULO'] * 10000 + df['CONCEPTO'] * 1000 +
+            df['PARTIDA_GENERICA'] * 100 + df['PARTIDA_ESPECIFICA'] * 10
+        ).astype(int),
+        'EJERCIDO_REAL': ejercido_real,
+    })
     
-    # Calcular Partida
-    df['Partida'] = (
-        df['CAPITULO'] * 10000 + df['CONCEPTO'] * 1000 +
-        df['PARTIDA_GENERICA'] * 100 + df['PARTIDA_ESPECIFICA'] * 10
-    ).astype(int)
+    marcar('filtro')
     
-    # Calcular EJERCIDO_REAL
-    for col in ['EJERCIDO', 'DEVENGADO', 'EJERCIDO_TRAMITE']:
-        if col not in df.columns:
-            df[col] = 0
-        else:
-            df[col] = df[col].fillna(0)
+    # URs válidas
+    urs_validas = config['urs_validas']
     
-    df['EJERCIDO_REAL'] = df['EJERCIDO'] + df['DEVENGADO'] + df['EJERCIDO_TRAMITE']
+    # Filtros como máscaras: la base es común al reporte y a los congelados
+    # (estos incluyen capítulo 7 y cualquier CONTROL_OPERATIVO)
+    base = df['Nueva UR'].isin(urs_validas) & ~df['Partida'].isin([39801, 39810])
+    mascara_congelados = base & (df['CAPITULO'] != 1)
+    mascara = (
+        base & ~df['CAPITULO'].isin([1, 7]) &
+        df['CONTROL_OPERATIVO'].isin([0, 10, 40, 50, 51])
+    )
     
-    # URs válidas
-    urs_validas = (config['sector_central'] + config['oficinas'] + 
-                   config['organos_desconcentrados'] + config['entidades_paraestatales'])
-    
-    # Guardar copia para congelados antes de filtrar
-    df_para_congelados = df.copy()
-    
-    # Aplicar filtros
-    df = df[df['Nueva UR'].astype(str).isin(urs_validas)].copy()
-    df = df[~df['Partida'].isin([39801, 39810])].copy()
-    df = df[~df['CAPITULO'].isin([1, 7])].copy()
-    df = df[df['CONTROL_OPERATIVO'].isin([0, 10, 40, 50, 51])].copy()
-    
-    # Calcular por UR
-    resultados_ur = {}
-    
-    for ur in urs_validas:
-        df_ur = df[df['Nueva UR'].astype(str) == ur].copy()
-        
-        if len(df_ur) == 0:
-            resultados_ur[ur] = {
-                'Original': 0, 'Modificado_anual': 0, 'Modificado_periodo': 0, 'Ejercido': 0
-            }
-            continue
-        
-        # Calcular Modificado neto
-        df_ur['Modificado_neto'] = df_ur['MODIFICADO_AUTORIZADO'] - df_ur['RESERVAS']
-        
-        # ORIGINAL: Suma donde CO=0
-        df_co0 = df_ur[df_ur['CONTROL_OPERATIVO'] == 0]
-        original = round_like_excel(df_co0['ORIGINAL'].sum(), 2)
-        
-        # MODIFICADO: Filtros de CO según tipo de UR
-        if ur in config['entidades_paraestatales'] or ur == 'RJL':
-            df_modificado = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50])]
-        elif ur in config['organos_desconcentrados']:
-            df_modificado = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50])]
-        else:
-            df_modificado = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50, 51])]
-        
-        # MODIFICADO ANUAL
-        modificado_anual = round_like_excel(df_modificado['Modificado_neto'].sum(), 2)
-        
-        # MODIFICADO PERIODO
-        if es_cierre_año_anterior or mes_archivo == 12:
-            modificado_periodo = modificado_anual
-        else:
-            cols_a_usar = obtener_columnas_hasta_mes(mes_archivo)
-            cols_mod = [col for col in cols_a_usar['modificaciones'] if col in df_modificado.columns]
-            cols_res = [col for col in cols_a_usar['reservas'] if col in df_modificado.columns]
-            
-            mod_bruto = df_modificado[cols_mod].sum(axis=1).sum() if cols_mod else 0
-            cong_periodo = df_modificado[cols_res].sum(axis=1).sum() if cols_res else 0
-            modificado_periodo = round_like_excel(mod_bruto - cong_periodo, 2)
-        
-        # EJERCIDO
-        if ur in config['entidades_paraestatales'] or ur == 'RJL':
-            df_ejercido = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50])]
-        elif ur in config['organos_desconcentrados']:
-            df_ejercido = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50])]
-        else:
-            df_ejercido = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50, 51])]
-        
-        ejercido = round_like_excel(df_ejercido['EJERCIDO_REAL'].sum(), 2)
-        
-        resultados_ur[ur] = {
-            'Original': original,
-            'Modificado_anual': modificado_anual,
-            'Modificado_periodo': modificado_periodo,
-            'Ejercido': ejercido
-        }
+    # Para congelados solo hacen falta las columnas de reservas
+    cols_reservas = [col for col in obtener_columnas_hasta_mes(12)['reservas'] if col in df.columns]
+    df_para_congelados = df.loc[mascara_congelados, cols_reservas]
+    
+    contar('renglones_entrada', len(df))
+    df = df[mascara]
+    contar('renglones_salida', len(df))
+    contar('renglones_congelados', len(df_para_congelados))
+    
+    marcar('agregacion')
+    
+    # Calcular por UR, capítulo y clase de CO en una sola pasada (repartida
+    # por sección entre varios procesos si el extracto es muy grande)
+    periodo_es_anual = es_cierre_año_anterior or mes_archivo == 12
+    if usar_paralelo(len(df)):
+        cols_mensuales = obtener_columnas_hasta_mes(mes_archivo)
+        resultados_ur, capitulos_por_ur, df_partidas = calcular_agregados_paralelo(
+            df, urs_validas, config, mes_archivo, periodo_es_anual,
+            columnas_mensuales=cols_mensuales['modificaciones'] + cols_mensuales['reservas']
+        )
+    else:
+        resultados_ur, capitulos_por_ur, df_partidas = calcular_agregados_ur(
+            df, urs_validas, config, mes_archivo, periodo_es_anual
+        )
+    
+    # Cubo UR x capítulo x partida x programa x CO sobre los renglones
+    # filtrados, para cortes por mes, capítulo o clase de CO que no están
+    # precalculados (consultar_ur_sicop)
+    cols_año = obtener_columnas_hasta_mes(12)
+    cubo = construir_cubo(
+        df,
+        {'UR': df['Nueva UR'].astype(str), 'CAPITULO': 'CAPITULO', 'PARTIDA': 'Partida',
+         'PROGRAMA': 'PROGRAMA_PRESUPUESTARIO', 'CO': 'CONTROL_OPERATIVO'},
+        mensuales={'MODIFICADO': cols_año['modificaciones'], 'RESERVA': cols_año['reservas']},
+        anuales={col: col for col in ['ORIGINAL', 'MODIFICADO_AUTORIZADO', 'RESERVAS', 'EJERCIDO_REAL']},
+        mes=mes_archivo,
+    )
+    cubo['periodo_es_anual'] = periodo_es_anual
     
     # Crear DataFrame de resumen
     resumen = pd.DataFrame.from_dict(resultados_ur, orient='index').reset_index()
     resumen.columns = ['UR', 'Original', 'Modificado_anual', 'Modificado_periodo', 'Ejercido_acumulado']
     
     # Calcular disponibles y porcentajes
-    resumen['Disponible_anual'] = resumen.apply(
-        lambda row: round_like_excel(row['Modificado_anual'] - row['Ejercido_acumulado'], 2), axis=1
-    )
-    resumen['Disponible_periodo'] = resumen.apply(
-        lambda row: round_like_excel(row['Modificado_periodo'] - row['Ejercido_acumulado'], 2), axis=1
-    )
-    resumen['Pct_avance_anual'] = resumen.apply(
-        lambda row: row['Ejercido_acumulado'] / row['Modificado_anual'] if row['Modificado_anual'] != 0 else 0, axis=1
+    resumen['Disponible_anual'] = round_like_excel_array(
+        resumen['Modificado_anual'] - resumen['Ejercido_acumulado'], 2
     )
-    resumen['Pct_avance_periodo'] = resumen.apply(
-        lambda row: row['Ejercido_acumulado'] / row['Modificado_periodo'] if row['Modificado_periodo'] != 0 else 0, axis=1
+    resumen['Disponible_periodo'] = round_like_excel_array(
+        resumen['Modificado_periodo'] - resumen['Ejercido_acumulado'], 2
     )
+    for col_pct, col_mod in (('Pct_avance_anual', 'Modificado_anual'), ('Pct_avance_periodo', 'Modificado_periodo')):
+        # Con modificado en cero el avance es 0
+        modificado = resumen[col_mod].astype(float)
+        resumen[col_pct] = (resumen['Ejercido_acumulado'] / modificado.where(modificado != 0)).fillna(0)
     
     # Calcular subtotales por sección
     def calcular_subtotal(urs_lista):
@@ -223,10 +339,6 @@ def procesar_sicop(df, filename):
     total_general['Pct_avance_periodo'] = total_general['Ejercido_acumulado'] / total_general['Modificado_periodo'] if total_general['Modificado_periodo'] != 0 else 0
     
     # Congelados
-    df_para_congelados = df_para_congelados[df_para_congelados['Nueva UR'].astype(str).isin(urs_validas)]
-    df_para_congelados = df_para_congelados[~df_para_congelados['Partida'].isin([39801, 39810])]
-    df_para_congelados = df_para_congelados[df_para_congelados['CAPITULO'] != 1]
-    
     congelado_anual = calcular_congelado_anual(df_para_congelados)
     congelado_periodo = calcular_congelado_periodo(df_para_congelados, mes_archivo)
     
@@ -277,88 +389,31 @@ def procesar_sicop(df, filename):
     # Catalogo de programas
     catalogo_programas = config.get('programas_nombres', {})
     
-    # Calcular datos por capitulo para cada UR
-    capitulos_por_ur = {}
-    partidas_por_ur = {}
-    
-    for ur in urs_validas:
-        df_ur = df[df['Nueva UR'] == ur]
-        
-        # Filtrar para calculos (CONTROL_OPERATIVO = 10 para modificado)
-        df_ur_mod = df_ur[df_ur['CONTROL_OPERATIVO'] == 10]
-        
-        # Filtrar para ejercido segun tipo de UR
-        if ur in config['entidades_paraestatales'] or ur == 'RJL':
-            df_ur_eje = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50])]
-        elif ur in config['organos_desconcentrados']:
-            df_ur_eje = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50])]
-        else:
-            df_ur_eje = df_ur[df_ur['CONTROL_OPERATIVO'].isin([0, 50, 51])]
-        
-        # Calcular por capitulo (2, 3, 4)
-        caps_ur = {}
-        for cap in [2, 3, 4]:
-            df_cap_mod = df_ur_mod[df_ur_mod['CAPITULO'] == cap]
-            df_cap_eje = df_ur_eje[df_ur_eje['CAPITULO'] == cap]
-            
-            original = round_like_excel(df_cap_mod['ORIGINAL'].sum(), 2)
-            mod_anual = round_like_excel(df_cap_mod['MODIFICADO_AUTORIZADO'].sum(), 2)
-            
-            # Modificado periodo
-            cols_a_usar = obtener_columnas_hasta_mes(mes_archivo)
-            cols_mod = [col for col in cols_a_usar['modificaciones'] if col in df_cap_mod.columns]
-            cols_res = [col for col in cols_a_usar['reservas'] if col in df_cap_mod.columns]
-            
-            mod_bruto = df_cap_mod[cols_mod].sum(axis=1).sum() if cols_mod else 0
-            cong_periodo = df_cap_mod[cols_res].sum(axis=1).sum() if cols_res else 0
-            mod_periodo = round_like_excel(mod_bruto - cong_periodo, 2)
-            
-            ejercido = round_like_excel(df_cap_eje['EJERCIDO_REAL'].sum(), 2)
-            
-            caps_ur[str(cap)] = {
-                'Original': original,
-                'Modificado_anual': mod_anual,
-                'Modificado_periodo': mod_periodo,
-                'Ejercido_acumulado': ejercido,
-                'Disponible_periodo': round_like_excel(mod_periodo - ejercido, 2),
-            }
-        
-        capitulos_por_ur[ur] = caps_ur
-        
-        # Calcular top partidas con mayor disponible
-        df_partidas = df_ur_mod.groupby(['Partida', 'PROGRAMA_PRESUPUESTARIO']).agg({
-            'ORIGINAL': 'sum',
-            'MODIFICADO_AUTORIZADO': 'sum',
-        }).reset_index()
-        
-        # Agregar ejercido
-        df_eje_partidas = df_ur_eje.groupby(['Partida', 'PROGRAMA_PRESUPUESTARIO']).agg({
-            'EJERCIDO_REAL': 'sum',
-        }).reset_index()
-        
-        df_partidas = df_partidas.merge(df_eje_partidas, on=['Partida', 'PROGRAMA_PRESUPUESTARIO'], how='left')
-        df_partidas['EJERCIDO_REAL'] = df_partidas['EJERCIDO_REAL'].fillna(0)
-        df_partidas['Disponible'] = df_partidas['MODIFICADO_AUTORIZADO'] - df_partidas['EJERCIDO_REAL']
-        
-        # Filtrar solo partidas con disponible > 0 y ordenar
-        df_partidas = df_partidas[df_partidas['Disponible'] > 0].sort_values('Disponible', ascending=False).head(5)
-        
-        partidas_list = []
-        for _, row in df_partidas.iterrows():
-            partida = int(row['Partida'])
-            programa = row['PROGRAMA_PRESUPUESTARIO']
-            partidas_list.append({
-                'Partida': partida,
-                'Denominacion': catalogo_partidas.get(partida, ''),
-                'Programa': programa,
-                'Denom_Programa': catalogo_programas.get(programa, ''),
-                'Original': round_like_excel(row['ORIGINAL'], 2),
-                'Modificado': round_like_excel(row['MODIFICADO_AUTORIZADO'], 2),
-                'Ejercido': round_like_excel(row['EJERCIDO_REAL'], 2),
-                'Disponible': round_like_excel(row['Disponible'], 2),
-            })
-        
-        partidas_por_ur[ur] = partidas_list
+    # Top partidas con mayor disponible por UR
+    partidas_por_ur = {ur: [] for ur in resultados_ur}
+    df_partidas = df_partidas[df_partidas['Disponible'] > 0].assign(
+        Original=lambda d: round_like_excel_array(d['ORIGINAL'], 2),
+        Modificado=lambda d: round_like_excel_array(d['MODIFICADO_AUTORIZADO'], 2),
+        Ejercido=lambda d: round_like_excel_array(d['EJERCIDO_REAL'], 2),
+        Disponible_redondeado=lambda d: round_like_excel_array(d['Disponible'], 2),
+    )
+    
+    # Las de mayor disponible de cada UR, en una pasada para todas
+    df_top = top_por_grupo(df_partidas, 'UR', 'Disponible', TOP_PARTIDAS)
+    partidas = df_top['Partida'].astype(int)
+    programas = df_top['PROGRAMA_PRESUPUESTARIO'].astype(object)
+    registros = pd.DataFrame({
+        'Partida': partidas,
+        'Denominacion': partidas.map(catalogo_partidas).fillna(''),
+        'Programa': programas,
+        'Denom_Programa': programas.map(catalogo_programas).fillna(''),
+        'Original': df_top['Original'].astype(float),
+        'Modificado': df_top['Modificado'].astype(float),
+        'Ejercido': df_top['Ejercido'].astype(float),
+        'Disponible': df_top['Disponible_redondeado'].astype(float),
+    }).to_dict('records')
+    for ur, registro in zip(df_top['UR'], registros):
+        partidas_por_ur[ur].append(registro)
     
     return {
         'resumen': resumen,
@@ -377,13 +432,70 @@ def procesar_sicop(df, filename):
         'totales': total_general,
         'capitulos_por_ur': capitulos_por_ur,
         'partidas_por_ur': partidas_por_ur,
+        'cubo': cubo,
         'metadata': {
             'fecha_archivo': fecha_archivo,
             'mes': mes_archivo,
             'año': año_archivo,
-            'registros': len(df),
+            'registros': renglones_extracto(df),
+            # Sin fecha en el nombre ni en el contenido: se supuso la de hoy
+            'fecha_inferida': origen_fecha == 'hoy',
             'es_cierre': es_cierre_año_anterior,
             'config': config,
         },
         'df_procesado': df,
     }
+
+
+def consultar_ur_sicop(cubo, ur, mes, config, capitulos=(2, 3, 4)):
+    """
+    Importes de una UR y de sus capítulos al corte de cualquier mes, desde el
+    cubo de procesar_sicop. Devuelve lo mismo que su renglón de 'resumen'
+    (Original, Modificado_anual, Modificado_periodo, Ejercido_acumulado) y
+    capitulos_por_ur[ur]; al mes del archivo los importes coinciden con ellos.
+    
+    Aplica las mismas clases de CONTROL_OPERATIVO que el reporte: 0 para el
+    original, 0, 50 y 51 (sin 51 en las URs de filtro reducido) para
+    modificado y ejercido, y 10 para los importes por capítulo. El extracto
+    no desglosa el ejercido por mes, así que es el registrado en cualquier
+    corte.
+    """
+    filtro = {'UR': [ur]}
+    clase = [0, 50] if usa_co_reducido(ur, config) else [0, 50, 51]
+    periodo_anual = cubo['periodo_es_anual'] or mes == 12
+    
+    def sumas(por=(), **filtros):
+        resultado = consultar(cubo, por, filtros={**filtro, **filtros}, mes=mes)
+        resultado['Modificado_periodo'] = resultado['MODIFICADO_periodo'] - resultado['RESERVA_periodo']
+        return resultado
+    
+    original = sumas(CO=[0]).iloc[0]
+    en_clase = sumas(CO=clase).iloc[0]
+    modificado_anual = round_like_excel(en_clase['MODIFICADO_AUTORIZADO'] - en_clase['RESERVAS'], 2)
+    datos = {
+        'Original': round_like_excel(original['ORIGINAL'], 2),
+        'Modificado_anual': modificado_anual,
+        'Modificado_periodo': (
+            modificado_anual if periodo_anual else round_like_excel(en_clase['Modificado_periodo'], 2)
+        ),
+        'Ejercido_acumulado': round_like_excel(en_clase['EJERCIDO_REAL'], 2),
+    }
+    
+    capitulos = list(capitulos)
+    co10 = sumas(['CAPITULO'], CO=[10], CAPITULO=capitulos).set_index('CAPITULO')
+    co10 = co10.reindex(capitulos, fill_value=0.0)
+    ejercido = sumas(['CAPITULO'], CO=clase, CAPITULO=capitulos).set_index('CAPITULO')['EJERCIDO_REAL']
+    ejercido = ejercido.reindex(capitulos, fill_value=0.0)
+    capitulos_ur = {}
+    for cap in capitulos:
+        mod_periodo = round_like_excel(co10.at[cap, 'Modificado_periodo'], 2)
+        ejercido_cap = round_like_excel(ejercido[cap], 2)
+        capitulos_ur[str(cap)] = {
+            'Original': round_like_excel(co10.at[cap, 'ORIGINAL'], 2),
+            'Modificado_anual': round_like_excel(co10.at[cap, 'MODIFICADO_AUTORIZADO'], 2),
+            'Modificado_periodo': mod_periodo,
+            'Ejercido_acumulado': ejercido_cap,
+            'Disponible_periodo': round_like_excel(mod_periodo - ejercido_cap, 2),
+        }
+    
+    return datos, capitulos_ur
@@ -0,0 +1,37 @@
+# ============================================================================
+# FIXTURES COMPARTIDAS DE LAS PRUEBAS
+# ============================================================================
+# El corpus es el mismo de benchmarks.regresion (extractos sintéticos MAP y
+# SICOP de varios meses y de ambos años de configuración); se genera una
+# sola vez en benchmarks/datos/corpus_regresion, que no está en git.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.regresion import corpus_sintetico, tipo_extracto  # noqa: E402
+from csv_loader import leer_extracto  # noqa: E402
+from map_processor import procesar_map  # noqa: E402
+from sicop_processor import procesar_sicop  # noqa: E402
+
+PROCESADORES = {'MAP': procesar_map, 'SICOP': procesar_sicop}
+
+
+@pytest.fixture(scope='session')
+def corpus():
+    """Rutas de los extractos del corpus sintético"""
+    return corpus_sintetico()
+
+
+@pytest.fixture(scope='session')
+def procesados(corpus):
+    """{nombre: (tipo, ruta, resultados)} de cada extracto del corpus"""
+    procesados = {}
+    for ruta in corpus:
+        tipo = tipo_extracto(ruta)
+        nombre = os.path.basename(ruta)
+        procesados[nombre] = (tipo, ruta, PROCESADORES[tipo](leer_extracto(ruta, tipo), nombre))
+    return procesados
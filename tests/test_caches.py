@@ -0,0 +1,162 @@
+# ============================================================================
+# PRUEBAS: CACHÉ DE EXTRACTOS Y MEMORIA DE RESULTADOS
+# ============================================================================
+# extract_cache: acierto/fallo por contenido, tipo y modo de lectura,
+# entradas corruptas, desalojo LRU. result_cache: memorización por archivo y
+# fecha del nombre, recalcular, invalidar y Excel memorizado.
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import extract_cache  # noqa: E402
+import result_cache  # noqa: E402
+from csv_loader import leer_extracto  # noqa: E402
+
+
+@pytest.fixture
+def cache_extractos(tmp_path, monkeypatch):
+    if not extract_cache.cache_disponible():
+        pytest.skip('requiere pyarrow')
+    monkeypatch.setattr(extract_cache, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(extract_cache, '_estadisticas', dict.fromkeys(extract_cache._estadisticas, 0))
+    return tmp_path
+
+
+@pytest.fixture
+def sicop(corpus):
+    ruta = next(r for r in corpus if 'SICOP' in os.path.basename(r))
+    with open(ruta, 'rb') as f:
+        return ruta, f.read()
+
+
+def _contadores():
+    stats = extract_cache.estadisticas()
+    return stats['aciertos'], stats['fallos'], stats['escrituras']
+
+
+# ============================================================================
+# EXTRACTOS
+# ============================================================================
+
+def test_fallo_y_luego_acierto(cache_extractos, sicop):
+    ruta, datos = sicop
+    primero, hash_1 = extract_cache.leer_extracto_cacheado(datos, 'SICOP')
+    assert _contadores() == (0, 1, 1)
+    segundo, hash_2 = extract_cache.leer_extracto_cacheado(ruta, 'SICOP')
+    assert _contadores() == (1, 1, 1)
+    assert hash_1 == hash_2 == extract_cache.hash_contenido(datos)
+    pd.testing.assert_frame_equal(segundo, primero)
+    pd.testing.assert_frame_equal(primero, leer_extracto(ruta, 'SICOP'))
+    assert extract_cache.estadisticas()['entradas'] == 1
+
+
+def test_contenido_y_modo_distintos_no_comparten_entrada(cache_extractos, sicop):
+    _, datos = sicop
+    extract_cache.leer_extracto_cacheado(datos, 'SICOP')
+    compacto, _ = extract_cache.leer_extracto_cacheado(datos, 'SICOP', compactar=True)
+    extract_cache.leer_extracto_cacheado(datos + b'\n', 'SICOP')
+    assert _contadores() == (0, 3, 3)
+    assert len(compacto) < len(leer_extracto(sicop[0], 'SICOP'))
+    assert not [n for n in os.listdir(cache_extractos) if n.endswith('.tmp')]
+
+
+def test_entrada_corrupta_se_vuelve_a_leer(cache_extractos, sicop):
+    _, datos = sicop
+    esperado, hash_archivo = extract_cache.leer_extracto_cacheado(datos, 'SICOP')
+    ruta = extract_cache._ruta(extract_cache.clave_cache(hash_archivo, 'SICOP'))
+    with open(ruta, 'wb') as f:
+        f.write(b'no es feather')
+    df, _ = extract_cache.leer_extracto_cacheado(datos, 'SICOP')
+    pd.testing.assert_frame_equal(df, esperado)
+    stats = extract_cache.estadisticas()
+    assert (stats['errores'], stats['fallos'], stats['escrituras']) == (1, 2, 2)
+
+
+def test_desalojo_y_vaciado(cache_extractos, sicop):
+    _, datos = sicop
+    extract_cache.leer_extracto_cacheado(datos, 'SICOP')
+    extract_cache.leer_extracto_cacheado(datos, 'SICOP', compactar=True)
+    assert extract_cache.estadisticas()['entradas'] == 2
+    extract_cache.desalojar(max_bytes=extract_cache.estadisticas()['bytes'] - 1)
+    assert extract_cache.estadisticas()['entradas'] == 1
+    assert extract_cache.estadisticas()['desalojos'] == 1
+    extract_cache.vaciar_cache()
+    assert extract_cache.estadisticas()['entradas'] == 0
+
+
+# ============================================================================
+# RESULTADOS
+# ============================================================================
+
+@pytest.fixture
+def memoria_limpia():
+    result_cache.invalidar()
+    yield
+    result_cache.invalidar()
+
+
+def test_resultados_memorizados_por_archivo_y_fecha(memoria_limpia, sicop):
+    ruta, datos = sicop
+    df = leer_extracto(ruta, 'SICOP')
+    nombre = os.path.basename(ruta)
+    hash_archivo = extract_cache.hash_contenido(datos)
+    columnas = list(df.columns)
+
+    assert result_cache.resultados_memorizados(hash_archivo, 'SICOP', nombre) is None
+    antes = result_cache.estadisticas()
+    primero = result_cache.procesar_cacheado(df, nombre, 'SICOP', hash_archivo)
+    segundo = result_cache.procesar_cacheado(df, nombre, 'SICOP', hash_archivo)
+    despues = result_cache.estadisticas()
+    assert segundo is primero
+    assert result_cache.resultados_memorizados(hash_archivo, 'SICOP', nombre) is primero
+    assert (despues['fallos'] - antes['fallos'], despues['aciertos'] - antes['aciertos']) == (1, 1)
+    # El procesador trabaja sobre una copia: el DataFrame del llamador no cambia
+    assert list(df.columns) == columnas
+
+    # Otra fecha en el nombre es otro corte (otro mes y configuración)
+    otro = result_cache.procesar_cacheado(df, '31-MAR-2026_SICOP.csv', 'SICOP', hash_archivo)
+    assert otro is not primero
+    assert result_cache.estadisticas()['entradas'] == 2
+
+
+def test_recalcular_no_reemplaza_lo_memorizado(memoria_limpia, sicop):
+    ruta, datos = sicop
+    df = leer_extracto(ruta, 'SICOP')
+    nombre = os.path.basename(ruta)
+    hash_archivo = extract_cache.hash_contenido(datos)
+    memorizado = result_cache.procesar_cacheado(df, nombre, 'SICOP', hash_archivo)
+    nuevo = result_cache.procesar_cacheado(df, nombre, 'SICOP', hash_archivo, recalcular=True)
+    assert nuevo is not memorizado
+    assert result_cache.resultados_memorizados(hash_archivo, 'SICOP', nombre) is memorizado
+
+
+def test_invalidar(memoria_limpia, sicop):
+    ruta, datos = sicop
+    df = leer_extracto(ruta, 'SICOP')
+    nombre = os.path.basename(ruta)
+    result_cache.procesar_cacheado(df, nombre, 'SICOP', 'hash-a')
+    result_cache.procesar_cacheado(df, nombre, 'SICOP', 'hash-b')
+    assert result_cache.invalidar(hash_archivo='hash-a') == 1
+    assert result_cache.resultados_memorizados('hash-a', 'SICOP', nombre) is None
+    assert result_cache.resultados_memorizados('hash-b', 'SICOP', nombre) is not None
+    assert result_cache.invalidar(tipo='MAP') == 0
+    assert result_cache.invalidar() == 1
+
+
+def test_excel_memorizado_con_sus_resultados(memoria_limpia, sicop):
+    ruta, _ = sicop
+    nombre = os.path.basename(ruta)
+    resultados = result_cache.procesar_cacheado(leer_extracto(ruta, 'SICOP'), nombre, 'SICOP', 'hash-x')
+    antes = result_cache.estadisticas()
+    libro = result_cache.excel_cacheado(resultados, 'hash-x', 'SICOP', nombre)
+    assert result_cache.excel_cacheado(resultados, 'hash-x', 'SICOP', nombre) is libro
+    assert result_cache.excel_cacheado(resultados, 'hash-x', 'SICOP', nombre, recalcular=True) is not libro
+    despues = result_cache.estadisticas()
+    assert despues['excel_generados'] - antes['excel_generados'] == 2
+    assert despues['excel_aciertos'] - antes['excel_aciertos'] == 1
+    assert libro[:2] == b'PK'
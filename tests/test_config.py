@@ -0,0 +1,59 @@
+# ============================================================================
+# PRUEBAS: CONFIGURACIÓN ANUAL COMPARTIDA
+# ============================================================================
+# get_config_by_year devuelve una sola instancia de ConfigAnual por año de
+# configuración; es inmutable y se serializa por referencia al año.
+
+import os
+import pickle
+import sys
+from types import MappingProxyType
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import SECCIONES_UR, ConfigAnual, get_config_by_year  # noqa: E402
+
+
+@pytest.mark.parametrize('año, misma', [(2024, 2025), (2025, 2025), (2026, 2026), (2030, 2026)])
+def test_una_instancia_por_año_de_configuracion(año, misma):
+    config = get_config_by_year(año)
+    assert isinstance(config, ConfigAnual)
+    assert config is get_config_by_year(misma)
+
+
+@pytest.mark.parametrize('año', [2025, 2026])
+def test_inmutable(año):
+    config = get_config_by_year(año)
+    with pytest.raises(AttributeError):
+        config.algo = 1
+    with pytest.raises(TypeError):
+        config['oficinas'] = ()
+    with pytest.raises(TypeError):
+        config['mapeo_ur']['999'] = 'X'
+    for valor in config.values():
+        assert not isinstance(valor, (list, dict))
+    assert isinstance(config['programas_nombres'], MappingProxyType)
+
+
+@pytest.mark.parametrize('año', [2025, 2026])
+def test_busquedas_precalculadas(año):
+    config = get_config_by_year(año)
+    urs = [ur for seccion in SECCIONES_UR for ur in config[seccion]]
+    assert config['urs_validas'] == tuple(dict.fromkeys(urs))
+    assert config['conjunto_urs_validas'] == frozenset(urs)
+    assert set(config['seccion_por_ur']) == set(urs)
+    assert 'RJL' in config['urs_co_reducido']
+    assert set(config['organos_desconcentrados']) <= config['urs_co_reducido']
+    assert config['programas'] == frozenset(config['programas_nombres'])
+
+
+@pytest.mark.parametrize('año', [2025, 2026])
+def test_pickle_regresa_la_instancia_compartida(año):
+    config = get_config_by_year(año)
+    datos = pickle.dumps(config)
+    assert pickle.loads(datos) is config
+    # Se serializa la referencia al año, no las tablas
+    assert len(datos) < 200
+    assert pickle.loads(pickle.dumps({'config': config}))['config'] is config
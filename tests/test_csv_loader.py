@@ -0,0 +1,87 @@
+# ============================================================================
+# PRUEBAS: LECTURA PODADA Y TIPADA DE EXTRACTOS
+# ============================================================================
+# leer_extracto solo trae las columnas del reporte con sus dtypes
+# (columnas_reporte); si una clave entera trae vacíos, decimales o valores
+# fuera de rango la relee como float64 y lo avisa en el log. Cualquier otro
+# error de lectura se propaga.
+
+import io
+import logging
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from csv_loader import columnas_reporte, compactar_importes, leer_extracto  # noqa: E402
+
+ENCABEZADO_MAP = 'CICLO,UNIDAD,DESC_UNIDAD,PROGRAMA,PARTIDA,ORI_ENE,MOD_ENE\n'
+
+
+def _map(*renglones):
+    return io.BytesIO((ENCABEZADO_MAP + ''.join(f'{r}\n' for r in renglones)).encode('latin-1'))
+
+
+@pytest.mark.parametrize('tipo', ['MAP', 'SICOP'])
+def test_columnas_y_tipos_del_reporte(corpus, tipo):
+    ruta = next(r for r in corpus if tipo in os.path.basename(r))
+    df = leer_extracto(ruta, tipo)
+    columnas = columnas_reporte(tipo)
+    crudo = pd.read_csv(ruta, encoding='latin-1', nrows=0)
+    assert list(df.columns) == [col for col in crudo.columns if col in columnas]
+    assert not set(df.columns) - set(columnas)
+    for col in df.columns:
+        esperado = columnas[col]
+        if esperado == 'category':
+            assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+        else:
+            assert df[col].dtype == esperado, col
+
+
+def test_tipo_desconocido():
+    with pytest.raises(ValueError, match='desconocido'):
+        columnas_reporte('OTRO')
+
+
+@pytest.mark.parametrize('partida', ['', '2110.5', '99999999999999999999999'])
+def test_clave_entera_irregular_se_lee_como_float(partida, caplog):
+    archivo = _map('2026,100,UR,E001,21101,10.5,1', f'2026,100,UR,E001,{partida},1,2')
+    with caplog.at_level(logging.WARNING, logger='csv_loader'):
+        df = leer_extracto(archivo, 'MAP')
+    assert df['PARTIDA'].dtype == 'float64'
+    assert df['PARTIDA'].iloc[0] == 21101
+    assert df['ORI_ENE'].tolist() == [10.5, 1.0]
+    assert 'se leen como float64' in caplog.text
+
+
+def test_claves_enteras_limpias_quedan_en_int32(caplog):
+    with caplog.at_level(logging.WARNING, logger='csv_loader'):
+        df = leer_extracto(_map('2026,100,UR,E001,21101,10.5,1'), 'MAP')
+    assert df['PARTIDA'].dtype == 'int32'
+    assert caplog.text == ''
+
+
+def test_otros_errores_se_propagan():
+    with pytest.raises(ValueError, match='could not convert'):
+        leer_extracto(_map('2026,100,UR,E001,21101,abc,1'), 'MAP')
+
+
+def test_respaldo_con_compactacion_en_bloques():
+    renglones = [f'2026,{ur},UR,E001,21101,1.25,2' for ur in (100, 200, 100)]
+    df = leer_extracto(_map(*renglones, '2026,200,UR,E001,,1,1'), 'MAP', compactar=True, tamano_bloque=2)
+    assert df['PARTIDA'].dtype == 'float64'
+    assert df['ORI_ENE'].sum() == 4.75
+    assert len(df) == 3
+
+
+def test_compactar_da_las_mismas_sumas(corpus):
+    ruta = next(r for r in corpus if 'SICOP' in os.path.basename(r))
+    completo = leer_extracto(ruta, 'SICOP')
+    compacto = leer_extracto(ruta, 'SICOP', compactar=True, tamano_bloque=1000)
+    esperado = compactar_importes(completo, 'SICOP')
+    assert len(compacto) == len(esperado) < len(completo)
+    importes = [col for col, dtype in columnas_reporte('SICOP').items() if dtype == 'float64']
+    pd.testing.assert_series_equal(compacto[importes].sum(), completo[importes].sum(), rtol=1e-12)
@@ -0,0 +1,120 @@
+# ============================================================================
+# PRUEBAS: CUBO DE AGREGADOS
+# ============================================================================
+# cubo.consultar contra groupby de pandas sobre los mismos renglones, y las
+# consultas de los dashboards contra los dicts precalculados por los
+# procesadores: al mes del archivo deben coincidir exactamente.
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cubo import consultar, construir_cubo  # noqa: E402
+from csv_loader import leer_extracto  # noqa: E402
+from map_processor import consultar_dashboard_ur  # noqa: E402
+from sicop_processor import consultar_ur_sicop, procesar_sicop  # noqa: E402
+
+MESES = [f'M{i:02d}' for i in range(1, 13)]
+
+
+@pytest.fixture(scope='module')
+def renglones():
+    rng = np.random.default_rng(7)
+    n = 2000
+    df = pd.DataFrame({
+        'UR': rng.choice(['100', '200', 'B00', 'RJL'], n),
+        'CAPITULO': rng.choice([1, 2, 3, 4], n),
+        'CO': rng.choice([0, 10, 50, 51], n),
+        'ANUAL': np.round(rng.uniform(0, 1e6, n), 2),
+    })
+    for col in MESES:
+        df[col] = np.round(rng.uniform(0, 1e4, n), 2)
+    df.loc[rng.random(n) < 0.05, 'M03'] = np.nan
+    return df
+
+
+@pytest.fixture(scope='module')
+def cubo(renglones):
+    return construir_cubo(renglones, {'UR': 'UR', 'CAPITULO': 'CAPITULO', 'CO': 'CO'},
+                          mensuales={'IMPORTE': MESES}, anuales={'ANUAL': 'ANUAL'}, mes=5)
+
+
+@pytest.mark.parametrize('mes', [None, 1, 5, 12])
+def test_consultar_igual_a_groupby(renglones, cubo, mes):
+    corte = 5 if mes is None else mes
+    resultado = consultar(cubo, ['UR', 'CAPITULO'], filtros={'CO': [0, 50]}, excluir={'CAPITULO': [1]}, mes=mes)
+    base = renglones[renglones['CO'].isin([0, 50]) & (renglones['CAPITULO'] != 1)]
+    esperado = base.assign(
+        anual=base[MESES].sum(axis=1), periodo=base[MESES[:corte]].sum(axis=1)
+    ).groupby(['UR', 'CAPITULO'])[['anual', 'periodo', 'ANUAL']].sum().reset_index()
+    assert resultado[['UR', 'CAPITULO']].astype({'CAPITULO': int}).values.tolist() == \
+        esperado[['UR', 'CAPITULO']].values.tolist()
+    np.testing.assert_allclose(resultado['IMPORTE_anual'], esperado['anual'], rtol=1e-12)
+    np.testing.assert_allclose(resultado['IMPORTE_periodo'], esperado['periodo'], rtol=1e-12)
+    np.testing.assert_allclose(resultado['ANUAL'], esperado['ANUAL'], rtol=1e-12)
+
+
+def test_consultar_sin_agrupar_y_sin_celdas(cubo, renglones):
+    total = consultar(cubo)
+    assert len(total) == 1
+    assert total['ANUAL'].iloc[0] == pytest.approx(renglones['ANUAL'].sum(), rel=1e-12)
+    vacio = consultar(cubo, ['UR'], filtros={'UR': ['no-existe']})
+    assert vacio.empty
+    assert consultar(cubo, filtros={'UR': ['no-existe']})['ANUAL'].tolist() == [0.0]
+
+
+def _procesados(procesados, tipo):
+    return [(nombre, ruta, r) for nombre, (t, ruta, r) in procesados.items() if t == tipo]
+
+
+def test_dashboard_map_desde_el_cubo(procesados):
+    for nombre, _, resultados in _procesados(procesados, 'MAP'):
+        config = resultados['metadata']['config']
+        mes = resultados['metadata']['mes']
+        for ur, datos in resultados['resultados_por_ur'].items():
+            consulta = consultar_dashboard_ur(resultados['cubo'], ur, mes, config)
+            assert consulta == (datos, resultados['capitulos_por_ur'][ur], resultados['partidas_por_ur'][ur]), \
+                (nombre, ur)
+
+
+def test_dashboard_map_con_top_y_capitulos(procesados):
+    nombre, _, resultados = _procesados(procesados, 'MAP')[0]
+    config = resultados['metadata']['config']
+    mes = resultados['metadata']['mes']
+    ur = next(iter(resultados['resultados_por_ur']))
+    _, capitulos, partidas = consultar_dashboard_ur(resultados['cubo'], ur, mes, config,
+                                                    capitulos=(2, 5), top=None)
+    assert list(capitulos) == ['2', '5']
+    assert capitulos['2'] == resultados['capitulos_por_ur'][ur]['2']
+    disponibles = [p['Disponible'] for p in partidas]
+    assert disponibles == sorted(disponibles, reverse=True)
+    assert partidas[:len(resultados['partidas_por_ur'][ur])] == resultados['partidas_por_ur'][ur]
+
+
+def test_sicop_desde_el_cubo(procesados):
+    for nombre, _, resultados in _procesados(procesados, 'SICOP'):
+        config = resultados['metadata']['config']
+        resumen = resultados['resumen'].set_index('UR')
+        for ur in config['urs_validas']:
+            datos, capitulos = consultar_ur_sicop(resultados['cubo'], ur, resultados['metadata']['mes'], config)
+            assert datos == {col: resumen.at[ur, col] for col in datos}, (nombre, ur)
+            assert capitulos == resultados['capitulos_por_ur'][ur], (nombre, ur)
+
+
+@pytest.mark.parametrize('fecha', ['31-MAR-2026', '30-SEP-2026'])
+def test_sicop_a_otro_mes_igual_al_reporte_de_ese_mes(procesados, fecha):
+    nombre, ruta, resultados = next(
+        entrada for entrada in _procesados(procesados, 'SICOP') if entrada[0] == '15-MAY-2026_SICOP.csv'
+    )
+    referencia = procesar_sicop(leer_extracto(ruta, 'SICOP'), f'{fecha}_SICOP.csv')
+    config = referencia['metadata']['config']
+    resumen = referencia['resumen'].set_index('UR')
+    for ur in config['urs_validas']:
+        datos, capitulos = consultar_ur_sicop(resultados['cubo'], ur, referencia['metadata']['mes'], config)
+        assert datos == {col: resumen.at[ur, col] for col in datos}, ur
+        assert capitulos == referencia['capitulos_por_ur'][ur], ur
@@ -0,0 +1,107 @@
+# ============================================================================
+# PRUEBAS: EQUIVALENCIA DE RESULTADOS
+# ============================================================================
+# Las rutas alternativas dan los mismos resultados que la normal: agregación
+# paralela vs en un solo proceso, motores arrow/polars vs pandas, y el árbol
+# actual vs la implementación original (benchmarks.regresion).
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agregacion_paralela  # noqa: E402
+import motor  # noqa: E402
+from benchmarks import regresion  # noqa: E402
+from csv_loader import leer_extracto  # noqa: E402
+from map_processor import procesar_map  # noqa: E402
+from sicop_processor import procesar_sicop  # noqa: E402
+
+PROCESADORES = {'MAP': procesar_map, 'SICOP': procesar_sicop}
+
+# Implementación original, antes de las optimizaciones; se puede cambiar
+# por otro commit o directorio con SADER_REGRESION_REFERENCIA
+REFERENCIA = os.environ.get('SADER_REGRESION_REFERENCIA', '1f6e7fa')
+
+
+def _procesar(ruta):
+    tipo = regresion.tipo_extracto(ruta)
+    return regresion.normalizar(PROCESADORES[tipo](leer_extracto(ruta, tipo), os.path.basename(ruta)))
+
+
+# ============================================================================
+# PARALELO VS UN SOLO PROCESO
+# ============================================================================
+
+@pytest.fixture
+def paralelo(monkeypatch):
+    if agregacion_paralela.pa is None:
+        pytest.skip('requiere pyarrow')
+    # Aunque la máquina tenga un solo núcleo, se fuerza la ruta paralela
+    monkeypatch.setattr(agregacion_paralela, 'nucleos_disponibles', lambda: 4)
+    yield monkeypatch
+    with agregacion_paralela._candado:
+        if agregacion_paralela._pool is not None:
+            agregacion_paralela._pool.shutdown()
+            agregacion_paralela._pool = None
+
+
+@pytest.mark.parametrize('nombre', ['15-MAY-2026_SICOP.csv', '31-DIC-2025_SICOP.csv', '31-ENE-2026_SICOP.csv'])
+def test_paralelo_igual_a_un_proceso(corpus, paralelo, nombre):
+    ruta = next(r for r in corpus if os.path.basename(r) == nombre)
+    paralelo.setattr(agregacion_paralela, 'FILAS_PARALELO', 0)
+    serial = _procesar(ruta)
+    paralelo.setattr(agregacion_paralela, 'FILAS_PARALELO', 1)
+    assert agregacion_paralela.usar_paralelo(1)
+    assert _procesar(ruta) == serial
+
+
+# ============================================================================
+# MOTORES DE AGREGACIÓN
+# ============================================================================
+
+@pytest.mark.parametrize('nombre_motor', ['arrow', 'polars'])
+def test_motor_igual_a_pandas(corpus, monkeypatch, nombre_motor):
+    if nombre_motor not in motor.motores_disponibles():
+        pytest.skip(f'el motor {nombre_motor} no está instalado')
+    for ruta in corpus:
+        monkeypatch.setattr(motor, 'MOTOR', 'pandas')
+        referencia = _procesar(ruta)
+        monkeypatch.setattr(motor, 'MOTOR', nombre_motor)
+        assert regresion.diferencias(referencia, _procesar(ruta)) == [], os.path.basename(ruta)
+
+
+# ============================================================================
+# REGRESIÓN CONTRA LA IMPLEMENTACIÓN ORIGINAL
+# ============================================================================
+
+def _referencia_disponible():
+    if os.path.isdir(REFERENCIA):
+        return True
+    try:
+        regresion._git('rev-parse', '--verify', f'{REFERENCIA}^{{commit}}')
+    except (OSError, subprocess.CalledProcessError):
+        return False
+    return True
+
+
+def test_regresion_contra_la_implementacion_original(corpus):
+    if not _referencia_disponible():
+        pytest.skip(f'la referencia {REFERENCIA} no está disponible (¿clon sin historia?)')
+    referencia = regresion.captura_referencia(REFERENCIA, corpus)
+    candidata = regresion._capturar_aislado(regresion.RAIZ, corpus)
+
+    assert all('error' not in entrada.get('excel', {}) for entrada in candidata.values())
+    # Solo se admiten agregados: llaves que la referencia no tenía y libros
+    # que no podía generar (el MAP original fallaba con KeyError: 'congelados')
+    for nombre, entrada in referencia.items():
+        assert 'error' not in entrada['resultados'], nombre
+        if 'error' in entrada.get('excel', {}):
+            entrada.pop('excel')
+            candidata[nombre].pop('excel')
+    difs = [(ruta, a, b) for ruta, a, b in regresion.comparar_capturas(referencia, candidata)
+            if a != '<no existe>']
+    assert difs == [], difs[:10]
@@ -0,0 +1,85 @@
+# ============================================================================
+# PRUEBAS: FECHA DEL CORTE
+# ============================================================================
+# fecha_en_nombre reconoce los formatos de PATRONES_FECHA_NOMBRE; sin fecha
+# en el nombre detectar_fecha_archivo usa el contenido (MAP) o la de hoy, y
+# los procesadores lo marcan en metadata['fecha_inferida'].
+
+import os
+import sys
+from datetime import date
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import detectar_fecha_archivo, fecha_en_nombre  # noqa: E402
+from csv_loader import leer_extracto  # noqa: E402
+from map_processor import procesar_map  # noqa: E402
+from sicop_processor import procesar_sicop  # noqa: E402
+
+HOY = date.today()
+
+
+@pytest.mark.parametrize('nombre, esperado', [
+    ('19-FEB-2026_MAP.csv', date(2026, 2, 19)),
+    ('19FEB2026_SICOP.csv', date(2026, 2, 19)),
+    ('map_15-mzo-2025.csv', date(2025, 3, 15)),
+    ('SICOP 2026-02-19.csv', date(2026, 2, 19)),
+    ('sicop_20260219.csv', date(2026, 2, 19)),
+    ('MAP 19.02.2026.csv', date(2026, 2, 19)),
+    ('MAP_2025_12.csv', date(2025, 12, 31)),
+    ('Estado MAY2026.csv', date(2026, 5, 31)),
+    ('MAP_FEB-2024.csv', date(2024, 2, 29)),
+])
+def test_formatos_del_nombre(nombre, esperado):
+    assert fecha_en_nombre(nombre) == (esperado, esperado.month, esperado.year)
+
+
+def test_sin_año_toma_el_actual():
+    assert fecha_en_nombre('10-MAR_MAP.csv') == (date(HOY.year, 3, 10), 3, HOY.year)
+
+
+@pytest.mark.parametrize('nombre', ['MAP.csv', 'extracto_final.csv', '31-FEB-2026_MAP.csv', '2026-02-30.csv'])
+def test_sin_fecha_valida(nombre):
+    assert fecha_en_nombre(nombre) is None
+
+
+def test_dia_inexistente_no_impide_otra_fecha_del_nombre():
+    # El día inválido no se ajusta al fin de mes ni se usa su mes suelto
+    assert fecha_en_nombre('31-FEB-2026_corte_15-MAR-2026_MAP.csv') == (date(2026, 3, 15), 3, 2026)
+
+
+def test_origen_nombre():
+    assert detectar_fecha_archivo('15-MAY-2026_MAP.csv', con_origen=True) == (date(2026, 5, 15), 5, 2026, 'nombre')
+    assert detectar_fecha_archivo('15-MAY-2026_MAP.csv') == (date(2026, 5, 15), 5, 2026)
+
+
+def test_origen_contenido_del_map():
+    df = pd.DataFrame({f'EJE_{mes}': [0.0] for mes in
+                       ['ENE', 'FEB', 'MAR', 'ABR', 'MAY', 'JUN', 'JUL', 'AGO', 'SEP', 'OCT', 'NOV', 'DIC']})
+    df[['EJE_ENE', 'EJE_JUL']] = 1.0
+    assert detectar_fecha_archivo('MAP_2025.csv', df, con_origen=True) == (date(2025, 7, 31), 7, 2025, 'contenido')
+    assert detectar_fecha_archivo('MAP.csv', df, con_origen=True)[3] == 'contenido'
+
+
+def test_origen_hoy_con_advertencia():
+    with pytest.warns(UserWarning, match='se usa la de hoy'):
+        assert detectar_fecha_archivo('extracto.csv', con_origen=True) == (HOY, HOY.month, HOY.year, 'hoy')
+
+
+def test_fecha_inferida_en_los_procesadores(corpus):
+    map_ruta = next(r for r in corpus if os.path.basename(r) == '15-MAY-2026_MAP.csv')
+    sicop_ruta = next(r for r in corpus if os.path.basename(r) == '15-MAY-2026_SICOP.csv')
+
+    assert procesar_map(leer_extracto(map_ruta, 'MAP'), '15-MAY-2026_MAP.csv')['metadata']['fecha_inferida'] is False
+    # MAP sin fecha en el nombre: mes por contenido, no se supone la de hoy
+    metadata = procesar_map(leer_extracto(map_ruta, 'MAP'), 'MAP_2026.csv')['metadata']
+    assert (metadata['mes'], metadata['fecha_inferida']) == (5, False)
+
+    # SICOP no tiene respaldo por contenido
+    with pytest.warns(UserWarning):
+        metadata = procesar_sicop(leer_extracto(sicop_ruta, 'SICOP'), 'SICOP.csv')['metadata']
+    assert metadata['fecha_inferida'] is True
+    assert metadata['fecha_archivo'] == HOY
@@ -0,0 +1,52 @@
+# ============================================================================
+# PRUEBAS: CONGELADOS DEL CUADRO MAP
+# ============================================================================
+# procesar_map debe devolver los congelados anuales por programa que
+# generar_excel_map usa en las notas 3/, 4/ y 5/; sin ellos el libro fallaba
+# con KeyError: 'congelados'.
+
+import datetime as dt
+import io
+import os
+import sys
+
+import pytest
+from openpyxl import load_workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.datos_sinteticos import escribir_extracto, nombre_archivo  # noqa: E402
+from config import round_like_excel  # noqa: E402
+from csv_loader import leer_extracto  # noqa: E402
+from excel_map import generar_excel_map  # noqa: E402
+from map_processor import procesar_map  # noqa: E402
+
+FECHA = dt.date(2026, 5, 15)
+
+
+@pytest.fixture(scope='module')
+def resultados(tmp_path_factory):
+    ruta = str(tmp_path_factory.mktemp('map') / nombre_archivo(FECHA, 'MAP'))
+    escribir_extracto(ruta, 'MAP', 3000, FECHA, semilla=11)
+    return procesar_map(leer_extracto(ruta, 'MAP'), os.path.basename(ruta))
+
+
+def test_congelados_por_programa(resultados):
+    df = resultados['df_procesado']
+    congelados = resultados['congelados']
+    assert set(congelados['valores']) == set(df['PROGRAMA'].unique())
+    for prog, valor in congelados['valores'].items():
+        esperado = round_like_excel(df.loc[df['PROGRAMA'] == prog, 'CONG_ANUAL'].sum(), 2)
+        assert valor == esperado, prog
+        assert congelados['textos'][prog]
+
+
+def test_notas_de_congelados_en_el_libro(resultados):
+    libro = load_workbook(io.BytesIO(generar_excel_map(resultados)))
+    textos = [celda for hoja in libro.worksheets for fila in hoja.iter_rows(values_only=True)
+              for celda in fila if isinstance(celda, str)]
+    notas = [texto for texto in textos if 'recursos congelados' in texto]
+    assert len(notas) == 3
+    for prog in ['S263', 'S293', 'S304']:
+        valor = resultados['congelados']['valores'].get(prog, 0)
+        assert any(f'${valor:,.2f}' in nota for nota in notas), prog
@@ -0,0 +1,117 @@
+# ============================================================================
+# PRUEBAS: REDONDEO VECTORIZADO COMO EXCEL
+# ============================================================================
+# round_like_excel_array debe dar, valor por valor, lo mismo que
+# round_like_excel (Decimal(str(x)) con ROUND_HALF_UP). Se prueba con
+# valores aleatorios, mitades exactas, sus vecinos flotantes, negativos, NaN
+# y magnitudes donde entra el respaldo escalar.
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import round_like_excel, round_like_excel_array  # noqa: E402
+
+SEMILLA = 20260217
+
+
+def _esperado(valores, decimales):
+    return np.array([round_like_excel(v, decimales) for v in valores], dtype='float64')
+
+
+def _comparar(valores, decimales=2):
+    valores = np.asarray(valores, dtype='float64')
+    obtenido = round_like_excel_array(valores, decimales)
+    esperado = _esperado(valores, decimales)
+    diferentes = np.flatnonzero(obtenido != esperado)
+    assert diferentes.size == 0, [
+        (repr(valores[i]), obtenido[i], esperado[i]) for i in diferentes[:10]
+    ]
+
+
+@pytest.mark.parametrize('decimales', [0, 1, 2, 3])
+def test_valores_aleatorios(decimales):
+    rng = np.random.default_rng(SEMILLA + decimales)
+    valores = np.concatenate([
+        rng.uniform(-1_000, 1_000, 20_000),
+        rng.uniform(-1e9, 1e9, 20_000),
+        # Importes con centavos y milésimas, como llegan en los extractos
+        np.round(rng.uniform(-1e7, 1e7, 20_000), 3),
+    ])
+    _comparar(valores, decimales)
+
+
+@pytest.mark.parametrize('decimales', [0, 1, 2, 3])
+def test_mitades_exactas(decimales):
+    rng = np.random.default_rng(SEMILLA)
+    enteros = np.concatenate([np.arange(0, 20_000), rng.integers(0, 10**9, 20_000)])
+    # (k + 0.5) / 10^d: la mitad decimal escrita como la leería str()
+    mitades = np.array([float(f'{(k * 10 + 5) / 10 ** (decimales + 1):.{decimales + 1}f}')
+                        for k in enteros])
+    _comparar(mitades, decimales)
+    _comparar(-mitades, decimales)
+
+
+def test_casos_conocidos():
+    assert round_like_excel_array(2.675) == 2.68
+    assert round_like_excel_array(1.005) == 1.01
+    assert round_like_excel_array(0.125) == 0.13
+    assert round_like_excel_array(-2.675) == -2.68
+    assert round_like_excel_array(2.5, 0) == 3.0
+    assert round_like_excel_array(-0.5, 0) == -1.0
+
+
+@pytest.mark.parametrize('decimales', [0, 2])
+def test_vecinos_de_la_mitad(decimales):
+    rng = np.random.default_rng(SEMILLA + 1)
+    enteros = rng.integers(0, 10**8, 5_000)
+    mitades = (enteros + 0.5) / 10.0 ** decimales
+    arriba = np.nextafter(mitades, np.inf)
+    abajo = np.nextafter(mitades, -np.inf)
+    valores = np.concatenate([mitades, arriba, abajo, np.nextafter(arriba, np.inf),
+                              np.nextafter(abajo, -np.inf)])
+    _comparar(valores, decimales)
+    _comparar(-valores, decimales)
+
+
+def test_negativos_y_cero():
+    rng = np.random.default_rng(SEMILLA + 2)
+    valores = -np.abs(rng.uniform(0, 1e6, 20_000))
+    _comparar(valores)
+    _comparar([0.0, -0.0, -0.004, -0.005, -0.0049999999, 0.005, 0.004])
+
+
+def test_nan_queda_en_cero():
+    valores = np.array([np.nan, 1.005, np.nan, -2.675])
+    resultado = round_like_excel_array(valores)
+    np.testing.assert_array_equal(resultado, [0.0, 1.01, 0.0, -2.68])
+    assert round_like_excel_array(np.nan) == 0.0
+    assert round_like_excel(np.nan) == 0
+
+
+def test_respaldo_escalar_en_magnitudes_grandes():
+    # Donde np.spacing(ax) * 10^d >= 0.01 la mitad no se distingue con la
+    # aritmética vectorizada y se resuelve elemento por elemento
+    rng = np.random.default_rng(SEMILLA + 3)
+    valores = np.concatenate([
+        rng.uniform(1e13, 1e16, 5_000),
+        np.array([2.0 ** 53, 2.0 ** 53 + 2, 1e15 + 0.5, 1e14 + 0.125, 12345678901234.565]),
+    ])
+    assert (np.spacing(valores) * 100 >= 0.01).any()
+    _comparar(valores)
+    _comparar(-valores)
+
+
+def test_serie_y_escalar():
+    serie = pd.Series([1.005, np.nan, -2.675], index=['a', 'b', 'c'], name='IMPORTE')
+    resultado = round_like_excel_array(serie)
+    assert isinstance(resultado, pd.Series)
+    assert resultado.name == 'IMPORTE'
+    assert list(resultado.index) == ['a', 'b', 'c']
+    assert resultado.tolist() == [1.01, 0.0, -2.68]
+    assert isinstance(round_like_excel_array(1.005), float)
@@ -0,0 +1,201 @@
+# ============================================================================
+# COLA DE TRABAJOS DE PROCESAMIENTO EN SEGUNDO PLANO
+# ============================================================================
+# La app entrega el archivo subido y recibe un id de trabajo; la lectura, el
+# procesamiento y (si se pide) el Excel corren en un pool de hilos con un
+# límite de trabajos simultáneos, y la sesión consulta el avance en cada
+# rerun sin quedarse bloqueada. Cada trabajo guarda además su registro de
+# diagnostico (tiempo, memoria y contadores por etapa) y, si se pidió, el
+# perfil del procesamiento (perfilado). Los resultados no se guardan en el
+# trabajo sino en result_cache (con su límite de entradas): el trabajo solo
+# conserva la clave para volver a pedirlos, y si ya se desalojaron queda
+# 'expirado' y la sesión lo vuelve a enviar. Los trabajos viven en memoria
+# del servidor, así que un reinicio los descarta.
+
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from diagnostico import medir
+from etapas import ETAPAS, contar, escuchar, etapa
+from extract_cache import leer_extracto_cacheado
+from cortes import leer_compactado
+from result_cache import procesar_cacheado, excel_cacheado, resultados_memorizados
+import perfilado
+
+# Trabajos que corren a la vez; los demás esperan en la cola
+MAX_SIMULTANEOS = int(os.environ.get('SADER_TRABAJOS_SIMULTANEOS', '2'))
+
+# Trabajos terminados (solo clave y diagnóstico) que se conservan para las
+# sesiones que los consultan
+MAX_TERMINADOS = 32
+
+_pool = ThreadPoolExecutor(max_workers=max(MAX_SIMULTANEOS, 1), thread_name_prefix='sader-trabajo')
+_trabajos = OrderedDict()
+_candado = threading.Lock()
+_consecutivo = itertools.count(1)
+
+
+def _avanzar(trabajo, evento, nombre, valor):
+    if evento != 'inicio':
+        return
+    with _candado:
+        trabajo['estado'] = 'corriendo'
+        trabajo['etapa'] = nombre
+
+
+def _ejecutar(trabajo, datos, comparar_corte, excel, perfilar):
+    """Corre en un hilo del pool"""
+    tipo = trabajo['tipo']
+    filename = trabajo['archivo']
+    trabajo['inicio'] = time.time()
+    with medir(archivo=filename, tipo=tipo, comparar_corte=comparar_corte) as registro:
+        with escuchar(lambda *aviso: _avanzar(trabajo, *aviso)):
+            with etapa('lectura'):
+                if comparar_corte:
+                    df, hash_archivo, cambios = leer_compactado(datos, tipo, filename)
+                    # Los resultados del extracto compactado se memorizan aparte
+                    hash_archivo = f'{hash_archivo}-compactado'
+                    registros = cambios['renglones']
+                else:
+                    df, hash_archivo = leer_extracto_cacheado(datos, tipo)
+                    cambios = None
+                    registros = len(df)
+                contar('renglones', registros)
+                trabajo['hash_archivo'] = hash_archivo
+            with perfilado.perfilar(f'{tipo}_{filename}', forzar=perfilar) as perfil:
+                # Perfilado pedido para este trabajo: se procesa de nuevo
+                # aunque esté memorizado, para medir el procesamiento y no la
+                # lectura del caché; lo que ya usan otras sesiones no se
+                # descarta. Con SADER_PERFILAR solo se perfila lo que toque
+                # calcular, sin saltarse los cachés
+                recalcular = perfilar
+                with etapa('procesamiento'):
+                    resultados = procesar_cacheado(df, filename, tipo, hash_archivo, recalcular=recalcular)
+                if excel:
+                    # Queda memorizado junto a los resultados
+                    with etapa('excel'):
+                        excel_cacheado(resultados, hash_archivo, tipo, filename, recalcular=recalcular)
+    return {
+        'hash_archivo': hash_archivo,
+        'cambios': cambios,
+        'registros': registros,
+        'diagnostico': registro,
+        'perfil': perfil.get('archivo'),
+    }
+
+
+def _terminar(trabajo, futuro):
+    with _candado:
+        trabajo['fin'] = time.time()
+        trabajo['estado'] = 'error' if futuro.exception() is not None else 'terminado'
+        terminados = [clave for clave, t in _trabajos.items() if t['estado'] in ('terminado', 'error')]
+        for clave in terminados[:max(len(terminados) - MAX_TERMINADOS, 0)]:
+            del _trabajos[clave]
+
+
+def enviar(datos, filename, tipo, comparar_corte=False, excel=False, perfilar=False):
+    """
+    Encola la lectura y el procesamiento de un extracto.
+
+    Args:
+        datos: contenido del archivo (bytes)
+        filename: nombre del archivo (de ahí sale la fecha del corte)
+        tipo: 'MAP' o 'SICOP'
+        comparar_corte: leer compactado por claves y comparar con el corte
+            anterior (cortes.leer_compactado)
+        excel: generar también el Excel del reporte (queda memorizado en
+            result_cache; excel_cacheado lo devuelve sin volver a generarlo)
+        perfilar: correr el procesamiento (y el Excel, si se pide) bajo el
+            perfilador aunque SADER_PERFILAR no esté activo, calculándolos de
+            nuevo aunque ya estén memorizados
+
+    Returns:
+        str: id del trabajo
+    """
+    trabajo = {
+        'id': f'{next(_consecutivo)}-{os.urandom(4).hex()}',
+        'archivo': filename,
+        'tipo': tipo.upper(),
+        'estado': 'en_cola',
+        'etapa': None,
+        'hash_archivo': None,
+        'encolado': time.time(),
+        'inicio': None,
+        'fin': None,
+    }
+    with _candado:
+        _trabajos[trabajo['id']] = trabajo
+        trabajo['futuro'] = _pool.submit(_ejecutar, trabajo, bytes(datos), comparar_corte, excel, perfilar)
+    trabajo['futuro'].add_done_callback(lambda futuro: _terminar(trabajo, futuro))
+    return trabajo['id']
+
+
+def estado(id_trabajo):
+    """
+    Estado de un trabajo, o None si no existe (o ya se descartó).
+
+    Returns:
+        dict con id, archivo, tipo, estado ('en_cola', 'corriendo',
+        'terminado', 'error' o 'expirado': terminó pero sus resultados ya no
+        están en memoria), etapa en curso, avance (0 a 1), posicion en la
+        cola y segundos transcurridos
+    """
+    with _candado:
+        trabajo = _trabajos.get(id_trabajo)
+        if trabajo is None:
+            return None
+        info = {k: v for k, v in trabajo.items() if k != 'futuro'}
+        en_cola = [t['id'] for t in _trabajos.values() if t['estado'] == 'en_cola']
+    info['posicion'] = en_cola.index(id_trabajo) + 1 if id_trabajo in en_cola else 0
+    if info['estado'] == 'terminado' and _expirado(info):
+        info['estado'] = 'expirado'
+    if info['estado'] in ('terminado', 'expirado'):
+        info['avance'] = 1.0
+    elif info['etapa'] is None:
+        info['avance'] = 0.0
+    else:
+        info['avance'] = ETAPAS.index(info['etapa']) / len(ETAPAS)
+    desde = info['inicio'] or info['encolado']
+    info['segundos'] = (info['fin'] or time.time()) - desde
+    return info
+
+
+def _expirado(trabajo):
+    return resultados_memorizados(trabajo['hash_archivo'], trabajo['tipo'], trabajo['archivo']) is None
+
+
+def resultado(id_trabajo):
+    """
+    Resultado de un trabajo terminado: dict con resultados (pedidos de
+    nuevo a result_cache), hash_archivo, cambios, registros, diagnostico y
+    perfil (ruta o None). Si el trabajo falló, relanza su excepción.
+
+    Returns:
+        dict, o None si el trabajo ya se descartó o sus resultados se
+        desalojaron (expirado): hay que volver a enviarlo
+    """
+    with _candado:
+        trabajo = _trabajos.get(id_trabajo)
+    if trabajo is None:
+        return None
+    datos = trabajo['futuro'].result(timeout=0)
+    resultados = resultados_memorizados(datos['hash_archivo'], trabajo['tipo'], trabajo['archivo'])
+    if resultados is None:
+        return None
+    return {**datos, 'resultados': resultados}
+
+
+def estadisticas():
+    """Trabajos en curso, en cola y conservados"""
+    with _candado:
+        estados = [t['estado'] for t in _trabajos.values()]
+    return {
+        'corriendo': estados.count('corriendo'),
+        'en_cola': estados.count('en_cola'),
+        'terminados': estados.count('terminado') + estados.count('error'),
+        'max_simultaneos': MAX_SIMULTANEOS,
+    }